@@ -0,0 +1,82 @@
+## bench_feature_engineering.py
+## Before/after benchmark for CreditFeatureEngineer.transform on the notebook
+## dataset: wall time and peak traced allocations for a full-frame call and for the
+## single-row call the API makes per request.
+##
+##   python -m benchmarks.bench_feature_engineering [--repeat 50]
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.features.feature_defs import CreditFeatureEngineer
+
+DATASET_PATH = "notebooks/credit_risk_dataset.csv"
+
+
+def legacy_transform(X, feature_config):
+    """The previous implementation: full copy plus per-ratio temporaries."""
+    X_out = X.copy()
+    for ratio in feature_config:
+        name, num, den = ratio['name'], ratio['numerator'], ratio['denominator']
+        X_out[name] = X_out[num] / X_out[den].replace(0, np.nan)
+        X_out[name] = X_out[name].fillna(0)
+    if 'cb_person_cred_hist_length' in X_out.columns and 'person_age' in X_out.columns:
+        X_out['cred_hist_age_ratio'] = X_out['cb_person_cred_hist_length'] / X_out['person_age']
+        X_out['cred_hist_age_ratio'] = X_out['cred_hist_age_ratio'].fillna(0)
+    return X_out
+
+
+def time_call(func, repeat):
+    """Median seconds per call."""
+    func()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def trace_call(func):
+    """Peak bytes allocated (and traced) during one call."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_benchmark(repeat):
+    df = pd.read_csv(DATASET_PATH).drop(columns=['loan_status'])
+    engineer = CreditFeatureEngineer().fit(df)
+
+    # The rewrite must produce exactly the same features
+    pd.testing.assert_frame_equal(engineer.transform(df), legacy_transform(df, engineer.feature_config))
+    array_out = engineer.transform(df.to_numpy())
+    assert np.array_equal(array_out[:, df.shape[1]:].astype(float),
+                          legacy_transform(df, engineer.feature_config).iloc[:, df.shape[1]:].to_numpy())
+    print(f"Parity OK ({len(df)} rows, {engineer.transform(df).shape[1] - df.shape[1]} ratio columns; "
+          f"ndarray input -> {array_out.shape})")
+
+    cases = {
+        f"frame ({len(df)} rows)": df,
+        "single row": df.iloc[[0]],
+    }
+    print(f"{'case':<22}{'impl':<8}{'median ms':>11}{'peak KiB':>11}")
+    for label, frame in cases.items():
+        for impl, func in (("before", lambda: legacy_transform(frame, engineer.feature_config)),
+                           ("after", lambda: engineer.transform(frame))):
+            seconds = time_call(func, repeat)
+            peak = trace_call(func)
+            print(f"{label:<22}{impl:<8}{seconds * 1000:>11.3f}{peak / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CreditFeatureEngineer before/after.")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed calls per case")
+    args = parser.parse_args()
+    run_benchmark(args.repeat)
@@ -0,0 +1,81 @@
+## bench_out_of_core.py
+## Peak RSS and time per boosting round of in-memory vs out-of-core training.
+## A synthetic feature set of --rows rows is resampled (with jitter) from the
+## current train_processed version into a scratch store; every mode then
+## trains in its own process so peak RSS is not shared between runs.
+##
+##   python -m benchmarks.bench_out_of_core [--rows 2000000] [--rounds 50]
+
+import argparse
+import json
+import multiprocessing
+import shutil
+import tempfile
+
+import numpy as np
+import yaml
+
+from src.features.feature_store import FeatureStore
+from src.training.external import train_out_of_core
+from src.training.train import train_in_memory
+
+MODES = ["in_memory", "quantile", "external"]
+
+
+def build_feature_set(store, rows, seed=0):
+    df = FeatureStore().load_features("train_processed")
+    rng = np.random.default_rng(seed)
+    sample = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    numeric = [c for c in sample.columns if c.startswith(("num__", "remainder__"))]
+    sample[numeric] = sample[numeric] * rng.normal(1.0, 0.01, size=(rows, len(numeric)))
+    store.save_features(sample, "train_processed", target="target")
+
+
+def _train(mode, base_path, rounds, batch_rows, queue):
+    with open("configs/training.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config['model']['params']['n_estimators'] = rounds
+    config['model']['out_of_core'] = {**(config['model'].get('out_of_core') or {}),
+                                      'matrix': mode, 'batch_rows': batch_rows,
+                                      'cache_dir': f"{base_path}/.xgb_cache"}
+    store = FeatureStore(base_path=base_path)
+    if mode == "in_memory":
+        _, stats = train_in_memory(config, store=store)
+    else:
+        _, stats = train_out_of_core(config, store=store)
+    queue.put(stats)
+
+
+def run_benchmark(rows, rounds, batch_rows):
+    base_path = tempfile.mkdtemp(prefix="bench_ooc_")
+    try:
+        build_feature_set(FeatureStore(base_path=base_path), rows)
+        context = multiprocessing.get_context("spawn")
+        results = []
+        for mode in MODES:
+            queue = context.Queue()
+            process = context.Process(target=_train, args=(mode, base_path, rounds, batch_rows, queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+
+        print(f"{rows} rows, {rounds} rounds, batches of {batch_rows}")
+        print(f"{'mode':<24}{'peak RSS MB':>13}{'ms/round':>10}{'prep s':>8}")
+        for stats in results:
+            print(f"{stats['mode']:<24}{stats['peak_rss_mb']:>13.0f}"
+                  f"{stats['seconds_per_round'] * 1000:>10.1f}{stats['build_seconds']:>8.2f}")
+        return results
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare in-memory and out-of-core training.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--batch-rows", type=int, default=100_000)
+    parser.add_argument("--json", action="store_true", help="Print the raw stats as JSON")
+    args = parser.parse_args()
+    results = run_benchmark(args.rows, args.rounds, args.batch_rows)
+    if args.json:
+        print(json.dumps(results, indent=4))
@@ -0,0 +1,140 @@
+## bench_startup.py
+## API cold start: starts fresh uvicorn workers and measures how long until
+## /healthz answers (process up), until /readyz turns 200 (model loaded and
+## warmed up), and the latency of the first and following /predict calls.
+## A separate process scores without warm-up to show the first-call cost the
+## warm-up batch absorbs. Servers run with the result cache off and away from the
+## real monitoring state (benchmarks/isolation.py), and every /predict carries a
+## different application, so the steady latency is scoring, not cache hits.
+##
+##   python -m benchmarks.bench_startup [--runs 3] [--port 8765]
+
+# Standard library only: spawned servers re-import this module before they bind
+import argparse
+import json
+import multiprocessing
+import shutil
+import statistics
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.isolation import serve
+
+APPLICATION = {
+    "person_age": 30, "person_income": 65000, "person_home_ownership": "MORTGAGE",
+    "person_emp_length": 5.0, "loan_intent": "VENTURE", "loan_grade": "A", "loan_amnt": 5000,
+    "loan_int_rate": 10.5, "cb_person_default_on_file": "N", "cb_person_cred_hist_length": 7
+}
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+    except (urllib.error.URLError, ConnectionError):
+        return None, None
+
+
+def _post_seconds(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"content-type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def wait_for(url, start, timeout, status=200):
+    while time.perf_counter() - start < timeout:
+        code, body = _get(url)
+        if code == status:
+            return time.perf_counter() - start, body
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not return {status} within {timeout}s")
+
+
+def measure_server(port, timeout, payloads, scratch):
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(port, scratch), daemon=True)
+    server.start()
+    try:
+        healthz_seconds, _ = wait_for(f"{base}/healthz", start, timeout)
+        ready_seconds, ready = wait_for(f"{base}/readyz", start, timeout)
+        latencies = [_post_seconds(f"{base}/predict", payload) for payload in payloads]
+    finally:
+        server.terminate()
+        server.join()
+    return {
+        "healthz_s": healthz_seconds,
+        "ready_s": ready_seconds,
+        "timings": ready['timings'],
+        "first_predict_ms": latencies[0] * 1000,
+        "steady_predict_ms": statistics.median(latencies[1:]) * 1000
+    }
+
+
+def _cold_scoring(queue):
+    # Same loading as the API, but the first call is timed instead of warmed up
+    start = time.perf_counter()
+    from src.inference import api
+    bundle = api.load_bundle()
+    loaded = time.perf_counter() - start
+    record = {**APPLICATION, "loan_percent_income": APPLICATION["loan_amnt"] / APPLICATION["person_income"]}
+    timings = []
+    for _ in range(21):
+        call_start = time.perf_counter()
+        api.score_records([record], bundle)
+        timings.append(time.perf_counter() - call_start)
+    queue.put({"load_s": loaded, "first_call_ms": timings[0] * 1000,
+               "steady_call_ms": statistics.median(timings[1:]) * 1000})
+
+
+def measure_cold_scoring():
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_cold_scoring, args=(queue,))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run_benchmark(runs, port, timeout, requests):
+    from benchmarks.suite import applications
+
+    payloads = applications(requests + 1)
+    scratch = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        servers = [measure_server(port, timeout, payloads, scratch) for _ in range(runs)]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    cold = measure_cold_scoring()
+
+    print(f"{'run':<5}{'healthz s':>11}{'ready s':>9}{'imports':>9}{'load':>7}{'warmup ms':>11}"
+          f"{'1st ms':>8}{'steady ms':>11}")
+    for i, r in enumerate(servers):
+        t = r['timings']
+        print(f"{i:<5}{r['healthz_s']:>11.2f}{r['ready_s']:>9.2f}{t.get('imports', 0):>9.2f}"
+              f"{t.get('load_artifacts', 0):>7.2f}{t.get('warmup', 0) * 1000:>11.1f}"
+              f"{r['first_predict_ms']:>8.1f}{r['steady_predict_ms']:>11.1f}")
+    print(f"Without warm-up: first score {cold['first_call_ms']:.1f} ms vs steady "
+          f"{cold['steady_call_ms']:.2f} ms (artifacts loaded in {cold['load_s']:.2f}s)")
+    return {"servers": servers, "cold_scoring": cold}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure API cold start and first-request latency.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh server starts to measure")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--requests", type=int, default=20, help="/predict calls after the first one")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = parser.parse_args()
+    results = run_benchmark(args.runs, args.port, args.timeout, args.requests)
+    if args.json:
+        print(json.dumps(results, indent=4))
@@ -0,0 +1,60 @@
+## bench_tree_backend.py
+## Scoring latency of the two inference backends (XGBoost inplace_predict vs
+## the flattened NumPy trees in src/inference/flat_trees.py) at the batch sizes
+## the API sees: one request, a coalesced batch and a bulk chunk.
+##
+##   python -m benchmarks.bench_tree_backend [--repeat 200]
+
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_feature_engineering import time_call
+from src.inference.compiled import CompiledPipeline, predict_default_proba
+from src.inference.flat_trees import FlatForest
+
+MODEL_PATH = "models/registry/credit_model_latest.joblib"
+PIPELINE_PATH = "models/preprocessing_pipeline.joblib"
+DATASET_PATH = "notebooks/credit_risk_dataset.csv"
+BATCH_SIZES = [1, 64, 4096]
+
+
+def load_matrix(pipeline, model):
+    df = pd.read_csv(DATASET_PATH).drop(columns=['loan_status'])
+    df['loan_percent_income'] = df['loan_amnt'] / df['person_income']
+    records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    return CompiledPipeline.from_artifacts(pipeline, model).transform_batch(records)
+
+
+def run_benchmark(repeat, batch_sizes):
+    model = joblib.load(MODEL_PATH)
+    X = load_matrix(joblib.load(PIPELINE_PATH), model)
+    forest = FlatForest.from_booster(model.get_booster())
+
+    # Both backends must agree before their timings mean anything
+    expected = predict_default_proba(model, X)
+    actual = forest.predict_proba(X)
+    max_diff = float(np.max(np.abs(expected.astype(np.float64) - actual)))
+    assert max_diff <= 1e-6, f"Flat trees diverge from XGBoost (max |diff| {max_diff:.2e})"
+    print(f"Parity OK on {len(X)} rows (max |diff| {max_diff:.2e}); "
+          f"{forest.n_trees} trees padded to depth {forest.depth}")
+
+    print(f"{'batch':>6}{'xgboost ms':>12}{'flat ms':>10}{'speedup':>9}")
+    results = []
+    for size in batch_sizes:
+        batch = X[:size]
+        xgb_seconds = time_call(lambda: predict_default_proba(model, batch), repeat)
+        flat_seconds = time_call(lambda: forest.predict_proba(batch), repeat)
+        results.append({"batch": size, "xgboost_ms": xgb_seconds * 1000, "flat_ms": flat_seconds * 1000})
+        print(f"{size:>6}{xgb_seconds * 1000:>12.3f}{flat_seconds * 1000:>10.3f}{xgb_seconds / flat_seconds:>8.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark XGBoost vs flattened-tree scoring.")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls per batch size")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    args = parser.parse_args()
+    run_benchmark(args.repeat, args.batch_sizes)
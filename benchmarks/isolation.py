@@ -0,0 +1,26 @@
+## isolation.py
+## The API as the benchmarks run it: result cache off (every request is scored)
+## and no writes to the real monitoring state (drift windows, performance store,
+## prediction log). Kept free of heavy imports so a benchmarked server binds its
+## port as fast as a production worker would.
+
+import os
+
+
+def isolated_api(scratch):
+    """The API module with every side effect that would touch real monitoring state disabled."""
+    from src.inference import api
+
+    api.RESULT_CACHE = None  # measure the scoring path, not cache hits
+    api.WATCHER.on_swap = None  # it would flush the (now absent) cache
+    api.load_drift_window = lambda: None
+    api.load_performance_store = lambda: None
+    api.CONFIG.setdefault('prediction_log', {})['directory'] = os.path.join(scratch, "prediction_log")
+    return api
+
+
+def serve(port, scratch):
+    """uvicorn on an isolated API (a multiprocessing target)."""
+    import uvicorn
+    api = isolated_api(scratch)
+    uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning")
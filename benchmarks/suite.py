@@ -0,0 +1,383 @@
+## suite.py
+## Benchmark suite for the SLA-relevant paths: /predict latency (in-process
+## TestClient and a load-generated uvicorn server), run_batch_inference
+## throughput and memory, CreditFeatureEngineer.transform, run_validation and
+## training time, on synthetic data (benchmarks/synthetic.py) at the profile's
+## sizes. Every case runs in a fresh process (peak RSS is per case) and is
+## isolated from the real monitoring state: result cache, drift windows,
+## performance store and prediction log are off or redirected to a scratch dir.
+##
+## Results go to benchmarks/results/<commit>.json; --compare checks them
+## against an earlier file and exits 1 when a metric regressed by more than
+## --threshold (after a dependency upgrade, say), or when a case failed or
+## is missing.
+##
+##   python -m benchmarks.suite [--profile quick|standard|full] [--cases ...]
+##   python -m benchmarks.suite --compare benchmarks/results/<baseline>.json [--threshold 0.1]
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+from benchmarks.isolation import isolated_api, serve
+from benchmarks.synthetic import synthetic_dataset
+
+RESULTS_DIR = "benchmarks/results"
+
+PROFILES = {
+    # rows per data-scaled case, /predict calls per latency case
+    'quick': {'sizes': [10_000], 'requests': 300},
+    'standard': {'sizes': [10_000, 1_000_000], 'requests': 2_000},
+    'full': {'sizes': [10_000, 1_000_000, 10_000_000], 'requests': 10_000},
+}
+
+# Metric name suffix -> whether bigger is better (others are informational)
+DIRECTIONS = {'_per_second': True, '_ms': False, '_seconds': False, '_mb': False}
+
+
+# --- Helpers (run inside the case processes) ---
+
+def percentiles_ms(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 4), "p99_ms": round(float(np.percentile(ms, 99)), 4),
+            "mean_ms": round(float(ms.mean()), 4)}
+
+
+def applications(n, seed=1):
+    """Valid /predict payloads drawn from the synthetic data (rows the schema would reject are skipped)."""
+    import pandas as pd
+
+    df = pd.read_parquet(synthetic_dataset(max(n * 2, 10_000), seed))
+    df = df[(df['person_emp_length'] <= 60) & df['loan_int_rate'].notna() & (df['person_age'] <= 100)]
+    df = df.drop(columns=['loan_status', 'loan_percent_income'])
+    return df.head(n).to_dict(orient='records')
+
+
+def _wait_ready(port, timeout=120.0):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/readyz")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"API on port {port} not ready within {timeout}s")
+
+
+# --- Cases: each returns a dict of metrics ---
+
+def case_predict_testclient(requests, scratch, **_):
+    from fastapi.testclient import TestClient
+
+    api = isolated_api(scratch)
+    payloads = applications(requests)
+    with TestClient(api.app) as client:
+        while client.get("/readyz").status_code != 200:
+            time.sleep(0.05)
+        for payload in payloads[:20]:
+            client.post("/predict", json=payload)  # warm-up
+        timings = []
+        for payload in payloads:
+            start = time.perf_counter()
+            response = client.post("/predict", json=payload)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+    return {"requests": len(timings), **percentiles_ms(timings)}
+
+
+def case_predict_load(requests, scratch, concurrency=8, port=8799, **_):
+    """uvicorn in its own process, `concurrency` keep-alive clients in this one (peak RSS is the clients')."""
+    context = multiprocessing.get_context("spawn")
+    server = context.Process(target=serve, args=(port, scratch), daemon=True)
+    server.start()
+    try:
+        _wait_ready(port)
+        payloads = [json.dumps(p) for p in applications(requests)]
+        timings, errors = [], [0]
+        lock = threading.Lock()
+
+        def client(worker):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            local = []
+            for body in payloads[worker::concurrency]:
+                start = time.perf_counter()
+                conn.request("POST", "/predict", body, {"content-type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                local.append(time.perf_counter() - start)
+                if response.status != 200:
+                    with lock:
+                        errors[0] += 1
+            with lock:
+                timings.extend(local)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.join()
+    return {"requests": len(timings), "concurrency": concurrency, "errors": errors[0],
+            "requests_per_second": round(len(timings) / elapsed, 1), **percentiles_ms(timings)}
+
+
+def case_batch_inference(rows, scratch, **_):
+    from src.inference import batch_predict
+    from src.inference.prediction_log import RotatingLogWriter
+    from src.monitoring import instrumentation
+    from src.monitoring.performance_store import PerformanceStore
+
+    # Same work as production (logging included), written to the scratch dir
+    instrumentation.RUN_REPORT_DIR = os.path.join(scratch, "run_reports")
+    batch_predict.load_performance_store = lambda: PerformanceStore(os.path.join(scratch, "performance.sqlite"))
+    batch_predict.load_prediction_writer = lambda: RotatingLogWriter(os.path.join(scratch, "prediction_log"), "batch", "parquet")
+    batch_predict.load_drift_window = lambda: None
+
+    path = synthetic_dataset(rows)
+    start = time.perf_counter()
+    batch_predict.run_batch_inference(path, os.path.join(scratch, "batch_results.csv"))
+    seconds = time.perf_counter() - start
+
+    # Per-stage throughput from the job's own run report; rows/sec excludes loading the model
+    with open(os.path.join(instrumentation.RUN_REPORT_DIR, os.listdir(instrumentation.RUN_REPORT_DIR)[0])) as f:
+        stages = json.load(f)['stages']
+    load_seconds = stages['load_artifacts']['seconds']
+    return {"rows": rows, "total_seconds": round(seconds, 4), "load_seconds": round(load_seconds, 4),
+            "rows_per_second": round(rows / (seconds - load_seconds), 1),
+            **{f"{name}_rows_per_second": stage['rows_per_second'] for name, stage in stages.items()
+               if stage['rows_per_second']}}
+
+
+def case_feature_engineering(rows, **_):
+    import pandas as pd
+    from src.features.feature_defs import CreditFeatureEngineer
+
+    df = pd.read_parquet(synthetic_dataset(rows)).drop(columns=['loan_status'])
+    engineer = CreditFeatureEngineer().fit(df)
+    timings = []
+    # Millisecond-scale calls on small frames need more repeats for a stable median
+    for _ in range(min(max(3, 1_000_000 // rows), 50)):
+        start = time.perf_counter()
+        engineer.transform(df)
+        timings.append(time.perf_counter() - start)
+    seconds = float(np.median(timings))
+    return {"rows": rows, "transform_seconds": round(seconds, 6), "rows_per_second": round(rows / seconds, 1)}
+
+
+def case_validation(rows, scratch, **_):
+    from src.data.validation import run_validation
+
+    # run_validation reads configs/data.yaml from the working directory: point a copy at the synthetic file
+    with open("configs/data.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config['data_paths']['raw_store'] = os.path.abspath(synthetic_dataset(rows))
+    config['data_paths']['validated'] = os.path.join(scratch, "validated.parquet")
+    config['validation']['quarantine_path'] = os.path.join(scratch, "quarantine.parquet")
+    config['validation']['report_path'] = os.path.join(scratch, "validation_report.json")
+    os.makedirs(os.path.join(scratch, "configs"), exist_ok=True)
+    with open(os.path.join(scratch, "configs", "data.yaml"), "w") as f:
+        yaml.safe_dump(config, f)
+
+    os.chdir(scratch)
+    start = time.perf_counter()
+    run_validation()
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "total_seconds": round(seconds, 4), "rows_per_second": round(rows / seconds, 1)}
+
+
+def case_training(rows, scratch, rounds=50, **_):
+    from benchmarks.bench_out_of_core import build_feature_set
+    from src.features.feature_store import FeatureStore
+    from src.training.train import train_in_memory
+
+    store = FeatureStore(base_path=os.path.join(scratch, "features"))
+    build_feature_set(store, rows)
+    with open("configs/training.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config['model']['params']['n_estimators'] = rounds
+
+    start = time.perf_counter()
+    _, stats = train_in_memory(config, store=store)
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "rounds": stats['rounds'], "fit_seconds": round(seconds, 4),
+            "round_ms": round(stats['seconds_per_round'] * 1000, 3)}
+
+
+CASES = {
+    # name -> (function, scales with the profile's sizes)
+    'predict_testclient': (case_predict_testclient, False),
+    'predict_load': (case_predict_load, False),
+    'batch_inference': (case_batch_inference, True),
+    'feature_engineering': (case_feature_engineering, True),
+    'validation': (case_validation, True),
+    'training': (case_training, True),
+}
+
+
+def _run_case(name, kwargs, scratch, queue):
+    from src.monitoring.instrumentation import peak_rss_bytes, reset_peak_rss
+
+    try:
+        reset_peak_rss()
+        metrics = CASES[name][0](scratch=scratch, **kwargs)
+        queue.put({**metrics, "peak_rss_mb": round(peak_rss_bytes() / 2**20, 1)})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(name, timeout=None, **kwargs):
+    """Runs a case in a fresh process; a crash, kill (e.g. OOM) or timeout comes back as {"error": ...}."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    # Created and removed here, so a killed case leaves nothing behind
+    scratch = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    process = context.Process(target=_run_case, args=(name, kwargs, scratch, queue))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if not process.is_alive():
+                # Killed outright: it never reported (one last look in case the result raced the exit)
+                try:
+                    result = queue.get(timeout=1.0)
+                except queue_module.Empty:
+                    result = {"error": f"case process died (exit code {process.exitcode})"}
+            elif deadline is not None and time.monotonic() > deadline:
+                process.terminate()
+                result = {"error": f"timed out after {timeout}s"}
+    process.join()
+    shutil.rmtree(scratch, ignore_errors=True)
+    return result
+
+
+# --- Results ---
+
+def environment():
+    import pandas, sklearn, xgboost
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {"commit": commit, "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "versions": {"numpy": np.__version__, "pandas": pandas.__version__,
+                         "scikit-learn": sklearn.__version__, "xgboost": xgboost.__version__}}
+
+
+def run_suite(profile, cases, rounds, concurrency, timeout=None):
+    settings = PROFILES[profile]
+    results = {}
+    for name in cases:
+        func, scaled = CASES[name]
+        runs = [(f"{name}[{rows}]", {"rows": rows}) for rows in settings['sizes']] if scaled \
+            else [(name, {"requests": settings['requests']})]
+        for key, kwargs in runs:
+            if name == 'training':
+                kwargs['rounds'] = rounds
+            if name == 'predict_load':
+                kwargs['concurrency'] = concurrency
+            print(f"▶ {key}", flush=True)
+            results[key] = run_case(name, timeout=timeout, **kwargs)
+            print(f"  {results[key]}", flush=True)
+    return {"environment": environment(), "profile": profile, "cases": list(cases), "results": results}
+
+
+def direction(metric):
+    for suffix, higher_is_better in DIRECTIONS.items():
+        if metric.endswith(suffix):
+            return higher_is_better
+    return None
+
+
+def compare(baseline, current, threshold):
+    """
+    Relative change of every shared metric; regressions are worse than `threshold`
+    in their direction. A case that failed now, or that the baseline has but this
+    run lacks (among the cases it ran), is a regression too.
+    """
+    rows, regressions = [], []
+    ran = set(current.get('cases', CASES))
+    for key in baseline['results']:
+        if key not in current['results'] and key.split("[")[0] in ran:
+            regressions.append(f"{key} (missing)")
+    for key, metrics in current['results'].items():
+        if 'error' in metrics:
+            regressions.append(f"{key} (failed: {metrics['error']})")
+            continue
+        before = baseline['results'].get(key, {})
+        for metric, value in metrics.items():
+            higher_is_better = direction(metric)
+            old = before.get(metric)
+            if higher_is_better is None or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            regressed = (-change if higher_is_better else change) > threshold
+            rows.append((key, metric, old, value, change, regressed))
+            if regressed:
+                regressions.append(f"{key} {metric}")
+    return rows, regressions
+
+
+def print_comparison(rows, threshold):
+    print(f"{'case':<32}{'metric':<34}{'baseline':>12}{'current':>12}{'change':>9}")
+    for key, metric, old, value, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<32}{metric:<34}{old:>12.4g}{value:>12.4g}{change:>+8.1%}{flag}")
+    print(f"(regression threshold {threshold:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inference, batch, feature, validation and training benchmarks.")
+    parser.add_argument("--profile", choices=list(PROFILES), default="quick")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--rounds", type=int, default=50, help="Boosting rounds for the training case")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients for the load-generated /predict case")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a case is stopped and failed")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = parser.parse_args()
+
+    report = run_suite(args.profile, args.cases, args.rounds, args.concurrency, args.timeout)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results: {output}")
+    if args.json:
+        print(json.dumps(report, indent=4))
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, report, args.threshold)
+        print_comparison(rows, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
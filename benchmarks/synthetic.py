@@ -0,0 +1,98 @@
+## synthetic.py
+## Realistic synthetic loan applications at any size for the benchmark suite.
+## Rows are bootstrapped from notebooks/credit_risk_dataset.csv, so the joint
+## distribution (grade vs rate vs default, missing values, the outliers
+## validation quarantines) carries over. Numerical features from
+## configs/data.yaml are jittered so rows are not exact copies, and
+## loan_percent_income is recomputed. Files are written chunk by chunk
+## (10M rows never sit in memory) and cached by size and seed.
+##
+##   python -m benchmarks.synthetic --rows 1000000 [--seed 0]
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yaml
+
+DATASET_PATH = "notebooks/credit_risk_dataset.csv"
+DATA_DIR = "benchmarks/.data"
+CHUNK_ROWS = 1_000_000
+
+# Relative noise per numerical feature (multiplicative), integers stay integers
+JITTER = {
+    'person_income': 0.05,
+    'loan_amnt': 0.05,
+    'loan_int_rate': 0.02,
+    'person_age': 0.03,
+    'person_emp_length': 0.1,
+    'cb_person_cred_hist_length': 0.1
+}
+
+
+def load_schema(path="configs/data.yaml"):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)['schema']
+
+
+def synthesize_chunks(rows, seed=0, chunk_rows=CHUNK_ROWS, source=DATASET_PATH):
+    """Yields DataFrames (same columns and dtypes as the source) totalling `rows` rows."""
+    schema = load_schema()
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        chunk = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        for col in schema['numerical_features']:
+            values = chunk[col].to_numpy(dtype=np.float64)
+            values = values * rng.normal(1.0, JITTER.get(col, 0.02), n)
+            if pd.api.types.is_integer_dtype(base[col]):
+                chunk[col] = np.maximum(np.rint(values), 0).astype(base[col].dtype)
+            else:
+                # NaNs stay NaN, so the missing-value rate is preserved
+                chunk[col] = np.round(np.maximum(values, 0), 2)
+        if 'loan_percent_income' in chunk:
+            chunk['loan_percent_income'] = np.round(chunk['loan_amnt'] / chunk['person_income'], 2)
+        yield chunk
+
+
+def write_synthetic(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Writes a Parquet (or CSV, by extension) file; returns `path`."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    writer = None
+    try:
+        for i, chunk in enumerate(synthesize_chunks(rows, seed, chunk_rows)):
+            if path.endswith(".csv"):
+                chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+                continue
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+            writer.write_table(table, row_group_size=100_000)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def synthetic_dataset(rows, seed=0, fmt="parquet", data_dir=DATA_DIR):
+    """Path of the cached synthetic file with `rows` rows, generated on first use."""
+    path = os.path.join(data_dir, f"loans_{rows}_seed{seed}.{fmt}")
+    if not os.path.exists(path):
+        write_synthetic(path, rows, seed)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic loan applications.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    args = parser.parse_args()
+    print(synthetic_dataset(args.rows, args.seed, args.format))
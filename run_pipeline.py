@@ -1,57 +1,173 @@
 ##run_pipeline.py
 
+import argparse
 import logging
+import os
 import sys
+import yaml
 from src.data.ingestion import run_ingestion
 from src.data.validation import run_validation
 from src.data.splits import create_splits
 from src.features.transformations import run_transformations
+from src.features.feature_store import FeatureStore
 from src.training.tune import run_tuning
 from src.training.train import run_training
 from src.training.evaluate import run_evaluation
 from src.training.register import register_model
+from src.inference.batch_predict import run_batch_inference
+from src.monitoring.data_drift import check_data_drift
+from src.monitoring.model_drift import check_model_drift
+from src.orchestration.cache import ConfigSection, Stage, StageCache
+from src.orchestration.dag import DagExecutor, select_stages
 
 # Configure logging to show the flow in the console
+# (force=True: the src modules above already installed their own basicConfig)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout),
         logging.FileHandler("pipeline.log")
-    ]
+    ],
+    force=True
 )
 
-def main():
+def feature_set_path(name):
+    # The LATEST pointer only changes when a feature set's content changes
+    return FeatureStore().pointer_path(name)
+
+def run_alert_scan():
+    # alerts.py opens its log file at import time, so import it lazily
+    os.makedirs("models/monitoring", exist_ok=True)
+    from src.monitoring.alerts import run_alerts
+
+    # Root logging is already configured here, so attach the alert audit log explicitly
+    handler = logging.FileHandler("models/monitoring/alerts.log")
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - 🚨 ALERT_SYSTEM: %(message)s'))
+    logging.getLogger().addHandler(handler)
     try:
-        logging.info("🚀 Starting End-to-End Credit Risk Pipeline")
+        run_alerts()
+    finally:
+        logging.getLogger().removeHandler(handler)
+        handler.close()
 
-        # --- DATA PHASE ---
-        logging.info("Step 1/8: Ingesting Raw Data...")
-        run_ingestion()
+def build_stages():
+    """Declares every step, its dependencies and the inputs/outputs its cache key is built from."""
+    with open("configs/data.yaml", "r") as f:
+        data = yaml.safe_load(f)
+    paths = data['data_paths']
 
-        logging.info("Step 2/8: Running Data Validation & Outlier Detection...")
-        run_validation()
+    data_cfg = lambda key: ConfigSection("configs/data.yaml", key)
+    train_features = feature_set_path("train_processed")
+    test_features = feature_set_path("test_processed")
+    registered_model = "models/registry/credit_model_latest.joblib"
 
-        logging.info("Step 3/8: Creating Stratified Train/Test/Drift Splits...")
-        create_splits()
+    return [
+        # --- DATA PHASE ---
+        Stage("ingestion", run_ingestion, description="Ingesting Raw Data...",
+              inputs=[paths['raw_path'], data_cfg('data_paths'), data_cfg('schema'), data_cfg('storage')],
+              outputs=[paths['raw_store']]),
+        Stage("validation", run_validation, deps=["ingestion"],
+              description="Running Data Validation & Outlier Detection...",
+              inputs=[paths['raw_store'], data_cfg('data_paths'), data_cfg('schema'),
+                      data_cfg('validation'), data_cfg('storage')],
+              outputs=[paths['validated'], data['validation']['quarantine_path'],
+                       data['validation']['report_path']]),
+        Stage("splits", create_splits, deps=["validation"],
+              description="Creating Stratified Train/Test/Drift Splits...",
+              inputs=[paths['validated'], data_cfg('data_paths'), data_cfg('schema'), data_cfg('storage')],
+              outputs=[paths['processed_train'], paths['processed_test'], paths['drift_test']]),
 
         # --- FEATURE PHASE ---
-        logging.info("Step 4/8: Engineering Ratios & Building Transformation Pipeline...")
-        run_transformations()
+        Stage("transformations", run_transformations, deps=["splits"],
+              description="Engineering Ratios & Building Transformation Pipeline...",
+              inputs=[paths['processed_train'], paths['processed_test'], data_cfg('data_paths'),
+                      data_cfg('schema'), ConfigSection("configs/features.yaml")],
+              outputs=[train_features, test_features, "models/preprocessing_pipeline.joblib"]),
 
         # --- MODEL PHASE ---
-        logging.info("Step 5/8: Starting Hyperparameter Optimization (Tuning)...")
-        run_tuning()
+        Stage("tuning", run_tuning, deps=["transformations"],
+              description="Starting Hyperparameter Optimization (Tuning)...",
+              inputs=[train_features, ConfigSection("configs/training.yaml", "tuning")],
+              outputs=[ConfigSection("configs/training.yaml", "model.params")]),
+        Stage("training", run_training, deps=["tuning"],
+              description="Training Final Model with Optimal Parameters...",
+              inputs=[train_features, ConfigSection("configs/training.yaml", "model")],
+              outputs=["models/xgboost_model.joblib"]),
+        Stage("evaluation", run_evaluation, deps=["training"],
+              description="Evaluating Model on Holdout Test Set...",
+              inputs=["models/xgboost_model.joblib", test_features],
+              outputs=["models/evaluation_report.json"]),
 
-        logging.info("Step 6/8: Training Final Model with Optimal Parameters...")
-        run_training()
+        # --- DEPLOYMENT PHASE ---
+        # Not cacheable: restoring LATEST from the cache would roll back any version
+        # registered since (e.g. by `make refresh`). An unchanged candidate is found in
+        # the registry and not registered twice.
+        Stage("register", register_model, kwargs={"threshold": 0.80}, deps=["evaluation"], cacheable=False,
+              description="Model Registration & Gatekeeping...",
+              inputs=["models/evaluation_report.json", "models/xgboost_model.joblib"],
+              outputs=[registered_model, "models/registry/LATEST"]),
+        # Not cacheable: besides its output file it logs predictions (performance store,
+        # prediction log) and sketches the drift window, which model_drift reads
+        Stage("batch_scoring", run_batch_inference, deps=["register", "splits"], cacheable=False,
+              description="Batch Scoring the Drift Set...",
+              kwargs={"input_path": paths['drift_test'], "output_path": "data/predictions/batch_results.csv"},
+              inputs=[paths['drift_test'], registered_model, "models/registry/LATEST",
+                      "models/preprocessing_pipeline.joblib"],
+              outputs=["data/predictions/batch_results.csv"]),
 
-        logging.info("Step 7/8: Evaluating Model on Holdout Test Set...")
-        run_evaluation()
+        # --- MONITORING PHASE (always re-run) ---
+        Stage("data_drift", check_data_drift, deps=["splits"], cacheable=False,
+              description="Checking Data Drift (KS Test)..."),
+        # Joins the drift set's labels to the predictions batch scoring logged (no re-scoring)
+        Stage("model_drift", check_model_drift, deps=["batch_scoring", "splits"], cacheable=False,
+              description="Checking Rolling Model Performance on Labeled Predictions..."),
+        Stage("alerts", run_alert_scan, deps=["data_drift", "model_drift", "evaluation"], cacheable=False,
+              description="Scanning Monitoring Reports for Alerts..."),
+    ]
 
-        # --- DEPLOYMENT PHASE ---
-        logging.info("Step 8/8: Model Registration & Gatekeeping...")
-        register_model(threshold=0.80)
+STAGE_GROUPS = {
+    "train": ["ingestion", "validation", "splits", "transformations",
+              "tuning", "training", "evaluation", "register"],
+    "score": ["batch_scoring"],
+    "monitor": ["data_drift", "model_drift", "alerts"],
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end credit risk pipeline.")
+    parser.add_argument("--stages", nargs="+", default=None, metavar="STAGE",
+                        help=f"Stages or groups ({', '.join(STAGE_GROUPS)}) to run; default: everything")
+    parser.add_argument("--no-deps", action="store_true",
+                        help="Run only the selected stages, assuming their dependencies are up to date")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel stage processes (default: all cores)")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE",
+                        help="Re-run STAGE even on a cache hit (repeatable, or 'all')")
+    parser.add_argument("--no-cache", action="store_true", help="Run every stage without the cache")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    try:
+        logging.info("🚀 Starting End-to-End Credit Risk Pipeline")
+        stages = build_stages()
+        names = {stage.name for stage in stages}
+
+        unknown = set(args.force) - names - {"all"}
+        if unknown:
+            raise ValueError(f"Unknown stage(s) for --force: {sorted(unknown)}")
+        if args.stages:
+            targets = [name for s in args.stages for name in STAGE_GROUPS.get(s, [s])]
+            stages = select_stages(stages, targets, with_deps=not args.no_deps)
+
+        executor = DagExecutor(
+            stages,
+            cache=None if args.no_cache else StageCache(),
+            max_workers=args.workers,
+            force=args.force
+        )
+        executor.run()
+        executor.log_report()
+        logging.info(f"Run report: {executor.run_report().save()}")
 
         logging.info("✅ Pipeline Completed Successfully!")
 
@@ -60,4 +176,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,169 @@
+## dataset_io.py
+## Shared dataset I/O for every pipeline stage: typed, compressed Parquet
+## intermediates with column projection (CSV still supported for raw inputs).
+
+import os
+import logging
+import pandas as pd
+import yaml
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+
+def load_config(path="configs/data.yaml"):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def dataset_path(key, config=None):
+    """Resolves a named dataset (e.g. 'validated', 'drift_test') from `data_paths`."""
+    config = config or load_config()
+    return config['data_paths'][key]
+
+
+def is_parquet(path):
+    return str(path).lower().endswith(PARQUET_EXTENSIONS)
+
+
+def _categorical_columns(config):
+    return config['schema']['categorical_features']
+
+
+def read_dataset(path, columns=None, config=None):
+    """
+    Loads a dataset, reading only `columns` when given.
+    Categorical features come back with the `category` dtype for both formats.
+    """
+    config = config or load_config()
+    categorical = _categorical_columns(config)
+
+    if is_parquet(path):
+        return pd.read_parquet(path, columns=columns)
+
+    wanted = None if columns is None else set(columns)
+    dtypes = {c: 'category' for c in categorical if wanted is None or c in wanted}
+    return pd.read_csv(path, usecols=columns, dtype=dtypes)
+
+
+def iter_dataset(path, chunk_size, columns=None, config=None):
+    """Yields the dataset as DataFrames of at most `chunk_size` rows."""
+    config = config or load_config()
+
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    wanted = None if columns is None else set(columns)
+    dtypes = {c: 'category' for c in _categorical_columns(config) if wanted is None or c in wanted}
+    with pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def count_rows(path):
+    """Row count from Parquet metadata, or by counting CSV lines (header excluded)."""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+
+    lines, last = 0, b"\n"
+    with open(path, "rb") as f:
+        while block := f.read(16 * 1024 * 1024):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    # A last line without a trailing newline still counts
+    return max(lines + (last != b"\n") - 1, 0)
+
+
+def write_dataset(df, path, config=None):
+    """
+    Writes a dataset; Parquet output gets categorical dtypes and the codec from
+    `storage.compression` in configs/data.yaml.
+    """
+    config = config or load_config()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if not is_parquet(path):
+        df.to_csv(path, index=False)
+        return
+
+    categorical = [c for c in _categorical_columns(config) if c in df.columns]
+    df = df.astype({c: 'category' for c in categorical}) if categorical else df
+    storage = config.get('storage', {})
+    df.to_parquet(
+        path,
+        index=False,
+        compression=storage.get('compression', 'zstd'),
+        row_group_size=storage.get('row_group_size')
+    )
+    logging.info(f"Wrote {len(df)} rows to {path}")
+
+
+class DatasetWriter:
+    """
+    Appends DataFrame chunks to one dataset, for stages that stream their input.
+    Output goes to `<path>.part` and is moved into place on close, so readers
+    never see a half-written file.
+    """
+
+    def __init__(self, path, config=None):
+        self.config = config or load_config()
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._csv_header = True
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, df):
+        """Appends one chunk; an empty chunk still fixes the output schema."""
+        if not is_parquet(self.path):
+            df.to_csv(self.part_path, index=False, mode="w" if self._csv_header else "a",
+                      header=self._csv_header)
+            self._csv_header = False
+            self.rows += len(df)
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        categorical = [c for c in _categorical_columns(self.config) if c in df.columns]
+        df = df.astype({c: 'category' for c in categorical}) if categorical else df
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            # Chunks have different category sets, so pin one dictionary index type
+            self._schema = pa.schema([
+                field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                if pa.types.is_dictionary(field.type) else field
+                for field in table.schema
+            ], metadata=table.schema.metadata)
+            storage = self.config.get('storage', {})
+            self._writer = pq.ParquetWriter(self.part_path, self._schema,
+                                            compression=storage.get('compression', 'zstd'))
+            self._row_group_size = storage.get('row_group_size')
+        self._writer.write_table(table.cast(self._schema), row_group_size=self._row_group_size)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.part_path):
+            os.replace(self.part_path, self.path)
+            logging.info(f"Wrote {self.rows} rows to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Leave the previous output untouched on failure
+            if self._writer is not None:
+                self._writer.close()
+            if os.path.exists(self.part_path):
+                os.remove(self.part_path)
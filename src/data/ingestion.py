@@ -1,10 +1,10 @@
 ##Ingestion.py
 
-import pandas as pd
 import yaml
 import shutil
 import os
 import logging
+from src.data.dataset_io import read_dataset, write_dataset
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
@@ -28,10 +28,10 @@ def run_ingestion():
         return
 
     # 3. Load and Save Initial Copy
-    # We load and save to ensure we have a 'working copy' in our raw folder
-    df = pd.read_csv(source_path)
-    raw_store_path = os.path.join(target_dir, "credit_risk_raw.csv")
-    df.to_csv(raw_store_path, index=False)
+    # We load and save to ensure we have a typed Parquet 'working copy' in our raw folder
+    df = read_dataset(source_path, config=config)
+    raw_store_path = config['data_paths']['raw_store']
+    write_dataset(df, raw_store_path, config=config)
     
     logging.info(f"Ingestion successful. Raw data stored at {raw_store_path}")
 
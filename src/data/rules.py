@@ -0,0 +1,247 @@
+## rules.py
+## Config-driven validation rules (configs/data.yaml -> validation.rules),
+## compiled once and evaluated as one vectorized pass per chunk: every column is
+## pulled out as a NumPy array once, each rule ORs its violations into a shared
+## mask, and only the per-rule counts and a bit per failed rule are kept.
+
+import operator
+import numpy as np
+import pandas as pd
+
+CROSS_FIELD_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Column holding the failed-rule bits of a quarantined row (bit i = rules[i])
+VIOLATION_COLUMN = "violation_mask"
+MAX_RULES = 63
+
+
+class Rule:
+    """
+    One check. `violations(columns)` returns a boolean array that is True where
+    a row breaks the rule. Missing values pass unless `allow_null` is False,
+    so null checks stay explicit in the config.
+    """
+
+    kind = None
+
+    def __init__(self, name, column, allow_null=True):
+        self.name = name
+        self.column = column
+        self.allow_null = allow_null
+
+    @property
+    def columns(self):
+        return [self.column]
+
+    def describe(self):
+        return {"type": self.kind, "column": self.column}
+
+    def violations(self, columns):
+        raise NotImplementedError
+
+
+class NotNullRule(Rule):
+    kind = "not_null"
+
+    def __init__(self, name, column):
+        super().__init__(name, column, allow_null=False)
+
+    def violations(self, columns):
+        return columns.isnull(self.column)
+
+
+class RangeRule(Rule):
+    kind = "range"
+
+    def __init__(self, name, column, min=None, max=None, allow_null=True):
+        super().__init__(name, column, allow_null)
+        self.min = min
+        self.max = max
+
+    def describe(self):
+        return {**super().describe(), "min": self.min, "max": self.max}
+
+    def violations(self, columns):
+        values = columns.numeric(self.column)
+        # NaN compares False, so missing values only fail through allow_null
+        bad = np.zeros(len(values), dtype=bool)
+        if self.min is not None:
+            np.logical_or(bad, values < self.min, out=bad)
+        if self.max is not None:
+            np.logical_or(bad, values > self.max, out=bad)
+        if not self.allow_null:
+            np.logical_or(bad, columns.isnull(self.column), out=bad)
+        return bad
+
+
+class CategoryRule(Rule):
+    kind = "category"
+
+    def __init__(self, name, column, values, allow_null=True):
+        super().__init__(name, column, allow_null)
+        self.values = list(values)
+
+    def describe(self):
+        return {**super().describe(), "values": self.values}
+
+    def violations(self, columns):
+        series = columns.series(self.column)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Check each category once, then gather by code; code -1 (missing)
+            # picks the last lookup slot
+            lookup = np.append(~series.cat.categories.isin(self.values), not self.allow_null)
+            return lookup[series.cat.codes.to_numpy()]
+        bad = ~series.isin(self.values).to_numpy()
+        if self.allow_null:
+            bad &= ~columns.isnull(self.column)
+        return bad
+
+
+class CrossFieldRule(Rule):
+    """`column <op> other + offset` must hold, e.g. emp_length <= age - 14."""
+
+    kind = "cross_field"
+
+    def __init__(self, name, column, op, other, offset=0.0):
+        super().__init__(name, column)
+        if op not in CROSS_FIELD_OPS:
+            raise ValueError(f"Rule '{name}': unknown operator '{op}' (use one of {list(CROSS_FIELD_OPS)})")
+        self.op = op
+        self.other = other
+        self.offset = offset
+
+    @property
+    def columns(self):
+        return [self.column, self.other]
+
+    def describe(self):
+        return {**super().describe(), "op": self.op, "other": self.other, "offset": self.offset}
+
+    def violations(self, columns):
+        left = columns.numeric(self.column)
+        right = columns.numeric(self.other) + self.offset
+        bad = ~CROSS_FIELD_OPS[self.op](left, right)
+        # Rows with either side missing are left to the null/range rules
+        bad &= ~(columns.isnull(self.column) | columns.isnull(self.other))
+        return bad
+
+
+RULE_TYPES = {cls.kind: cls for cls in (NotNullRule, RangeRule, CategoryRule, CrossFieldRule)}
+
+
+class ColumnCache:
+    """Per-chunk column views, so several rules on one column convert it once."""
+
+    def __init__(self, df):
+        self.df = df
+        self._numeric = {}
+        self._null = {}
+
+    def series(self, column):
+        return self.df[column]
+
+    def numeric(self, column):
+        if column not in self._numeric:
+            series = self.df[column]
+            if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iuf":
+                # Plain NumPy columns are compared as-is, no float copy
+                self._numeric[column] = series.to_numpy()
+            else:
+                self._numeric[column] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return self._numeric[column]
+
+    def isnull(self, column):
+        if column not in self._null:
+            self._null[column] = self.df[column].isna().to_numpy()
+        return self._null[column]
+
+
+def compile_rules(rule_configs):
+    """Builds Rule objects from the `validation.rules` list of configs/data.yaml."""
+    rules = []
+    for spec in rule_configs:
+        spec = dict(spec)
+        kind = spec.pop("type")
+        if kind not in RULE_TYPES:
+            raise ValueError(f"Unknown validation rule type '{kind}' (use one of {list(RULE_TYPES)})")
+        rules.append(RULE_TYPES[kind](**spec))
+
+    names = [rule.name for rule in rules]
+    if len(set(names)) != len(names):
+        raise ValueError("Validation rule names must be unique")
+    if len(rules) > MAX_RULES:
+        raise ValueError(f"At most {MAX_RULES} validation rules are supported")
+    return rules
+
+
+class RuleEngine:
+    """Evaluates compiled rules chunk by chunk and accumulates violation counts."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.columns = sorted({c for rule in rules for c in rule.columns})
+        self.counts = np.zeros(len(rules), dtype=np.int64)
+        self.rows = 0
+        self.quarantined = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(compile_rules(config['validation']['rules']))
+
+    def check_columns(self, df):
+        missing = set(self.columns) - set(df.columns)
+        if missing:
+            raise ValueError(f"Validation rules reference missing columns: {sorted(missing)}")
+
+    def evaluate(self, df):
+        """
+        Returns a boolean array of invalid rows plus, for those rows only, an
+        int64 bitmask of the rules they failed. Updates the running counts.
+        """
+        self.check_columns(df)
+        columns = ColumnCache(df)
+        invalid = np.zeros(len(df), dtype=bool)
+        violations = []
+        for bit, rule in enumerate(self.rules):
+            bad = rule.violations(columns)
+            self.counts[bit] += np.count_nonzero(bad)
+            np.logical_or(invalid, bad, out=invalid)
+            violations.append(bad)
+
+        # Bitmasks are only built for the (usually few) failing rows
+        rows = np.flatnonzero(invalid)
+        mask = np.zeros(len(rows), dtype=np.int64)
+        for bit, bad in enumerate(violations):
+            mask |= bad[rows].astype(np.int64) << bit
+
+        self.rows += len(df)
+        self.quarantined += len(rows)
+        return invalid, mask
+
+    def split(self, df):
+        """(valid rows, quarantined rows with their violation bitmask)."""
+        invalid, mask = self.evaluate(df)
+        quarantine = df[invalid].assign(**{VIOLATION_COLUMN: mask})
+        return df[~invalid], quarantine
+
+    def report(self):
+        return {
+            "rows": int(self.rows),
+            "valid": int(self.rows - self.quarantined),
+            "quarantined": int(self.quarantined),
+            "rules": [
+                {"name": rule.name, "bit": bit, **rule.describe(), "violations": int(self.counts[bit])}
+                for bit, rule in enumerate(self.rules)
+            ],
+        }
+
+    def failed_rules(self, mask_value):
+        """Rule names encoded in one quarantined row's violation bitmask."""
+        return [rule.name for bit, rule in enumerate(self.rules) if int(mask_value) >> bit & 1]
@@ -3,6 +3,7 @@ import yaml
 import os
 from sklearn.model_selection import train_test_split
 import logging
+from src.data.dataset_io import read_dataset, write_dataset
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
@@ -15,13 +16,13 @@ def create_splits():
         config = yaml.safe_load(f)
     
     # This now matches the output of validation.py
-    input_path = "data/processed/train_validated.csv"
+    input_path = config['data_paths']['validated']
     
     if not os.path.exists(input_path):
         logging.error(f"CRITICAL: {input_path} not found! Check validation.py logic.")
         return
 
-    df = pd.read_csv(input_path)
+    df = read_dataset(input_path, config=config)
     target = config['schema']['target']
 
     # 1. Separate 'Future' Drift set (15%)
@@ -35,12 +36,12 @@ def create_splits():
     )
 
     # Save everything to data/processed/ (except the drift test)
-    train_df.to_csv("data/processed/train_final.csv", index=False)
-    test_df.to_csv("data/processed/test_final.csv", index=False)
+    paths = config['data_paths']
+    write_dataset(train_df, paths['processed_train'], config=config)
+    write_dataset(test_df, paths['processed_test'], config=config)
     
     # Save drift test to data/validation/ as intended
-    os.makedirs("data/validation", exist_ok=True)
-    validation_df.to_csv("data/validation/drift_test.csv", index=False)
+    write_dataset(validation_df, paths['drift_test'], config=config)
 
     logging.info("Splits created and stored in data/processed/ and data/validation/")
     '''
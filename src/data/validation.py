@@ -1,9 +1,12 @@
 ##validation.py
 
-import pandas as pd
+import json
+import time
 import yaml
 import logging
 import os
+from src.data.dataset_io import DatasetWriter, iter_dataset
+from src.data.rules import RuleEngine
 
 # Setup logging for the portfolio
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -17,8 +20,6 @@ def validate_data(df, config):
     Performs data quality checks based on the data.yaml config.
     Returns: Cleaned DataFrame and a boolean indicating if it passed.
     """
-    is_valid = True
-    
     # 1. Column Check
     required_cols = config['schema']['numerical_features'] + \
                     config['schema']['categorical_features'] + \
@@ -29,52 +30,50 @@ def validate_data(df, config):
         logging.error(f"Missing columns: {missing}")
         return df, False
 
-    # 2. Logical Outlier Removal (Using YAML thresholds)
-    # Filter Age
-    max_age = config['validation']['max_age']
-    age_outliers = df[df['person_age'] > max_age]
-    if not age_outliers.empty:
-        logging.warning(f"Found {len(age_outliers)} rows where Age > {max_age}. Dropping.")
-        df = df[df['person_age'] <= max_age]
-
-    # Filter Employment Length
-    max_emp = config['validation']['max_emp_length']
-    emp_outliers = df[df['person_emp_length'] > max_emp]
-    if not emp_outliers.empty:
-        logging.warning(f"Found {len(emp_outliers)} rows where Emp Length > {max_emp}. Dropping.")
-        df = df[df['person_emp_length'] <= max_emp]
-        
-    # Logic check: Employment length cannot exceed age
-    # We assume people start working at 14 at the absolute earliest
-    logic_error = df[df['person_emp_length'] > (df['person_age'] - 14)]
-    if not logic_error.empty:
-        logging.warning(f"Found {len(logic_error)} rows where Emp Length > (Age - 14). Dropping.")
-        df = df.drop(logic_error.index)
+    # 2. Rule Checks (ranges, nulls, category domains, cross-field logic) in one pass
+    engine = RuleEngine.from_config(config)
+    df, _ = engine.split(df)
+    log_report(engine.report())
+    return df, True
 
-    return df, is_valid
+def log_report(report):
+    for rule in report['rules']:
+        if rule['violations']:
+            logging.warning(f"Rule '{rule['name']}' ({rule['type']} on {rule['column']}): "
+                            f"{rule['violations']} violations")
+    logging.info(f"{report['quarantined']} of {report['rows']} rows quarantined, {report['valid']} kept")
 
 def run_validation():
     #config = load_config()
     with open("configs/data.yaml", 'r') as f:
         config = yaml.safe_load(f)
+    settings = config['validation']
     
     # Load the raw data we just ingested
-    raw_path = "data/raw/credit_risk_raw.csv"
+    raw_path = config['data_paths']['raw_store']
     if not os.path.exists(raw_path):
         logging.error(f"Raw data not found at {raw_path}")
         return
 
-    df = pd.read_csv(raw_path)
-    
     # --- VALIDATION LOGIC ---
-    # (Age check, Emp Length check as we wrote before)
-    df = df[df['person_age'] <= config['validation']['max_age']]
-    df = df[df['person_emp_length'] <= config['validation']['max_emp_length']]
-    
-    # --- THE FIX: Save to PROCESSED folder ---
-    os.makedirs("data/processed", exist_ok=True)
-    output_path = "data/processed/train_validated.csv"
-    df.to_csv(output_path, index=False)
+    # Rules from data.yaml, applied chunk by chunk: valid rows go to the PROCESSED
+    # folder, failing rows (with a bitmask of the rules they broke) to quarantine
+    engine = RuleEngine.from_config(config)
+    output_path = config['data_paths']['validated']
+    start = time.perf_counter()
+    with DatasetWriter(output_path, config=config) as valid_out, \
+         DatasetWriter(settings['quarantine_path'], config=config) as quarantine_out:
+        for chunk in iter_dataset(raw_path, settings['chunk_size'], config=config):
+            valid, quarantine = engine.split(chunk)
+            valid_out.write(valid)
+            quarantine_out.write(quarantine)
+
+    report = {**engine.report(), "source": raw_path, "quarantine_path": settings['quarantine_path'],
+              "seconds": round(time.perf_counter() - start, 3)}
+    os.makedirs(os.path.dirname(settings['report_path']), exist_ok=True)
+    with open(settings['report_path'], 'w') as f:
+        json.dump(report, f, indent=4)
+    log_report(report)
     
     logging.info(f"Validation complete. Cleaned data saved to {output_path}")
     """
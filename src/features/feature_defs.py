@@ -21,33 +21,88 @@ class CreditFeatureEngineer(BaseEstimator, TransformerMixin):
     def set_output(self, transform=None):
         return self
 
+    def _ratio_specs(self, columns):
+        """
+        (name, numerator, denominator, safe) for every ratio this transformer adds.
+        `safe` ratios treat a zero denominator as missing (-> 0); the static
+        cred_hist_age ratio is a plain division, so x/0 stays +-inf as before.
+        """
+        specs = [(r['name'], r['numerator'], r['denominator'], True) for r in self.feature_config]
+        # Static ratio: Credit history relative to age
+        if 'cb_person_cred_hist_length' in columns and 'person_age' in columns:
+            specs.append(('cred_hist_age_ratio', 'cb_person_cred_hist_length', 'person_age', False))
+        return specs
+
+    def _compile(self, columns):
+        """Resolves the ratio specs to column positions of the input."""
+        position = {col: i for i, col in enumerate(columns)}
+        return [(name, position[num], position[den], safe)
+                for name, num, den, safe in self._ratio_specs(columns)]
+
     def fit(self, X, y=None):
+        if not isinstance(X, pd.DataFrame):
+            raise ValueError("CreditFeatureEngineer must be fitted on a DataFrame to resolve column names.")
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.ratio_specs_ = self._compile(self.feature_names_in_)
         return self
 
+    def compute_ratios(self, X):
+        """
+        Returns (names, block): the ratio features as one preallocated
+        (n_rows, n_ratios) float64 array. The input is only read, never copied.
+        DataFrames are resolved by column name (so instances unpickled from
+        before `fit` stored its specs still work); ndarrays must have the
+        column order seen in `fit`.
+        """
+        if isinstance(X, pd.DataFrame):
+            specs = self._compile(X.columns)
+            column = lambda i: _as_numeric(X.iloc[:, i])
+        else:
+            if not hasattr(self, 'ratio_specs_'):
+                raise ValueError("CreditFeatureEngineer needs fit() on a DataFrame before transforming arrays.")
+            if X.shape[1] != self.n_features_in_:
+                raise ValueError(f"Expected {self.n_features_in_} columns (fit order), got {X.shape[1]}.")
+            specs = self.ratio_specs_
+            column = lambda i: np.asarray(X[:, i], dtype=np.float64)
+
+        block = np.zeros((len(X), len(specs)), dtype=np.float64, order='F')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for j, (_, num, den, safe) in enumerate(specs):
+                out = block[:, j]
+                num_values, den_values = column(num), column(den)
+                # Safe ratios leave 0 wherever the denominator is 0
+                np.divide(num_values, den_values, out=out, where=(den_values != 0) if safe else True)
+                # fillna(0): 0/0 and missing inputs become 0
+                np.copyto(out, 0.0, where=np.isnan(out))
+        return [name for name, *_ in specs], block
+
     def transform(self, X):
-        X_out = X.copy()
-        
-        # Apply ratios defined in YAML
-        for ratio in self.feature_config:
-            name = ratio['name']
-            num = ratio['numerator']
-            den = ratio['denominator']
-            
-            # Use np.where to handle division by zero safely
-            X_out[name] = X_out[num] / X_out[den].replace(0, np.nan)
-            # Fill NaNs resulting from 0/0 or division by zero with 0
-            X_out[name] = X_out[name].fillna(0)
+        names, block = self.compute_ratios(X)
+        if not isinstance(X, pd.DataFrame):
+            return np.hstack([X, block])
 
-        # Static ratio: Credit history relative to age
-        if 'cb_person_cred_hist_length' in X_out.columns and 'person_age' in X_out.columns:
-            X_out['cred_hist_age_ratio'] = X_out['cb_person_cred_hist_length'] / X_out['person_age']
-            X_out['cred_hist_age_ratio'] = X_out['cred_hist_age_ratio'].fillna(0)
-        
+        # Shallow copy: the input's columns are shared, only the ratios are new
+        new = pd.DataFrame(block, columns=names, index=X.index, copy=False)
+        existing = [name for name in names if name in X.columns]
+        if not existing:
+            return pd.concat([X, new], axis=1)
+        # Re-transformed frames keep their ratio columns in place
+        X_out = X.copy(deep=False)
+        for name in names:
+            X_out[name] = new[name]
         return X_out
 
+def _as_numeric(series):
+    """Plain NumPy columns are used as-is; nullable/extension columns become float64 with NaN."""
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iuf":
+        return series.to_numpy()
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
 def run_feature_definitions():
     # Test the class logic
-    train_df = pd.read_csv("data/processed/train_final.csv")
+    from src.data.dataset_io import dataset_path, read_dataset
+    train_df = read_dataset(dataset_path('processed_train'))
     engineer = CreditFeatureEngineer()
     
     # Transform
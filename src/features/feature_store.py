@@ -1,54 +1,264 @@
 ##feature_store.py
+## Versioned feature store. Each feature set lives in its own directory:
+##
+##   data/processed/<name>/
+##       LATEST                    <- pointer: the current version id
+##       v<version>/manifest.json  <- schema, row count, data hash, producer
+##       v<version>/part-0.parquet <- row-grouped (optionally hive-partitioned) data
+##       v<version>/X.npy, y.npy   <- optional float32 training matrix + labels
+##
+## Reads go through pyarrow datasets, so callers only pay for the columns and
+## row groups/partitions they ask for.
 
-import pandas as pd
+import hashlib
+import json
 import os
+import shutil
 import logging
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+from src.data.dataset_io import load_config
+
 logging.basicConfig(level=logging.INFO)
 
+LATEST = "LATEST"
+MANIFEST = "manifest.json"
+MATRIX_FILE = "X.npy"
+LABELS_FILE = "y.npy"
+MATRIX_DTYPE = "float32"
+HASH_CHUNK = 1024 * 1024
+
 class FeatureStore:
-    def __init__(self, base_path="data/processed"):
+    def __init__(self, base_path="data/processed", rows_per_file=1_000_000, config=None):
         self.base_path = base_path
+        self.rows_per_file = rows_per_file
+        storage = (config or load_config()).get('storage', {})
+        self.compression = storage.get('compression', 'zstd')
+        self.row_group_size = min(storage.get('row_group_size') or rows_per_file, rows_per_file)
         os.makedirs(self.base_path, exist_ok=True)
 
-    def save_features(self, df, name, version=None):
+    # --- Layout ---
+    def set_path(self, name):
+        return os.path.join(self.base_path, name)
+
+    def pointer_path(self, name):
+        """The LATEST pointer file; it changes exactly when a new version is published."""
+        return os.path.join(self.set_path(name), LATEST)
+
+    def version_path(self, name, version):
+        return os.path.join(self.set_path(name), f"v{version}")
+
+    def list_versions(self, name):
+        if not os.path.isdir(self.set_path(name)):
+            return []
+        return sorted(entry[1:] for entry in os.listdir(self.set_path(name))
+                      if entry.startswith("v") and os.path.exists(os.path.join(self.set_path(name), entry, MANIFEST)))
+
+    def resolve_version(self, name, version='latest'):
+        if version != 'latest':
+            return version.lstrip("v")
+        if not os.path.exists(self.pointer_path(name)):
+            raise FileNotFoundError(f"Feature set '{name}' has no published version in {self.base_path}.")
+        with open(self.pointer_path(name), "r") as f:
+            return f.read().strip()
+
+    def manifest(self, name, version='latest'):
+        path = os.path.join(self.version_path(name, self.resolve_version(name, version)), MANIFEST)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Feature set {name} v{version} not found in store.")
+        with open(path, "r") as f:
+            return json.load(f)
+
+    # --- Writes ---
+    def save_features(self, df, name, version=None, metadata=None, partition_by=None, target=None):
         """
-        Saves a feature set to the store as a Parquet file.
+        Saves a feature set as a new version and moves LATEST to it.
+        `metadata` (e.g. the producing pipeline's version) goes into the manifest.
+        With `target`, a float32 feature matrix and the label vector are also
+        written as .npy files for zero-copy training (see `load_matrix`).
+        If the data is identical to the current latest version, nothing is
+        written and that version is returned, so downstream caches stay valid.
         """
+        import pyarrow as pa
+
         if version is None:
-            version = datetime.now().strftime("%Y%m%d_%H%M")
-        
-        filename = f"{name}_v{version}.parquet"
-        path = os.path.join(self.base_path, filename)
-        
-        # Save as Parquet for efficiency
-        df.to_parquet(path, index=False)
-        
-        # Also maintain a 'latest' pointer for the training script
-        latest_path = os.path.join(self.base_path, f"{name}_latest.parquet")
-        df.to_parquet(latest_path, index=False)
-        
-        logging.info(f"Stored feature set '{name}' to {path}")
-
-    def load_features(self, name, version='latest'):
-        """
-        Retrieves a feature set by name and version.
-        """
-        filename = f"{name}_{version}.parquet"
-        path = os.path.join(self.base_path, filename)
-        
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Feature set {filename} not found in store.")
-            
-        return pd.read_parquet(path)
+            version = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Two saves within one second get distinct versions
+            base, n = version, 1
+            while os.path.exists(self.version_path(name, version)):
+                version, n = f"{base}_{n}", n + 1
+        version_dir = self.version_path(name, version)
+        if os.path.exists(version_dir):
+            raise FileExistsError(f"Feature set {name} v{version} already exists.")
+
+        # 1. Write the data next to its final place, then hash it
+        staging = f"{version_dir}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        if partition_by:
+            # Hive layout (col=value/...), so filters on these columns skip whole directories
+            for key, part in df.groupby(partition_by, observed=True, sort=True):
+                key = key if isinstance(key, tuple) else (key,)
+                subdir = os.path.join(staging, *[f"{col}={value}" for col, value in zip(partition_by, key)])
+                self._write_files(part.drop(columns=partition_by), subdir)
+        else:
+            self._write_files(df, staging)
+        table_schema = pa.Schema.from_pandas(df, preserve_index=False)
+        data_hash = self._data_hash(staging)
+        matrix = None
+        if target is not None:
+            matrix = {"target": target, "dtype": MATRIX_DTYPE,
+                      "feature_names": [c for c in df.columns if c != target]}
+
+        # 2. Unchanged data: keep the current version
+        try:
+            current = self.manifest(name)
+        except FileNotFoundError:
+            current = None
+        if (current and current['data_hash'] == data_hash and current.get('metadata') == (metadata or {})
+                and current.get('matrix') == matrix):
+            shutil.rmtree(staging)
+            logging.info(f"Feature set '{name}' unchanged; LATEST stays at v{current['version']}")
+            return current['version']
+
+        # 3. Matrix files, manifest, publish the directory, then move the pointer
+        if matrix is not None:
+            self._write_matrix(df, matrix, staging)
+        manifest = {
+            "name": name,
+            "version": version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "rows": len(df),
+            "columns": [{"name": field.name, "type": str(field.type)} for field in table_schema],
+            "partition_by": partition_by or [],
+            "row_group_size": self.row_group_size,
+            "data_hash": data_hash,
+            "matrix": matrix,
+            "metadata": metadata or {}
+        }
+        with open(os.path.join(staging, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(staging, version_dir)
+        self._write_pointer(name, version)
+
+        logging.info(f"Stored feature set '{name}' v{version} ({len(df)} rows) in {version_dir}")
+        return version
+
+    def _write_files(self, df, path):
+        """Splits `df` into part files of at most `rows_per_file` rows, each row-grouped."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(path, exist_ok=True)
+        for i, start in enumerate(range(0, max(len(df), 1), self.rows_per_file)):
+            table = pa.Table.from_pandas(df.iloc[start:start + self.rows_per_file], preserve_index=False)
+            pq.write_table(table, os.path.join(path, f"part-{i}.parquet"),
+                           compression=self.compression, row_group_size=self.row_group_size)
+
+    def _write_matrix(self, df, matrix, path):
+        """
+        Writes X (C-contiguous float32) and y straight into .npy memmaps, a
+        block of rows at a time, so no full-size intermediate copy is made.
+        """
+        feature_names = matrix['feature_names']
+        X = np.lib.format.open_memmap(os.path.join(path, MATRIX_FILE), mode="w+",
+                                      dtype=MATRIX_DTYPE, shape=(len(df), len(feature_names)))
+        for start in range(0, len(df), self.row_group_size):
+            block = df.iloc[start:start + self.row_group_size]
+            X[start:start + len(block)] = block[feature_names].to_numpy(dtype=MATRIX_DTYPE)
+        X.flush()
+        del X
+        np.save(os.path.join(path, LABELS_FILE), df[matrix['target']].to_numpy())
+
+    def _write_pointer(self, name, version):
+        tmp_path = f"{self.pointer_path(name)}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{version}\n")
+        os.replace(tmp_path, self.pointer_path(name))
+
+    @staticmethod
+    def _data_files(path):
+        files = []
+        for root, _, names in os.walk(path):
+            files += [os.path.join(root, n) for n in names if n.endswith(".parquet")]
+        return sorted(files)
+
+    def _data_hash(self, path):
+        digest = hashlib.sha256()
+        for file_path in self._data_files(path):
+            digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    # --- Reads ---
+    def dataset(self, name, version='latest'):
+        """The version as a lazy pyarrow dataset (for batch-wise scans)."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        manifest = self.manifest(name, version)
+        partitioning = None
+        if manifest['partition_by']:
+            # Partition values come back with their original types, not inferred ones
+            types = {col['name']: col['type'] for col in manifest['columns']}
+            partitioning = ds.partitioning(
+                pa.schema([(col, pa.type_for_alias(types[col])) for col in manifest['partition_by']]),
+                flavor="hive"
+            )
+        return ds.dataset(
+            self.version_path(name, manifest['version']),
+            format="parquet",
+            partitioning=partitioning,
+            ignore_prefixes=[".", "_", MANIFEST, MATRIX_FILE, LABELS_FILE]
+        )
+
+    def load_features(self, name, version='latest', columns=None, filters=None):
+        """
+        Retrieves a feature set by name and version, reading only `columns`
+        and the rows matching `filters` (a pyarrow expression or
+        pandas-style [(column, op, value), ...] tuples).
+        """
+        if not os.path.exists(self.pointer_path(name)) and version == 'latest':
+            legacy = os.path.join(self.base_path, f"{name}_latest.parquet")
+            if os.path.exists(legacy):
+                # Flat files written before the store was versioned
+                logging.warning(f"Reading unversioned feature file {legacy}; re-run the transformations stage.")
+                return pd.read_parquet(legacy, columns=columns, filters=filters)
+
+        table = self.dataset(name, version).to_table(columns=columns, filter=_as_expression(filters))
+        return table.to_pandas()
+
+    def load_matrix(self, name, version='latest', mmap_mode="r"):
+        """
+        Returns (X, y, feature_names) for a version saved with `target`.
+        X and y are read-only memmaps: nothing is loaded until it is touched,
+        and joblib workers share them by file instead of pickling copies.
+        """
+        manifest = self.manifest(name, version)
+        if not manifest.get('matrix'):
+            raise FileNotFoundError(f"Feature set {name} v{manifest['version']} has no training matrix; "
+                                    "re-run the transformations stage.")
+        path = self.version_path(name, manifest['version'])
+        X = np.load(os.path.join(path, MATRIX_FILE), mmap_mode=mmap_mode)
+        y = np.load(os.path.join(path, LABELS_FILE), mmap_mode=mmap_mode)
+        return X, y, manifest['matrix']['feature_names']
+
+def _as_expression(filters):
+    if filters is None or not isinstance(filters, (list, tuple)):
+        return filters
+    import pyarrow.parquet as pq
+    return pq.filters_to_expression(filters)
 
 def run_feature_store_demo(train_enriched_df):
     store = FeatureStore()
-    
+
     # Save the training features we just created
     store.save_features(train_enriched_df, "credit_risk_train")
-    
+
     # Reload them to verify
     df_reloaded = store.load_features("credit_risk_train", version='latest')
-    print(f"Reloaded {df_reloaded.shape[0]} rows from the Feature Store.")
\ No newline at end of file
+    print(f"Reloaded {df_reloaded.shape[0]} rows from the Feature Store.")
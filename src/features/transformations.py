@@ -1,3 +1,4 @@
+import hashlib
 import pandas as pd
 import yaml
 import joblib
@@ -10,6 +11,13 @@ from sklearn.compose import ColumnTransformer
 # Import our custom modules
 from src.features.feature_defs import CreditFeatureEngineer
 from src.features.feature_store import FeatureStore
+from src.data.dataset_io import read_dataset
+
+PIPELINE_PATH = "models/preprocessing_pipeline.joblib"
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
 
 def load_configs():
     with open("configs/data.yaml", "r") as f:
@@ -61,8 +69,8 @@ def run_transformations():
     store = FeatureStore()
     
     # 1. Load Data
-    train_df = pd.read_csv("data/processed/train_final.csv")
-    test_df = pd.read_csv("data/processed/test_final.csv")
+    train_df = read_dataset(data_cfg['data_paths']['processed_train'], config=data_cfg)
+    test_df = read_dataset(data_cfg['data_paths']['processed_test'], config=data_cfg)
     
     X_train = train_df.drop(columns=[data_cfg['schema']['target']])
     y_train = train_df[data_cfg['schema']['target']]
@@ -91,17 +99,17 @@ def run_transformations():
     X_train_proc = pd.DataFrame(X_train_raw, columns=feature_names)
     X_test_proc = pd.DataFrame(X_test_raw, columns=feature_names)
 
-    # 5. Attach target and Save
+    # 5. Save the pipeline for inference (its hash versions the feature sets below)
+    os.makedirs("models", exist_ok=True)
+    joblib.dump(pipeline, PIPELINE_PATH)
+    producer = {"pipeline": PIPELINE_PATH, "pipeline_version": file_digest(PIPELINE_PATH)}
+
+    # 6. Attach target and Save
     X_train_proc['target'] = y_train.values
     X_test_proc['target'] = y_test.values
 
-    store.save_features(X_train_proc, "train_processed")
-    store.save_features(X_test_proc, "test_processed")
-    
-    # Save the pipeline for inference
-    import joblib
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(pipeline, "models/preprocessing_pipeline.joblib")
+    store.save_features(X_train_proc, "train_processed", metadata=producer, target='target')
+    store.save_features(X_test_proc, "test_processed", metadata=producer, target='target')
     
     print("✅ Transformation complete. Column names forced to strings.")
 
@@ -1,26 +1,210 @@
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_START = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-import pandas as pd
-import joblib
 import uvicorn
+import json
+import logging
 import os
-
-app = FastAPI(
-    title="LendGuard: Automated Loan Approval API",
-    description="An AI-powered system for real-time loan eligibility and risk assessment.",
-    version="1.0.0"
+import uuid
+import yaml
+from src.inference.batching import RequestCoalescer
+from src.inference.bulk import (
+    ARROW_CONTENT_TYPES, BulkValidationError, assign_risk_tiers,
+    columns_from_arrow, columns_from_json, validate_columns
 )
+from src.inference.model_watcher import ModelWatcher
+from src.inference.prediction_log import PredictionLog, load_prediction_log_config, prediction_record
+from src.inference.result_cache import ResultCache, application_key
+from src.inference.startup import StartupState, warmup_records
+from src.monitoring.instrumentation import STAGE_SECONDS, RequestMetricsMiddleware
+from src.monitoring.metrics import REGISTRY
+from src.training.registry import ModelRegistry
+
+# pandas, sklearn and xgboost are only imported when the artifacts are loaded
+# (in the background, see lifespan), so the worker binds its port immediately.
 
 # --- 1. PATH RESOLUTION ---
 # This ensures paths work on Windows, Mac, and Linux (Render)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-MODEL_PATH = os.path.join(BASE_DIR, "models", "registry", "credit_model_latest.joblib")
+REGISTRY_DIR = os.path.join(BASE_DIR, "models", "registry")
 PIPELINE_PATH = os.path.join(BASE_DIR, "models", "preprocessing_pipeline.joblib")
+CONFIG_PATH = os.path.join(BASE_DIR, "configs", "inference.yaml")
+DATA_CONFIG_PATH = os.path.join(BASE_DIR, "configs", "data.yaml")
+
+def load_config():
+    with open(CONFIG_PATH, "r") as f:
+        return yaml.safe_load(f)
+
+_config = load_config()
+CONFIG = _config['inference']
+RISK_TIERS = _config['risk_tiers']
+STARTUP_CONFIG = CONFIG.get('startup', {})
+# Per-stage timers and request metrics on /metrics (disabled: a flag check per timer)
+REGISTRY.enabled = CONFIG.get('metrics', {}).get('enabled', True)
+
+# Artifacts are loaded in the background once the server is up (see lifespan)
+MODEL_REGISTRY = ModelRegistry(REGISTRY_DIR)
+
+def load_bundle(version=None):
+    """A registered model version plus its pipeline, ready to score."""
+    from src.inference.compiled import CompiledPipeline
+    from src.training.registry import load_production
+
+    if version is None:
+        bundle = load_production(MODEL_REGISTRY, legacy_pipeline_path=PIPELINE_PATH)
+    else:
+        bundle = MODEL_REGISTRY.load(version)
+
+    # Pandas-free fast path built from the fitted pipeline (falls back to pipeline.transform)
+    try:
+        bundle.compiled = CompiledPipeline.from_artifacts(bundle.pipeline, bundle.model)
+    except Exception as e:
+        logging.warning(f"Could not compile preprocessing pipeline, using slow path: {e}")
+        bundle.compiled = None
+
+    # Optional flattened-tree backend for small batches (see flat_trees.py)
+    if CONFIG.get('backend', 'xgboost') == 'flat':
+        from src.inference.flat_trees import FlatForest
+        try:
+            bundle.forest = FlatForest.from_booster(bundle.model.get_booster())
+        except ValueError as e:
+            logging.warning(f"Could not flatten booster, using XGBoost backend: {e}")
+    return bundle
+
+def load_warm_bundle(version=None):
+    bundle = load_bundle(version)
+    warm_up(bundle)
+    return bundle
+
+# The live bundle is swapped in the background when the registry's LATEST moves;
+# new versions are warmed up before they take traffic
+# Repeated applications are answered from cache (keyed by model version, flushed on swap)
+_cache = CONFIG.get('cache', {})
+RESULT_CACHE = ResultCache.from_config(_cache) if _cache.get('enabled', False) else None
+
+WATCHER = ModelWatcher(MODEL_REGISTRY, load_warm_bundle,
+                       poll_seconds=CONFIG.get('registry', {}).get('poll_seconds', 10),
+                       on_swap=(lambda previous, bundle: RESULT_CACHE.invalidate()) if RESULT_CACHE else None)
+
+STARTUP = StartupState(started=_IMPORT_START)
+STARTUP.timings['imports'] = round(time.perf_counter() - _IMPORT_START, 4)
+
+def warm_up(bundle):
+    """Scores a throwaway batch and a single record through both request paths."""
+    rows = STARTUP_CONFIG.get('warmup_rows', 64)
+    if not rows:
+        return
+    example = LoanApplication.model_config['json_schema_extra']['example']
+    records = warmup_records(example, rows)
+    score_records(records, bundle)
+    score_records(records[:1], bundle)
 
-# Load artifacts
-MODEL = joblib.load(MODEL_PATH)
-PIPELINE = joblib.load(PIPELINE_PATH)
+    columns = validate_columns(LoanApplication, {name: [value] * rows for name, value in example.items()}, rows)
+    columns['loan_percent_income'] = columns['loan_amnt'] / columns['person_income']
+    for _ in stream_batch_results(columns, rows, CONFIG['batch_size'], bundle):
+        pass
+
+def load_drift_window():
+    """Current-window sketches of the requests this worker scores (see data_drift.py)."""
+    if not CONFIG.get('drift_window', {}).get('enabled', False):
+        return None
+    from src.monitoring.data_drift import DriftWindow, drift_settings
+    from src.monitoring.sketches import SketchSet
+
+    with open(DATA_CONFIG_PATH, "r") as f:
+        settings = drift_settings(yaml.safe_load(f))
+    for key in ('baseline_path', 'window_dir'):
+        settings[key] = os.path.join(BASE_DIR, settings[key])
+    if not os.path.exists(settings['baseline_path']):
+        logging.warning(f"No drift baseline at {settings['baseline_path']}; request drift tracking is off.")
+        return None
+    return DriftWindow(SketchSet.load(settings['baseline_path']), settings, source="api")
+
+DRIFT_WINDOW = None
+
+def load_performance_store():
+    """Prediction log for the delayed-label performance monitor (see performance_store.py)."""
+    from src.monitoring.performance_store import PerformanceStore, load_performance_config
+
+    settings = load_performance_config(_config)
+    if not settings['enabled']:
+        return None
+    settings['store_path'] = os.path.join(BASE_DIR, settings['store_path'])
+    return PerformanceStore.from_settings(settings)
+
+PERFORMANCE_STORE = None
+
+def load_prediction_log():
+    """Audit log of every response, written in the background (see prediction_log.py)."""
+    settings = load_prediction_log_config(CONFIG)
+    if not settings['enabled']:
+        return None
+    settings['directory'] = os.path.join(BASE_DIR, settings['directory'])
+    prediction_log = PredictionLog.from_settings(settings, source="api")
+    prediction_log.start()
+    return prediction_log
+
+PREDICTION_LOG = None
+
+def load_and_warm_up():
+    global DRIFT_WINDOW, PERFORMANCE_STORE, PREDICTION_LOG
+    with STARTUP.stage('load_artifacts'):
+        bundle = load_bundle()
+        DRIFT_WINDOW = load_drift_window()
+        PERFORMANCE_STORE = load_performance_store()
+        PREDICTION_LOG = load_prediction_log()
+    with STARTUP.stage('warmup'):
+        warm_up(bundle)
+    WATCHER.current = bundle
+
+def flush_monitoring():
+    if DRIFT_WINDOW is not None:
+        DRIFT_WINDOW.flush()
+    if PERFORMANCE_STORE is not None:
+        PERFORMANCE_STORE.flush()
+    if RESULT_CACHE is not None:
+        RESULT_CACHE.purge()
+
+async def flush_monitoring_loop():
+    while True:
+        await asyncio.sleep(CONFIG.get('drift_window', {}).get('flush_seconds', 60))
+        await asyncio.to_thread(flush_monitoring)
+
+async def warm_start():
+    try:
+        await asyncio.to_thread(load_and_warm_up)
+    except Exception as e:
+        STARTUP.mark_failed(e)
+        return
+    STARTUP.mark_ready()
+    WATCHER.start()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Loading runs after the server is up: /healthz answers at once, /readyz once warm
+    loop = asyncio.get_running_loop()
+    tasks = [loop.create_task(warm_start()), loop.create_task(flush_monitoring_loop())]
+    yield
+    for task in tasks:
+        task.cancel()
+    await WATCHER.stop()
+    flush_monitoring()
+    if PREDICTION_LOG is not None:
+        PREDICTION_LOG.stop()
+
+app = FastAPI(
+    title="LendGuard: Automated Loan Approval API",
+    description="An AI-powered system for real-time loan eligibility and risk assessment.",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 # --- 2. INPUT SCHEMA ---
 class LoanApplication(BaseModel):
@@ -52,7 +236,113 @@ class LoanApplication(BaseModel):
         }
     }
 
-# --- 3. ENDPOINTS ---
+# --- 3. SCORING ---
+
+def predict_proba(bundle, X):
+    """Default probabilities for a feature matrix with the configured backend."""
+    from src.inference.compiled import predict_default_proba
+
+    with STAGE_SECONDS['predict_proba'].time():
+        if bundle.forest is not None and len(X) <= CONFIG.get('flat_max_rows', 16):
+            return bundle.forest.predict_proba(X)
+        return predict_default_proba(bundle.model, X)
+
+# Every scoring call takes the bundle once up front, so a hot-swap mid-request
+# never mixes two models within one response.
+
+def score_with_pipeline(records, bundle):
+    """Reference path: full sklearn pipeline on a DataFrame of the records."""
+    import pandas as pd
+
+    with STAGE_SECONDS['dataframe'].time():
+        input_df = pd.DataFrame(records)
+
+    # Transform using the production pipeline
+    with STAGE_SECONDS['transform'].time():
+        X_processed = bundle.pipeline.transform(input_df)
+
+    # Extract feature names for XGBoost compatibility
+    try:
+        feature_names = bundle.pipeline.get_feature_names_out()
+    except:
+        feature_names = bundle.pipeline.named_steps['preprocessor'].get_feature_names_out()
+
+    with STAGE_SECONDS['dataframe'].time():
+        X_final = pd.DataFrame(X_processed, columns=feature_names)
+
+    # Model Inference
+    with STAGE_SECONDS['predict_proba'].time():
+        return bundle.model.predict_proba(X_final)[:, 1]
+
+def score_records(records, bundle=None):
+    """Default probabilities for a list of application dicts, in one model call."""
+    bundle = bundle or WATCHER.current
+    if bundle.compiled is not None:
+        # Fast path: straight to the feature matrix in the booster's column order
+        with STAGE_SECONDS['transform'].time():
+            X = bundle.compiled.transform_batch(records)
+        probs = predict_proba(bundle, X)
+    else:
+        probs = score_with_pipeline(records, bundle)
+    return [float(p) for p in probs]
+
+def score_columns(columns, n_rows, bundle):
+    """Vectorized scoring of validated columns (one transform, one model call)."""
+    if bundle.compiled is not None:
+        with STAGE_SECONDS['transform'].time():
+            X = bundle.compiled.transform_columns(columns, n_rows)
+        return predict_proba(bundle, X)
+    return score_with_pipeline(columns, bundle)
+
+def stream_batch_results(columns, n_rows, chunk_size, bundle, request_id=None):
+    """
+    Yields NDJSON results chunk by chunk so large batches never materialize fully.
+    With a `request_id`, rows get prediction IDs `<request_id>-<row>` and are
+    logged for the performance monitor.
+    """
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        chunk = {name: values[start:stop] for name, values in columns.items()}
+        probs = score_columns(chunk, stop - start, bundle)
+        tiers = assign_risk_tiers(probs, RISK_TIERS)
+        probs = probs.tolist()
+
+        ids = [None] * len(probs)
+        if request_id is not None:
+            ids = [f"{request_id}-{row}" for row in range(start, stop)]
+            if PERFORMANCE_STORE is not None:
+                scored_at = time.time()
+                # A sync generator: Starlette runs it in a thread, so an early flush can happen here
+                if PERFORMANCE_STORE.add_predictions(
+                        zip(ids, [scored_at] * len(ids), [bundle.version] * len(ids), chunk['loan_grade'], probs)):
+                    PERFORMANCE_STORE.flush()
+            if PREDICTION_LOG is not None:
+                values = {name: column.tolist() for name, column in chunk.items()}
+                PREDICTION_LOG.log([
+                    prediction_record(prediction_id, {name: column[i] for name, column in values.items()},
+                                      prob, bundle.version, "api")
+                    for i, (prediction_id, prob) in enumerate(zip(ids, probs))])
+
+        lines = []
+        for prediction_id, prob, tier in zip(ids, probs, tiers):
+            lines.append(json.dumps({
+                "prediction_id": prediction_id,
+                "application_status": "REJECT" if prob > 0.5 else "APPROVE",
+                "risk_score": round(prob * 100, 2),
+                "probability": round(prob, 4),
+                "risk_tier": tier
+            }))
+        yield "\n".join(lines) + "\n"
+
+# Concurrent /predict calls are queued and scored together (see batching.py)
+_coalescing = CONFIG.get('coalescing', {})
+COALESCER = RequestCoalescer(
+    score_records,
+    max_batch_size=CONFIG['batch_size'],
+    max_wait_ms=_coalescing.get('max_wait_ms', 2.0)
+) if _coalescing.get('enabled', False) else None
+
+# --- 4. ENDPOINTS ---
 
 @app.get("/")
 def home():
@@ -61,35 +351,101 @@ def home():
         "project": "LendGuard: Automated Loan Approval Platform",
         "status": "online",
         "documentation": "/docs",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "model_version": WATCHER.current.version if STARTUP.ready else None
     }
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP (artifacts may still be loading)."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 only once the model is loaded and warmed up."""
+    status_code = 200 if STARTUP.ready else 503
+    body = {**STARTUP.report(), "model_version": WATCHER.current.version if STARTUP.ready else None}
+    return JSONResponse(body, status_code=status_code)
+
+def require_ready():
+    if not STARTUP.ready:
+        raise HTTPException(status_code=503, detail="Model is still loading; retry shortly.",
+                            headers={"Retry-After": "1"})
+
+BATCH_MAX_BYTES = int(CONFIG.get('batch_max_body_mb', 64) * 1024 * 1024)
+
+async def read_body(request, max_bytes):
+    """
+    The request body, read chunk by chunk into one buffer. Refused with 413 as soon
+    as it (or its declared Content-Length) exceeds `max_bytes`, so an oversized
+    upload is never held in memory.
+    """
+    too_large = HTTPException(status_code=413, detail=f"Batch body larger than {max_bytes} bytes "
+                                                      "(inference.batch_max_body_mb); split it into several requests.")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        if len(body) + len(chunk) > max_bytes:
+            raise too_large
+        body += chunk
+    return body
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus-style metrics: request latency, in-flight and errors per endpoint,
+    per-stage scoring latency, batch sizes, queue waits, cache and log counters.
+    """
+    return REGISTRY.render()
+
 @app.post("/predict")
-def predict(app_data: LoanApplication):
+async def predict(app_data: LoanApplication):
+    require_ready()
     try:
-        # Convert to dict and then DataFrame
-        data_dict = app_data.model_dump()
-        input_df = pd.DataFrame([data_dict])
-        
-        # Auto-calculate derived feature
-        input_df['loan_percent_income'] = input_df['loan_amnt'] / input_df['person_income']
-        
-        # Transform using the production pipeline
-        X_processed = PIPELINE.transform(input_df)
-        
-        # Extract feature names for XGBoost compatibility
-        try:
-            feature_names = PIPELINE.get_feature_names_out()
-        except:
-            feature_names = PIPELINE.named_steps['preprocessor'].get_feature_names_out()
-        
-        X_final = pd.DataFrame(X_processed, columns=feature_names)
-        
-        # Model Inference
-        prob = float(MODEL.predict_proba(X_final)[0][1])
+        # Schema checks already ran in FastAPI; this covers the handler's share
+        with STAGE_SECONDS['validation'].time():
+            data_dict = app_data.model_dump()
+
+            # Auto-calculate derived feature
+            data_dict['loan_percent_income'] = data_dict['loan_amnt'] / data_dict['person_income']
+        bundle = WATCHER.current
+        # Callers keep this ID to report the loan's outcome later (model_drift --labels)
+        prediction_id = uuid.uuid4().hex
+
+        if DRIFT_WINDOW is not None:
+            DRIFT_WINDOW.add_records([data_dict])
+
+        cache_key = None
+        if RESULT_CACHE is not None:
+            cache_key = application_key(data_dict, bundle.version)
+            # Local tier on the event loop; the shared SQLite tier can wait on its lock, so in a thread
+            prob = RESULT_CACHE.get(cache_key, shared=False)
+            if prob is None and RESULT_CACHE.shared is not None:
+                prob = await run_in_threadpool(RESULT_CACHE.get, cache_key)
+        if cache_key is None or prob is None:
+            # Scored by the same bundle whose version is cached and logged below
+            if COALESCER is not None:
+                prob = await COALESCER.submit(data_dict, bundle)
+            else:
+                prob = (await run_in_threadpool(score_records, [data_dict], bundle))[0]
+            if cache_key is not None:
+                RESULT_CACHE.set(cache_key, prob, shared=False)
+                if RESULT_CACHE.shared is not None:
+                    await run_in_threadpool(RESULT_CACHE.shared.set, cache_key, prob)
         prediction = 1 if prob > 0.5 else 0
-        
+
+        if PERFORMANCE_STORE is not None:
+            row = (prediction_id, time.time(), bundle.version, data_dict['loan_grade'], prob)
+            if PERFORMANCE_STORE.add_predictions([row]):
+                # Buffer full before the periodic flush: write it without blocking the event loop
+                await run_in_threadpool(PERFORMANCE_STORE.flush)
+        if PREDICTION_LOG is not None:
+            PREDICTION_LOG.log([prediction_record(prediction_id, data_dict, prob, bundle.version, "api")])
+
         return {
+            "prediction_id": prediction_id,
             "application_status": "REJECT" if prediction == 1 else "APPROVE",
             "risk_score": round(prob * 100, 2),
             "probability": round(prob, 4)
@@ -98,5 +454,43 @@ def predict(app_data: LoanApplication):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Inference Error: {str(e)}")
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Bulk scoring. Accepts a JSON array of applications, a columnar JSON object
+    ({"loan_amnt": [...], ...}) or an Arrow IPC stream, and streams one NDJSON
+    line per application (same fields as /predict plus `risk_tier`). Bodies are
+    capped at `inference.batch_max_body_mb`.
+    """
+    require_ready()
+    body = await read_body(request, BATCH_MAX_BYTES)
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        with STAGE_SECONDS['validation'].time():
+            if content_type in ARROW_CONTENT_TYPES:
+                columns, n_rows = columns_from_arrow(body)
+            else:
+                columns, n_rows = columns_from_json(json.loads(body))
+            columns = validate_columns(LoanApplication, columns, n_rows)
+    except BulkValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    except RuntimeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed batch payload: {str(e)}")
+
+    # Auto-calculate derived feature
+    columns['loan_percent_income'] = columns['loan_amnt'] / columns['person_income']
+    if DRIFT_WINDOW is not None:
+        DRIFT_WINDOW.update(columns, n_rows)
+
+    return StreamingResponse(
+        stream_batch_results(columns, n_rows, CONFIG['batch_size'], WATCHER.current, request_id=uuid.uuid4().hex),
+        media_type="application/x-ndjson"
+    )
+
+# Added last so it sees every route defined above
+app.add_middleware(RequestMetricsMiddleware, endpoints=[route.path for route in app.routes])
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
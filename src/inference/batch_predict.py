@@ -1,48 +1,358 @@
 ## Batch Prediction
 
 import pandas as pd
-import joblib
+import yaml
+import io
 import os
+import time
+import shutil
+import argparse
+import functools
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from src.data.dataset_io import dataset_path, is_parquet, iter_dataset, load_config as dataset_load_config
+from src.inference.prediction_log import RotatingLogWriter, load_prediction_log_config, prediction_table
+from src.monitoring.data_drift import DriftWindow, drift_settings
+from src.monitoring.instrumentation import RunReport, reset_peak_rss
+from src.monitoring.performance_store import PerformanceStore, dataset_row_ids, load_performance_config
+from src.monitoring.sketches import SketchSet
+from src.training.registry import load_production
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-def run_batch_inference(input_path, output_path):
+# Shards are capped so each worker only holds a bounded slice of the file
+MAX_SHARD_BYTES = 32 * 1024 * 1024
+
+def load_config():
+    with open("configs/inference.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def load_artifacts():
+    # We load the REGISTERED model (the one that passed the gatekeeper) with its own pipeline
+    bundle = load_production()
+    return bundle.model, bundle.pipeline, bundle.version
+
+def load_drift_window():
+    """Sketches of the scored inputs for the drift monitor (None until a baseline exists)."""
+    settings = drift_settings(dataset_load_config())
+    if not os.path.exists(settings['baseline_path']):
+        return None
+    return DriftWindow(SketchSet.load(settings['baseline_path']), settings, source="batch")
+
+def load_performance_store():
+    """Prediction log for the delayed-label performance monitor (None when disabled)."""
+    settings = load_performance_config(load_config())
+    return PerformanceStore.from_settings(settings) if settings['enabled'] else None
+
+def load_prediction_writer():
+    """Same fields and directory as the API's prediction log, written per chunk as Parquet (no buffer)."""
+    settings = load_prediction_log_config(load_config()['inference'])
+    if not settings['enabled']:
+        return None
+    # Columnar chunks go straight to Parquet; per-row JSON would be the slowest stage of the job
+    return RotatingLogWriter(settings['directory'], "batch", "parquet",
+                             settings['rotate_rows'], settings['rotate_seconds'])
+
+@functools.lru_cache(maxsize=1)
+def _target_column():
+    return dataset_load_config()['schema']['target']
+
+def log_predictions(input_path, first_row, scored, model_version, store=None, writer=None):
+    """Logs a scored chunk under per-model-version row-number IDs (see performance_store.dataset_row_ids)."""
+    ids = dataset_row_ids(input_path, first_row, len(scored), model_version)
+    probs = scored['default_probability'].to_numpy(dtype=float)
+    if store is not None:
+        scored_at = time.time()
+        store.log_predictions(zip(ids, [scored_at] * len(ids), [model_version] * len(ids),
+                                  scored['loan_grade'].astype(object).where(scored['loan_grade'].notna(), None),
+                                  probs.tolist()))
+    if writer is not None:
+        # The audit log holds what the model saw: no outcome label, no output columns
+        features = scored.drop(columns=[c for c in (_target_column(), 'default_probability', 'prediction') if c in scored])
+        writer.write_table(prediction_table(ids, features, probs, model_version, "batch"))
+
+def get_feature_names(pipeline):
+    # Get feature names to avoid XGBoost name mismatch
+    try:
+        return pipeline.get_feature_names_out()
+    except:
+        return pipeline.named_steps['preprocessor'].get_feature_names_out()
+
+def _timed(report, stage, rows=None):
+    return report.stage(stage, rows) if report is not None else nullcontext({})
+
+def score_frame(df_raw, model, pipeline, feature_names, report=None):
+    """Transforms one frame of raw records and appends probability + class columns."""
+    # The pipeline handles ratios, imputation, and encoding
+    with _timed(report, 'transform', len(df_raw)):
+        X_processed = pipeline.transform(df_raw)
+    with _timed(report, 'dataframe', len(df_raw)):
+        X_final = pd.DataFrame(X_processed, columns=feature_names)
+
+    # We save both the hard class (0/1) and the probability (%)
+    with _timed(report, 'predict_proba', len(df_raw)):
+        df_raw['default_probability'] = model.predict_proba(X_final)[:, 1]
+        df_raw['prediction'] = (df_raw['default_probability'] > 0.5).astype(int)
+    return df_raw
+
+def read_chunks(chunks, report):
+    """Iterates `chunks` (skipping empty ones, e.g. a header-only CSV), timing each read as the report's 'read' stage."""
+    chunks = iter(chunks)
+    while True:
+        with report.stage('read') as info:
+            chunk = next(chunks, None)
+            info['rows'] = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            return
+        if len(chunk):
+            yield chunk
+
+def run_batch_inference(input_path, output_path, chunk_size=None):
+    """
+    Streams the input CSV in chunks of `inference.batch_size` rows, scoring and
+    appending each chunk to the output so memory stays bounded by one chunk.
+    Per-stage timings go to a run report (models/monitoring/run_reports/).
+    """
+    if chunk_size is None:
+        chunk_size = load_config()['inference']['batch_size']
+    report = RunReport("batch_inference", {"input": input_path, "output": output_path,
+                                           "chunk_size": chunk_size, "workers": 1})
+
     # 1. Load the Production Artifacts
-    # We load the REGISTERED model (the one that passed the gatekeeper)
-    model = joblib.load("models/registry/credit_model_latest.joblib")
-    pipeline = joblib.load("models/preprocessing_pipeline.joblib")
-    
-    # 2. Load Raw Data
+    with report.stage('load_artifacts'):
+        model, pipeline, model_version = load_artifacts()
+        feature_names = get_feature_names(pipeline)
+        drift_window = load_drift_window()
+        performance_store = load_performance_store()
+        prediction_writer = load_prediction_writer()
+
+    # 2. Open Raw Data as a chunked reader
     if not os.path.exists(input_path):
         logging.error(f"Input file {input_path} not found.")
         return
 
-    df_raw = pd.read_csv(input_path)
-    logging.info(f"Loaded {len(df_raw)} records for inference.")
+    # Write to a temp file first so a failed run never leaves a half-written result
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.part"
 
-    # 3. Transform Data
-    # The pipeline handles ratios, imputation, and encoding
-    X_processed = pipeline.transform(df_raw)
-    
-    # Get feature names to avoid XGBoost name mismatch
+    total_rows = 0
+    start = time.perf_counter()
     try:
-        feature_names = pipeline.get_feature_names_out()
-    except:
-        feature_names = pipeline.named_steps['preprocessor'].get_feature_names_out()
-    
-    X_final = pd.DataFrame(X_processed, columns=feature_names)
+        for i, chunk in enumerate(read_chunks(iter_dataset(input_path, chunk_size), report)):
+            chunk_start = time.perf_counter()
 
-    # 4. Generate Predictions
-    # We save both the hard class (0/1) and the probability (%)
-    df_raw['default_probability'] = model.predict_proba(X_final)[:, 1]
-    df_raw['prediction'] = (df_raw['default_probability'] > 0.5).astype(int)
+            # 3. Transform + Predict this chunk only
+            if drift_window is not None:
+                with report.stage('drift_sketch', len(chunk)):
+                    drift_window.update(chunk, len(chunk))
+            scored = score_frame(chunk, model, pipeline, feature_names, report)
+            with report.stage('prediction_log', len(scored)):
+                log_predictions(input_path, total_rows, scored, model_version, performance_store, prediction_writer)
+
+            # 4. Append Results
+            with report.stage('write', len(scored)):
+                scored.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+
+            total_rows += len(scored)
+            elapsed = time.perf_counter() - start
+            logging.info(
+                f"Chunk {i + 1}: {len(scored)} rows in {time.perf_counter() - chunk_start:.2f}s | "
+                f"total {total_rows} rows, {total_rows / elapsed:,.0f} rows/sec"
+            )
+    finally:
+        # Even on an empty or failed run, what was scored reaches the monitors
+        if drift_window is not None:
+            drift_window.flush()
+        if prediction_writer is not None:
+            prediction_writer.close()
 
-    # 5. Save Results
+    report.metadata['rows'] = total_rows
+    if total_rows == 0:
+        logging.warning(f"No records found in {input_path} (run report: {report.save()}).")
+        return
+
+    os.replace(tmp_path, output_path)
+    logging.info(f"Batch inference complete. {total_rows} results saved to {output_path} "
+                 f"(run report: {report.save()})")
+
+# --- PARALLEL MODE ---
+# Each worker process loads the artifacts once (initializer) and then scores
+# shards of the input (CSV byte ranges or Parquet row groups), writing one
+# headerless part file per shard.
+_WORKER = {}
+
+def _init_worker():
+    model, pipeline, model_version = load_artifacts()
+    # One XGBoost thread per process: parallelism comes from the process pool
+    model.set_params(n_jobs=1)
+    _WORKER.update(model=model, pipeline=pipeline, model_version=model_version,
+                   feature_names=get_feature_names(pipeline), drift_window=load_drift_window(),
+                   performance_store=load_performance_store(), prediction_writer=load_prediction_writer())
+
+def plan_shards(input_path, n_shards):
+    """
+    Parquet inputs are sharded by row group. CSVs are split into byte ranges
+    aligned to line boundaries (assumes no quoted newlines inside fields,
+    true for our loan CSVs). Every shard also carries the number of its first
+    row, so prediction IDs match the sequential run.
+    """
+    if is_parquet(input_path):
+        import pyarrow.parquet as pq
+        metadata = pq.ParquetFile(input_path).metadata
+        first_rows = [0]
+        for i in range(metadata.num_row_groups):
+            first_rows.append(first_rows[-1] + metadata.row_group(i).num_rows)
+        return [("row_group", i, first_rows[i]) for i in range(metadata.num_row_groups)]
+
+    size = os.path.getsize(input_path)
+    with open(input_path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        step = max((size - data_start) // n_shards, 1)
+
+        bounds = [data_start]
+        for target in range(data_start + step, size, step):
+            if target <= bounds[-1]:
+                continue
+            f.seek(target)
+            f.readline()  # move to the start of the next full line
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+        bounds.append(size)
+
+        # One sequential pass counting lines gives each range's first row
+        first_rows = [0]
+        f.seek(data_start)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            lines, remaining = 0, end - start
+            while remaining > 0:
+                block = f.read(min(remaining, 16 * 1024 * 1024))
+                lines += block.count(b"\n")
+                remaining -= len(block)
+            first_rows.append(first_rows[-1] + lines)
+
+    return [("bytes", header, start, end, first_row)
+            for start, end, first_row in zip(bounds[:-1], bounds[1:], first_rows) if end > start]
+
+def _iter_shard(input_path, shard, chunk_size):
+    if shard[0] == "row_group":
+        import pyarrow.parquet as pq
+        table = pq.ParquetFile(input_path).read_row_group(shard[1])
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield batch.to_pandas()
+        return
+
+    _, header, start, end, _ = shard
+    with open(input_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    with pd.read_csv(io.BytesIO(header + data), chunksize=chunk_size) as reader:
+        yield from reader
+
+def _score_shard(input_path, shard, part_path, chunk_size):
+    rows, columns = 0, None
+    reset_peak_rss()
+    report = RunReport("shard")
+    for i, chunk in enumerate(read_chunks(_iter_shard(input_path, shard, chunk_size), report)):
+        if _WORKER['drift_window'] is not None:
+            with report.stage('drift_sketch', len(chunk)):
+                _WORKER['drift_window'].update(chunk, len(chunk))
+        scored = score_frame(chunk, _WORKER['model'], _WORKER['pipeline'], _WORKER['feature_names'], report)
+        with report.stage('prediction_log', len(scored)):
+            log_predictions(input_path, shard[-1] + rows, scored, _WORKER['model_version'],
+                            _WORKER['performance_store'], _WORKER['prediction_writer'])
+        with report.stage('write', len(scored)):
+            scored.to_csv(part_path, mode='w' if i == 0 else 'a', header=False, index=False)
+        rows += len(scored)
+        columns = list(scored.columns)
+    # Each worker rewrites its own window file with its running totals
+    if _WORKER['drift_window'] is not None:
+        _WORKER['drift_window'].flush()
+    # ... and finishes a prediction log file per shard
+    if _WORKER['prediction_writer'] is not None:
+        _WORKER['prediction_writer'].close()
+    return rows, columns, report.stages
+
+def run_parallel_batch_inference(input_path, output_path, workers=None, chunk_size=None):
+    """
+    Scores the input on a process pool and merges the ordered part files, so the
+    output has exactly the input's row order regardless of the worker count.
+    """
+    if chunk_size is None:
+        chunk_size = load_config()['inference']['batch_size']
+    workers = workers or os.cpu_count()
+    report = RunReport("batch_inference", {"input": input_path, "output": output_path,
+                                           "chunk_size": chunk_size, "workers": workers})
+
+    if not os.path.exists(input_path):
+        logging.error(f"Input file {input_path} not found.")
+        return
+
+    # At least a few shards per worker for load balancing, capped in size
+    n_shards = max(workers * 4, -(-os.path.getsize(input_path) // MAX_SHARD_BYTES))
+    with report.stage('plan_shards'):
+        shards = plan_shards(input_path, n_shards)
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df_raw.to_csv(output_path, index=False)
-    logging.info(f"Batch inference complete. Results saved to {output_path}")
+    part_paths = [f"{output_path}.part-{i:05d}" for i in range(len(shards))]
+
+    start = time.perf_counter()
+    logging.info(f"Scoring {len(shards)} shards of {input_path} on {workers} workers...")
+    with report.stage('score_shards') as info:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(_score_shard, input_path, shard, part, chunk_size)
+                for shard, part in zip(shards, part_paths)
+            ]
+            results = [f.result() for f in futures]
+        info['rows'] = sum(rows for rows, _, _ in results)
+
+    # Worker stages are summed over shards (seconds across workers, peak RSS of the largest worker)
+    for _, _, stages in results:
+        for name, entry in stages.items():
+            report.add(f"worker.{name}", entry['seconds'], entry['rows'],
+                       entry['peak_rss_mb'] * 2**20 if entry['peak_rss_mb'] is not None else None)
+
+    # Merge parts in shard order (deterministic row order)
+    total_rows = sum(rows for rows, _, _ in results)
+    columns = next((cols for rows, cols, _ in results if rows), None)
+    if columns is None:
+        report.metadata['rows'] = 0
+        logging.warning(f"No records found in {input_path} (run report: {report.save()}).")
+        return
+
+    tmp_path = f"{output_path}.part"
+    with report.stage('merge', total_rows):
+        with open(tmp_path, 'w', newline='') as out:
+            pd.DataFrame(columns=columns).to_csv(out, index=False)
+            for part in part_paths:
+                if os.path.exists(part):
+                    with open(part, 'r', newline='') as f:
+                        shutil.copyfileobj(f, out)
+                    os.remove(part)
+        os.replace(tmp_path, output_path)
+    report.metadata['rows'] = total_rows
+
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"Parallel batch inference complete. {total_rows} rows in {elapsed:.2f}s "
+        f"({total_rows / elapsed:,.0f} rows/sec on {workers} workers) -> {output_path} (run report: {report.save()})"
+    )
 
 if __name__ == "__main__":
-    # Test it on our holdout set
-    run_batch_inference("data/validation/drift_test.csv", "data/predictions/batch_results.csv")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Score a CSV of loan applications.")
+    # Test it on our holdout set by default
+    parser.add_argument("--input", default=dataset_path('drift_test'))
+    parser.add_argument("--output", default="data/predictions/batch_results.csv")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Rows per chunk (defaults to inference.batch_size)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; >1 (or 0 for all cores) enables parallel mode")
+    args = parser.parse_args()
+
+    if args.workers == 1:
+        run_batch_inference(args.input, args.output, chunk_size=args.chunk_size)
+    else:
+        run_parallel_batch_inference(args.input, args.output,
+                                     workers=args.workers or None, chunk_size=args.chunk_size)
@@ -0,0 +1,101 @@
+## batching.py
+## Async request coalescer: many concurrent /predict calls -> one model call.
+
+import asyncio
+import logging
+import time
+
+from src.monitoring.metrics import REGISTRY, BATCH_SIZE_BUCKETS, WAIT_SECONDS_BUCKETS
+
+BATCH_SIZE = REGISTRY.histogram(
+    "lendguard_batch_size", "Applications scored per coalesced model call", BATCH_SIZE_BUCKETS
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    "lendguard_queue_wait_seconds", "Time a request waited in the coalescer queue", WAIT_SECONDS_BUCKETS
+)
+
+
+class RequestCoalescer:
+    """
+    Queues incoming records and flushes them to `score_batch` as a single batch once
+    `max_batch_size` records are waiting or the oldest one has waited `max_wait_ms`.
+    Records are only scored together with records of the same `group` (the model
+    bundle they were admitted under): `score_batch(records, group)` is called once
+    per group in a flush and must return one result per record, in order.
+    """
+
+    def __init__(self, score_batch, max_batch_size=1000, max_wait_ms=2.0):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        # The worker is bound to the running loop (one per uvicorn worker process)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, record, group=None):
+        """Enqueues one record and waits for its own result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((record, group, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = batch[0][3] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Anything already queued (e.g. backlog during the last flush) goes in for free
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            flushed_at = time.perf_counter()
+            for _, _, _, enqueued_at in batch:
+                QUEUE_WAIT.observe(flushed_at - enqueued_at)
+
+            # Only across a model hot-swap does a flush hold more than one group
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[1]), []).append(item)
+            for items in groups.values():
+                await self._score(items)
+
+    async def _score(self, items):
+        BATCH_SIZE.observe(len(items))
+        records = [record for record, _, _, _ in items]
+        try:
+            # Score off the event loop so the next batch can fill up meanwhile
+            results = await self._loop.run_in_executor(None, self.score_batch, records, items[0][1])
+        except Exception as e:
+            logging.error(f"Coalesced batch of {len(items)} failed: {e}")
+            for _, _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future, _), result in zip(items, results):
+            if not future.done():  # caller may have been cancelled
+                future.set_result(result)
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
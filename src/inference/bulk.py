@@ -0,0 +1,142 @@
+## bulk.py
+## Columnar parsing and vectorized validation for /predict/batch.
+
+import numpy as np
+
+ARROW_CONTENT_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+
+
+class _Missing:
+    """Marker for a field absent from a row (the schema default applies)."""
+
+
+_MISSING = _Missing()
+
+
+class BulkValidationError(ValueError):
+    """Raised with a list of per-field violations (field, error, count, first rows)."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{sum(e['count'] for e in errors)} invalid values in batch")
+
+
+def columns_from_json(payload):
+    """
+    Accepts either a list of application objects (row-oriented) or an object
+    mapping each field to a list of values (columnar). Returns (columns, n_rows).
+    """
+    if isinstance(payload, list):
+        if not all(isinstance(row, dict) for row in payload):
+            raise BulkValidationError([{"field": None, "error": "rows must be JSON objects",
+                                        "count": len(payload), "rows": []}])
+        fields = {key for row in payload for key in row}
+        columns = {f: [row.get(f, _MISSING) for row in payload] for f in fields}
+        return columns, len(payload)
+
+    if isinstance(payload, dict):
+        lengths = {len(v) for v in payload.values() if isinstance(v, list)}
+        if len(lengths) > 1 or not all(isinstance(v, list) for v in payload.values()):
+            raise BulkValidationError([{"field": None, "error": "columns must be lists of equal length",
+                                        "count": 1, "rows": []}])
+        return dict(payload), lengths.pop() if lengths else 0
+
+    raise BulkValidationError([{"field": None, "error": "expected a JSON array or object",
+                                "count": 1, "rows": []}])
+
+
+def columns_from_arrow(body):
+    """Reads an Arrow IPC stream (or file) body into numpy columns."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("pyarrow is required for Arrow IPC payloads.")
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+    columns = {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+    return columns, table.num_rows
+
+
+def _constraints(field):
+    bounds = {}
+    for meta in field.metadata:
+        for op in ("ge", "gt", "le", "lt"):
+            if getattr(meta, op, None) is not None:
+                bounds[op] = getattr(meta, op)
+    return bounds
+
+
+def validate_columns(schema, columns, n_rows, max_rows_reported=10):
+    """
+    Validates raw columns against a pydantic model's field types, defaults and
+    ge/gt/le/lt constraints with one vectorized check per field instead of
+    building one model instance per row. Returns clean numpy columns.
+    """
+    clean, errors = {}, []
+
+    def fail(name, error, mask):
+        rows = np.flatnonzero(mask)
+        errors.append({"field": name, "error": error, "count": int(rows.size),
+                       "rows": rows[:max_rows_reported].tolist()})
+
+    for name, field in schema.model_fields.items():
+        raw = columns.get(name)
+        if raw is None:
+            raw = np.full(n_rows, field.default, dtype=object)
+        raw = np.asarray(raw, dtype=object) if not isinstance(raw, np.ndarray) else raw
+        if raw.dtype == object:
+            absent = np.fromiter((v is _MISSING for v in raw), dtype=bool, count=n_rows)
+            if absent.any():
+                raw = np.where(absent, field.default, raw)
+
+        if field.annotation is str:
+            is_str = np.fromiter((isinstance(v, str) for v in raw), dtype=bool, count=n_rows)
+            if not is_str.all():
+                fail(name, "expected a string", ~is_str)
+            clean[name] = raw.astype(object)
+            continue
+
+        # int / float fields: numeric conversion, nulls and constraints in bulk
+        try:
+            values = raw.astype(np.float64)
+        except (TypeError, ValueError):
+            values = np.array([_to_float(v) for v in raw], dtype=np.float64)
+        null = np.isnan(values)
+        if null.any():
+            fail(name, "expected a number", null)
+        if field.annotation is int:
+            fractional = ~null & (values != np.floor(values))
+            if fractional.any():
+                fail(name, "expected an integer", fractional)
+
+        checks = {"ge": np.less, "gt": np.less_equal, "le": np.greater, "lt": np.greater_equal}
+        for op, limit in _constraints(field).items():
+            bad = checks[op](values, limit)
+            if bad.any():
+                fail(name, f"must be {op} {limit}", bad)
+        clean[name] = values
+
+    if errors:
+        raise BulkValidationError(errors)
+    return clean
+
+
+def _to_float(value):
+    if isinstance(value, bool) or value is None or value is _MISSING:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def assign_risk_tiers(probs, risk_tiers):
+    """Maps probabilities to the `risk_tiers` names from configs/inference.yaml."""
+    tiers = sorted(risk_tiers.items(), key=lambda item: item[1][0])
+    lower_bounds = np.array([bounds[0] for _, bounds in tiers])
+    names = np.array([name for name, _ in tiers], dtype=object)
+    idx = np.searchsorted(lower_bounds, probs, side='right') - 1
+    return names[np.clip(idx, 0, len(names) - 1)]
@@ -0,0 +1,218 @@
+## compiled.py
+## Pandas-free scoring path "compiled" from the fitted preprocessing pipeline.
+
+import logging
+import math
+import numpy as np
+
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+# Ratio that CreditFeatureEngineer always adds on top of the YAML ratios
+STATIC_RATIOS = [
+    {'name': 'cred_hist_age_ratio', 'numerator': 'cb_person_cred_hist_length', 'denominator': 'person_age'}
+]
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _safe_ratio(num, den):
+    """Mirrors `num / den.replace(0, nan)` followed by `fillna(0)`."""
+    if _is_missing(num) or _is_missing(den) or den == 0:
+        return 0.0
+    return float(num) / float(den)
+
+
+def _plain_ratio(num, den):
+    """Mirrors a plain pandas division followed by `fillna(0)` (x/0 stays +-inf)."""
+    if _is_missing(num) or _is_missing(den):
+        return 0.0
+    num, den = float(num), float(den)
+    if den == 0:
+        return 0.0 if num == 0 else math.copysign(math.inf, num) * math.copysign(1.0, den)
+    return num / den
+
+
+class CompiledPipeline:
+    """
+    Flattens the fitted `preprocessing_pipeline.joblib` into plain lookup tables
+    (medians, most-frequent values, one-hot slots, ratio definitions) so a single
+    application can be turned into the model's feature vector without pandas.
+    """
+
+    def __init__(self, pipeline, feature_names=None):
+        engineer = pipeline.named_steps['ratios']
+        preprocessor = pipeline.named_steps['preprocessor']
+
+        out_names = list(preprocessor.get_feature_names_out())
+        # Column order the booster was trained with (falls back to pipeline order)
+        self.feature_names = list(feature_names) if feature_names is not None else out_names
+        slot_of = {name: i for i, name in enumerate(self.feature_names)}
+        missing = set(out_names) - set(slot_of)
+        if missing or len(out_names) != len(self.feature_names):
+            raise ValueError(f"Pipeline output does not match model features: {sorted(missing)}")
+
+        # 1. Derived ratio columns computed by CreditFeatureEngineer
+        self.ratios = [(r['name'], r['numerator'], r['denominator'], _safe_ratio)
+                       for r in getattr(engineer, 'feature_config', [])]
+        self.ratios += [(r['name'], r['numerator'], r['denominator'], _plain_ratio) for r in STATIC_RATIOS]
+
+        # 2. Per-column instructions for the ColumnTransformer branches
+        self.numeric = []      # (column, slot, fill value)
+        self.categorical = []  # (column, fill value, {category: slot})
+        self.passthrough = []  # (column, slot)
+
+        input_names = list(preprocessor.feature_names_in_)
+        for branch, transformer, columns in preprocessor.transformers_:
+            columns = [input_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            if transformer == 'drop' or not columns:
+                continue
+            # Newer sklearn versions store 'passthrough' as an identity FunctionTransformer
+            identity = isinstance(transformer, FunctionTransformer) and transformer.func is None
+            if transformer == 'passthrough' or identity:
+                for col in columns:
+                    self.passthrough.append((col, slot_of[f"{branch}__{col}"]))
+                continue
+
+            steps = transformer.steps if isinstance(transformer, Pipeline) else [(None, transformer)]
+            imputer = next((s for _, s in steps if isinstance(s, SimpleImputer)), None)
+            encoder = next((s for _, s in steps if isinstance(s, OneHotEncoder)), None)
+            if len(steps) != (imputer is not None) + (encoder is not None):
+                raise ValueError(f"Cannot compile transformer branch '{branch}': {transformer}")
+            fills = imputer.statistics_ if imputer is not None else [None] * len(columns)
+
+            if encoder is None:
+                for col, fill in zip(columns, fills):
+                    self.numeric.append((col, slot_of[f"{branch}__{col}"], float(fill)))
+                continue
+
+            if encoder.drop_idx_ is not None:
+                raise ValueError("Cannot compile a OneHotEncoder that drops categories.")
+            names = encoder.get_feature_names_out(columns)
+            pos = 0
+            for col, fill, cats in zip(columns, fills, encoder.categories_):
+                slots = {cat: slot_of[f"{branch}__{names[pos + i]}"] for i, cat in enumerate(cats)}
+                self.categorical.append((col, fill, slots))
+                pos += len(cats)
+
+        self.n_features = len(self.feature_names)
+
+    @classmethod
+    def from_artifacts(cls, pipeline, model):
+        """Builds the compiled path using the column order stored in the booster."""
+        return cls(pipeline, feature_names=model.get_booster().feature_names)
+
+    def transform_one(self, record, out=None):
+        """
+        Fills `out` (or a fresh zero vector) with the features of one application.
+        `record` is a plain dict with the same raw fields the pipeline expects.
+        """
+        if out is None:
+            out = np.zeros(self.n_features, dtype=np.float64)
+        else:
+            out.fill(0.0)
+
+        values = dict(record)
+        for name, num, den, ratio in self.ratios:
+            values[name] = ratio(values.get(num), values.get(den))
+
+        for col, slot, fill in self.numeric:
+            value = values.get(col)
+            out[slot] = fill if _is_missing(value) else value
+        for col, fill, slots in self.categorical:
+            value = values.get(col)
+            slot = slots.get(fill if _is_missing(value) else value)
+            if slot is not None:  # handle_unknown='ignore' -> all zeros
+                out[slot] = 1.0
+        for col, slot in self.passthrough:
+            value = values.get(col)
+            out[slot] = math.nan if value is None else value
+        return out
+
+    def transform_batch(self, records):
+        """Vectorizes many applications into one preallocated (n, n_features) matrix."""
+        X = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for i, record in enumerate(records):
+            self.transform_one(record, out=X[i])
+        return X
+
+    def transform_columns(self, columns, n_rows):
+        """
+        Vectorized variant for columnar input: `columns` maps each raw field to an
+        array of length `n_rows` (float arrays for numbers, object arrays for strings).
+        """
+        X = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        nan = np.full(n_rows, np.nan)
+
+        def numeric(col):
+            return np.asarray(values.get(col, nan), dtype=np.float64)
+
+        values = dict(columns)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name, num, den, ratio in self.ratios:
+                a, b = numeric(num), numeric(den)
+                if ratio is _safe_ratio:
+                    ok = (b != 0) & ~np.isnan(a) & ~np.isnan(b)
+                    values[name] = np.divide(a, b, out=np.zeros(n_rows), where=ok)
+                else:
+                    ratio_values = a / b
+                    ratio_values[np.isnan(ratio_values)] = 0.0
+                    values[name] = ratio_values
+
+        for col, slot, fill in self.numeric:
+            v = numeric(col)
+            X[:, slot] = np.where(np.isnan(v), fill, v)
+        for col, fill, slots in self.categorical:
+            v = np.asarray(values.get(col, np.full(n_rows, None)), dtype=object)
+            missing = np.fromiter((_is_missing(x) for x in v), dtype=bool, count=n_rows)
+            v = np.where(missing, fill, v)
+            for cat, slot in slots.items():
+                X[:, slot] = v == cat
+        for col, slot in self.passthrough:
+            X[:, slot] = numeric(col)
+        return X
+
+
+def predict_default_proba(model, X):
+    """Probability of default straight from the booster (same values as `predict_proba[:, 1]`)."""
+    X = np.atleast_2d(X)
+    return model.get_booster().inplace_predict(X, validate_features=False)
+
+
+def check_parity(pipeline, model, df):
+    """
+    Scores `df` with both the sklearn pipeline and the compiled path.
+    Returns the number of rows whose probabilities are not bit-identical.
+    """
+    import pandas as pd
+
+    compiled = CompiledPipeline.from_artifacts(pipeline, model)
+    X_ref = pd.DataFrame(pipeline.transform(df), columns=pipeline.named_steps['preprocessor'].get_feature_names_out())
+    expected = model.predict_proba(X_ref)[:, 1]
+
+    records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    actual = predict_default_proba(model, compiled.transform_batch(records))
+
+    mismatches = int(np.sum(expected.view(np.uint32) != actual.view(np.uint32)))
+    logging.info(f"Parity check on {len(df)} rows: {mismatches} mismatches")
+    return mismatches
+
+
+if __name__ == "__main__":
+    import joblib
+    import pandas as pd
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    model = joblib.load("models/registry/credit_model_latest.joblib")
+    pipeline = joblib.load("models/preprocessing_pipeline.joblib")
+
+    # Rebuild API-shaped inputs from the reference dataset (incl. missing values)
+    df = pd.read_csv("notebooks/credit_risk_dataset.csv").drop(columns=['loan_status'])
+    df['loan_percent_income'] = df['loan_amnt'] / df['person_income']
+
+    if check_parity(pipeline, model, df):
+        raise SystemExit("Compiled scoring path diverges from the sklearn pipeline!")
+    print("✅ Compiled scoring path is bit-identical to the sklearn pipeline.")
@@ -0,0 +1,54 @@
+## model_watcher.py
+## Background hot-swap: polls the registry's LATEST pointer and, when it moves,
+## loads the new version off the event loop and swaps it in with a single
+## reference assignment. Requests hold on to the bundle they started with, so
+## in-flight work finishes on the old model and nothing is dropped.
+
+import asyncio
+import logging
+
+
+class ModelWatcher:
+    def __init__(self, registry, load_bundle, poll_seconds=10.0, on_swap=None):
+        self.registry = registry
+        self.load_bundle = load_bundle
+        self.poll_seconds = poll_seconds
+        # Called with (previous, new) bundle right after a swap, e.g. to flush caches
+        self.on_swap = on_swap
+        self.current = None
+        self._task = None
+
+    async def check(self):
+        """Swaps to the registry's latest version if it changed. Returns True on a swap."""
+        version = self.registry.latest_version()
+        if version is None or (self.current is not None and version == self.current.version):
+            return False
+        try:
+            bundle = await asyncio.to_thread(self.load_bundle, version)
+        except Exception as e:
+            # Keep serving the old model; the next poll retries
+            logging.error(f"Could not load model v{version}, keeping v{self.current.version}: {e}")
+            return False
+        previous, self.current = self.current, bundle
+        if self.on_swap is not None:
+            self.on_swap(previous, bundle)
+        logging.info(f"Hot-swapped model v{previous.version if previous else None} -> v{bundle.version}")
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            await self.check()
+
+    def start(self):
+        if self.poll_seconds and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
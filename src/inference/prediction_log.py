@@ -0,0 +1,251 @@
+## prediction_log.py
+## Audit log of every decision: the application's features, probability,
+## decision and model version. Request handlers only append to a bounded
+## in-memory ring buffer; a background thread drains it in batches to rotating
+## JSONL or Parquet files. When the buffer is full new records are dropped
+## (and counted) instead of waiting, so logging can never stall scoring.
+## Batch scoring writes the same fields through the same writer directly, as
+## columnar Parquet tables built from the scored frame (no per-row records).
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from src.monitoring.metrics import REGISTRY
+
+LOGGED = REGISTRY.counter("lendguard_prediction_log_records_total", "Prediction records written to the log")
+DROPPED = REGISTRY.counter("lendguard_prediction_log_dropped_total", "Prediction records dropped (buffer full)")
+WRITE_ERRORS = REGISTRY.counter("lendguard_prediction_log_write_errors_total", "Prediction log batches that failed to write")
+
+DEFAULT_PREDICTION_LOG = {
+    'enabled': True,
+    'directory': 'data/predictions/log',
+    # jsonl | parquet
+    'format': 'jsonl',
+    'capacity': 100000,
+    'batch_size': 1000,
+    'flush_seconds': 1.0,
+    'rotate_rows': 1000000,
+    'rotate_seconds': 3600
+}
+
+# Files being written carry this suffix; they are renamed when rotated or closed
+OPEN_SUFFIX = ".open"
+
+
+def load_prediction_log_config(config):
+    return {**DEFAULT_PREDICTION_LOG, **(config.get('prediction_log') or {})}
+
+
+def prediction_record(prediction_id, features, probability, model_version, source, threshold=0.5):
+    """One log entry; `features` is the application as scored (after derived features)."""
+    return {
+        "prediction_id": prediction_id,
+        "logged_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "source": source,
+        "model_version": None if model_version is None else str(model_version),
+        "features": features,
+        "probability": float(probability),
+        "decision": "REJECT" if probability > threshold else "APPROVE"
+    }
+
+
+def prediction_table(prediction_ids, features, probabilities, model_version, source, threshold=0.5):
+    """Columnar prediction_record for a scored frame: `features` becomes a struct column."""
+    import numpy as np
+    import pyarrow as pa
+
+    n = len(prediction_ids)
+    probabilities = np.asarray(probabilities, dtype=float)
+    batch = pa.RecordBatch.from_pandas(features, preserve_index=False)
+    # Categorical columns as plain strings, like the API's records
+    columns = [c.dictionary_decode() if pa.types.is_dictionary(c.type) else c for c in batch.columns]
+
+    def constant(value):
+        return pa.array([value] * n, pa.string())
+
+    return pa.table({
+        "prediction_id": pa.array(prediction_ids, pa.string()),
+        "logged_at": constant(datetime.now(timezone.utc).isoformat(timespec="milliseconds")),
+        "source": constant(source),
+        "model_version": constant(None if model_version is None else str(model_version)),
+        "features": pa.StructArray.from_arrays(columns, names=batch.schema.names),
+        "probability": pa.array(probabilities),
+        "decision": pa.array(np.where(probabilities > threshold, "REJECT", "APPROVE"))
+    })
+
+
+def _json_default(value):
+    # NumPy scalars from batch frames
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class RotatingLogWriter:
+    """
+    Appends record batches to `<directory>/<source>-<pid>-<started ms>.<jsonl|parquet>`,
+    starting a new file every `rotate_rows` records or `rotate_seconds`.
+    """
+
+    def __init__(self, directory, source, fmt="jsonl", rotate_rows=1000000, rotate_seconds=3600):
+        if fmt not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown prediction log format '{fmt}' (use jsonl or parquet)")
+        self.directory = directory
+        self.source = source
+        self.format = fmt
+        self.rotate_rows = rotate_rows
+        self.rotate_seconds = rotate_seconds
+        self.path = None
+        self._file = None
+        self._schema = None
+        self._rows = 0
+        self._started = 0.0
+
+    @classmethod
+    def from_settings(cls, settings, source):
+        return cls(settings['directory'], source, settings['format'],
+                   settings['rotate_rows'], settings['rotate_seconds'])
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._started = time.time()
+        self.path = os.path.join(self.directory,
+                                 f"{self.source}-{os.getpid()}-{int(self._started * 1000)}.{self.format}")
+        self._rows = 0
+        if self.format == "jsonl":
+            self._file = open(self.path + OPEN_SUFFIX, "w")
+
+    def close(self):
+        """Finishes the current file (renamed to its final name)."""
+        if self.path is None:
+            return
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.path + OPEN_SUFFIX):
+            os.replace(self.path + OPEN_SUFFIX, self.path)
+        self.path, self._file, self._schema = None, None, None
+
+    def _rotate(self):
+        if self.path is not None and (self._rows >= self.rotate_rows
+                                      or time.time() - self._started >= self.rotate_seconds):
+            self.close()
+        if self.path is None:
+            self._open()
+
+    def write(self, records):
+        if not records:
+            return
+        self._rotate()
+        if self.format == "jsonl":
+            self._file.write("".join(json.dumps(r, default=_json_default) + "\n" for r in records))
+            self._file.flush()
+        else:
+            import pyarrow as pa
+            self._write_parquet(pa.Table.from_pylist(records))
+        self._rows += len(records)
+        LOGGED.inc(len(records))
+
+    def write_table(self, table):
+        """Appends a pyarrow Table of records (see prediction_table)."""
+        if self.format == "jsonl":
+            # Row-wise like write(); the columnar path is what Parquet is for
+            self.write(table.to_pylist())
+            return
+        if table.num_rows == 0:
+            return
+        self._rotate()
+        self._write_parquet(table)
+        self._rows += table.num_rows
+        LOGGED.inc(table.num_rows)
+
+    def _write_parquet(self, table):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._file is not None:
+            try:
+                table = table.cast(self._schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+                # Types changed (e.g. a column that was all-null so far): start a new file
+                self.close()
+                self._open()
+        if self._file is None:
+            self._schema = table.schema
+            self._file = pq.ParquetWriter(self.path + OPEN_SUFFIX, self._schema, compression="zstd")
+        self._file.write_table(table)
+
+
+class PredictionLog:
+    """
+    Bounded buffer in front of a RotatingLogWriter, drained by a background
+    thread every `flush_seconds` or as soon as `batch_size` records wait.
+    """
+
+    def __init__(self, writer, capacity=100000, batch_size=1000, flush_seconds=1.0):
+        self.writer = writer
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_settings(cls, settings, source):
+        return cls(RotatingLogWriter.from_settings(settings, source), settings['capacity'],
+                   settings['batch_size'], settings['flush_seconds'])
+
+    def log(self, records):
+        """Enqueues records without blocking; returns how many were dropped."""
+        with self._lock:
+            free = self.capacity - len(self._buffer)
+            accepted = records[:max(free, 0)]
+            self._buffer.extend(accepted)
+            waiting = len(self._buffer)
+        dropped = len(records) - len(accepted)
+        if dropped:
+            DROPPED.inc(dropped)
+        if waiting >= self.batch_size:
+            self._wake.set()
+        return dropped
+
+    def flush(self):
+        """Writes everything buffered so far, a batch at a time (background thread / shutdown)."""
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return
+            try:
+                self.writer.write(batch)
+            except Exception as e:
+                WRITE_ERRORS.inc()
+                logging.error(f"Prediction log write failed, {len(batch)} records lost: {e}")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the writer thread, then drains the buffer and closes the current file."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self.writer.close()
@@ -0,0 +1,156 @@
+## result_cache.py
+## Result cache for /predict: the same applicant payload re-submitted within a
+## session (page refreshes, quote comparisons) is answered without rerunning
+## the pipeline and model. Keys are a canonical hash of the application plus
+## the model version, so a hot-swapped model never serves the previous
+## model's scores.
+##
+## Local tier: in-process LRU with TTL. Optional shared tier: a SQLite file
+## that every worker on the host can read (a local stand-in for Redis, with
+## the same get/set-with-expiry contract). Its calls can wait on the file lock,
+## so async callers run them in a thread; expired rows are purged periodically.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.monitoring.metrics import REGISTRY
+
+HITS = REGISTRY.counter("lendguard_cache_hits_total", "Predictions served from the result cache")
+MISSES = REGISTRY.counter("lendguard_cache_misses_total", "Result cache lookups that had to score")
+EVICTIONS = REGISTRY.counter("lendguard_cache_evictions_total", "Entries evicted from the local cache (capacity)")
+EXPIRATIONS = REGISTRY.counter("lendguard_cache_expirations_total", "Entries dropped because their TTL passed")
+INVALIDATIONS = REGISTRY.counter("lendguard_cache_invalidations_total", "Local cache flushes on model hot-swap")
+
+
+def application_key(record, model_version):
+    """Canonical hash of an application: field order and int/float spelling do not matter."""
+    canonical = {name: float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+                 for name, value in record.items()}
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{model_version}|{payload}".encode()).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry TTL (monotonic clock)."""
+
+    def __init__(self, capacity=10000, ttl_seconds=300.0):
+        self.capacity = capacity
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                EXPIRATIONS.inc()
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                EVICTIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Shared tier: one SQLite file per host, entries expire by wall-clock time."""
+
+    def __init__(self, path, ttl_seconds=300.0):
+        self.path = path
+        self.ttl = ttl_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A cache can lose its last writes on power loss; no fsync per set
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= time.time():
+            EXPIRATIONS.inc()
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                               (key, json.dumps(value), time.time() + self.ttl))
+
+    def purge(self):
+        """Deletes expired rows (an index range scan); returns how many."""
+        with self._lock:
+            return self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+class ResultCache:
+    """Local LRU in front of an optional shared tier."""
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    @classmethod
+    def from_config(cls, settings):
+        local = LRUCache(settings.get('capacity', 10000), settings.get('ttl_seconds', 300))
+        shared = None
+        if settings.get('shared_backend') == 'sqlite':
+            shared = SQLiteCache(settings.get('shared_path', 'models/.result_cache.sqlite'),
+                                 settings.get('ttl_seconds', 300))
+        elif settings.get('shared_backend'):
+            raise ValueError(f"Unknown result cache backend '{settings['shared_backend']}' (use sqlite)")
+        return cls(local, shared)
+
+    def get(self, key, shared=True):
+        """
+        Local tier, then the shared one. With `shared=False` a local miss returns
+        None uncounted, so an async caller can ask again (in a thread) with it.
+        """
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            if not shared:
+                return None
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        (HITS if value is not None else MISSES).inc()
+        return value
+
+    def set(self, key, value, shared=True):
+        self.local.set(key, value)
+        if shared and self.shared is not None:
+            self.shared.set(key, value)
+
+    def purge(self):
+        """Drops expired shared entries (local ones expire on lookup)."""
+        return self.shared.purge() if self.shared is not None else 0
+
+    def invalidate(self):
+        # Shared entries carry the old model version in their key and just age out
+        self.local.clear()
+        INVALIDATIONS.inc()
@@ -0,0 +1,44 @@
+## startup.py
+## Cold-start bookkeeping for the API. The server starts accepting connections
+## right away; artifacts are loaded and warmed up in the background, and
+## /readyz only reports ready once a warm-up batch has been scored, so the load
+## balancer never routes traffic to a cold worker.
+
+import time
+import logging
+from contextlib import contextmanager
+
+
+class StartupState:
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.timings = {}
+        self.ready = False
+        self.error = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+
+    def mark_ready(self):
+        self.ready = True
+        self.timings['total'] = round(time.perf_counter() - self.started, 4)
+        logging.info(f"API ready in {self.timings['total']:.2f}s ({self.timings})")
+
+    def mark_failed(self, error):
+        self.error = str(error)
+        logging.error(f"API startup failed: {error}")
+
+    def report(self):
+        return {"ready": self.ready, "error": self.error, "timings": self.timings}
+
+
+def warmup_records(example, rows):
+    """`rows` copies of an example application (with the derived income ratio)."""
+    record = dict(example)
+    record['loan_percent_income'] = record['loan_amnt'] / record['person_income']
+    return [dict(record) for _ in range(rows)]
@@ -13,6 +13,8 @@ logging.basicConfig(
     ]
 )
 
+PERFORMANCE_REPORT_PATH = "models/monitoring/performance_report.json"
+
 def load_report(filepath):
     if os.path.exists(filepath):
         with open(filepath, 'r') as f:
@@ -30,18 +32,34 @@ def run_alerts():
         else:
             logging.info("Data drift check passed: All features stable.")
 
-    # 2. Check Model Performance Report (from evaluation or model_drift)
-    # Let's assume we saved a specific model_drift_report.json earlier
-    model_report = load_report("models/evaluation_report.json")
+    # 2. Check Model Performance: the rolling metrics on labeled production
+    # predictions (model_drift.py), or the offline evaluation until outcomes arrive
+    # Define a hard "Service Level Agreement" (SLA) threshold
+    SLA_THRESHOLD = 0.80
+    performance = load_report(PERFORMANCE_REPORT_PATH)
+    if performance and performance.get('overall'):
+        source = f"model v{performance.get('model_version')}, " \
+                 f"rolling {performance['rolling_windows']} x {performance['window_hours']}h, " \
+                 f"{performance['overall']['labeled']} labeled"
+        model_report = performance['overall']
+    else:
+        source = "offline evaluation"
+        model_report = load_report("models/evaluation_report.json")
     if model_report:
         f1_score = model_report.get('f1_score', 0)
-        # Define a hard "Service Level Agreement" (SLA) threshold
-        SLA_THRESHOLD = 0.80 
-        
+
         if f1_score < SLA_THRESHOLD:
-            logging.error(f"CRITICAL: Model performance (F1: {f1_score:.4f}) has fallen below SLA ({SLA_THRESHOLD})")
+            logging.error(f"CRITICAL: Model performance (F1: {f1_score:.4f}, {source}) has fallen below SLA ({SLA_THRESHOLD})")
         else:
-            logging.info(f"Model performance is healthy (F1: {f1_score:.4f})")
+            logging.info(f"Model performance is healthy (F1: {f1_score:.4f}, {source})")
+
+    # 3. Segments (loan grades) below the SLA, from the same snapshot
+    if performance and performance.get('overall'):
+        for segment, groups in performance['segments'].items():
+            failing = {group: round(m['f1_score'], 4) for group, m in groups.items()
+                       if m['positives'] and m['f1_score'] < SLA_THRESHOLD}
+            if failing:
+                logging.warning(f"Model performance below SLA for {segment}: {failing}")
 
     logging.info("Alert scan complete.")
 
@@ -1,60 +1,203 @@
 ## Data Drift Detection
 ## it is actually not required as model_drift performance is better, yet adding just for reference
+##
+## Drift is computed from sketches (see sketches.py), not from full files:
+## the training split is summarized once into a baseline stored under
+## models/monitoring/, and the current window is either a batch dataset
+## streamed chunk by chunk or the window files the API and batch scoring
+## write as they score (`python -m src.monitoring.data_drift --window`).
 
-import pandas as pd
 import yaml
 import logging
-from scipy.stats import ks_2samp
 import json
 import os
+import time
+import argparse
+import threading
+from datetime import datetime
+from src.data.dataset_io import iter_dataset
+from src.monitoring.sketches import SketchSet, compare
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
+REPORT_PATH = "models/monitoring/data_drift_report.json"
+
+DEFAULT_DRIFT = {
+    'bins': 64,
+    'max_categories': 50,
+    'chunk_size': 100000,
+    'alpha': 0.05,
+    'psi_threshold': 0.2,
+    'baseline_path': 'models/monitoring/drift_baseline.json',
+    'window_dir': 'models/monitoring/drift_windows',
+    # Scorers start a new window file this often; --window merges the ones from the last lookback
+    'window_seconds': 3600,
+    'lookback_seconds': 86400
+}
+
 def load_config():
     with open("configs/data.yaml", "r") as f:
         return yaml.safe_load(f)
 
-def check_data_drift():
+def drift_settings(config):
+    return {**DEFAULT_DRIFT, **(config.get('drift') or {})}
+
+def monitored_features(config):
+    return config['schema']['numerical_features'], config['schema']['categorical_features']
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def sketch_dataset(path, template, config, chunk_size):
+    """Streams a dataset into an empty copy of `template` (one chunk in memory at a time)."""
+    sketch = template.empty_copy(metadata={"source": path})
+    for chunk in iter_dataset(path, chunk_size, columns=list(template.sketches), config=config):
+        sketch.update(chunk, len(chunk))
+    return sketch
+
+def build_baseline(config=None):
+    """Baseline sketches of the training split; bin edges come from its first chunk."""
+    config = config or load_config()
+    settings = drift_settings(config)
+    numerical, categorical = monitored_features(config)
+    path = config['data_paths']['processed_train']
+
+    chunks = iter_dataset(path, settings['chunk_size'], columns=numerical + categorical, config=config)
+    first = next(chunks)
+    baseline = SketchSet.from_frame(first, numerical, categorical, settings['bins'], settings['max_categories'])
+    baseline.update(first, len(first))
+    for chunk in chunks:
+        baseline.update(chunk, len(chunk))
+    baseline.metadata = {"source": path, "source_signature": _source_signature(path),
+                         "created_at": datetime.now().isoformat(timespec="seconds")}
+    baseline.save(settings['baseline_path'])
+    logging.info(f"Drift baseline built from {baseline.rows} rows of {path} -> {settings['baseline_path']}")
+    return baseline
+
+def load_baseline(config=None):
+    """The stored baseline, rebuilt if the training split changed since it was built."""
+    config = config or load_config()
+    settings = drift_settings(config)
+    path = config['data_paths']['processed_train']
+    if os.path.exists(settings['baseline_path']):
+        baseline = SketchSet.load(settings['baseline_path'])
+        if not os.path.exists(path) or baseline.metadata.get('source_signature') == _source_signature(path):
+            return baseline
+    return build_baseline(config)
+
+def load_window(settings, template, since=None):
+    """Merges every window file started at or after `since` (epoch seconds)."""
+    window = template.empty_copy(metadata={"source": settings['window_dir']})
+    if not os.path.isdir(settings['window_dir']):
+        return window
+    for name in sorted(os.listdir(settings['window_dir'])):
+        if not name.endswith(".json"):
+            continue
+        started = int(name[:-len(".json")].rsplit("-", 1)[-1])
+        if since is None or started >= since:
+            window.merge(SketchSet.load(os.path.join(settings['window_dir'], name)))
+    return window
+
+class DriftWindow:
+    """
+    The current window of a scorer (API worker or batch job). Updated as
+    records are scored, flushed to its own file in `window_dir`, and rolled
+    over every `window_seconds`, so memory stays at one sketch set. Single
+    records are buffered and folded in a batch at a time, keeping the
+    per-request cost to a list append.
+    """
+
+    def __init__(self, baseline, settings, source, max_pending=10000):
+        self.baseline = baseline
+        self.settings = settings
+        self.source = source
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self.started = int(time.time())
+        self.sketch = self.baseline.empty_copy()
+
+    @property
+    def path(self):
+        return os.path.join(self.settings['window_dir'], f"{self.source}-{os.getpid()}-{self.started}.json")
+
+    def update(self, columns, n_rows):
+        self.sketch.update(columns, n_rows)
+
+    def add_records(self, records):
+        with self._lock:
+            self._pending.extend(records)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._apply_pending()
+
+    def _apply_pending(self):
+        with self._lock:
+            records, self._pending = self._pending, []
+        if records:
+            self.sketch.update_records(records)
+
+    def flush(self):
+        self._apply_pending()
+        if self.sketch.rows:
+            self.sketch.save(self.path)
+        if time.time() - self.started >= self.settings['window_seconds']:
+            self._start()
+
+def check_data_drift(window=False):
     config = load_config()
-    
-    # 1. Load Baseline (Train) and Current (Drift/Future) Data
-    # We compare the RAW features before they were transformed
-    train_df = pd.read_csv("data/processed/train_final.csv")
-    current_df = pd.read_csv("data/validation/drift_test.csv")
-    
-    numerical_features = config['schema']['numerical_features']
+    settings = drift_settings(config)
+
+    # 1. Baseline (Train) sketches, and the Current (Drift/Future) window
+    baseline = load_baseline(config)
+    if window:
+        current = load_window(settings, baseline, since=time.time() - settings['lookback_seconds'])
+    else:
+        current = sketch_dataset(config['data_paths']['drift_test'], baseline, config, settings['chunk_size'])
+    if not current.rows:
+        logging.warning(f"No rows in the current window ({current.metadata.get('source')}); skipping drift check.")
+        return False
+
     drift_report = {}
     drift_detected = False
 
-    logging.info("--- Running Data Drift Analysis (KS Test) ---")
+    logging.info(f"--- Running Data Drift Analysis (sketches: {baseline.rows} baseline vs {current.rows} current rows) ---")
 
-    for feature in numerical_features:
-        # 2. Perform Kolmogorov-Smirnov test
+    for feature, sketch in baseline.sketches.items():
+        # 2. KS (numerical) or chi-square (categorical) from the sketches, plus PSI
         # Null Hypothesis: The two samples are drawn from the same distribution
-        stat, p_value = ks_2samp(train_df[feature], current_df[feature])
-        
-        # P-value < 0.05 means we reject the null hypothesis (Drift exists)
-        is_drifted = p_value < 0.05
-        drift_report[feature] = {
-            "p_value": float(p_value),
-            "drift_detected": bool(is_drifted)
-        }
-        
+        result = compare(sketch, current.sketches[feature])
+        is_drifted = result['p_value'] < settings['alpha'] or result['psi'] >= settings['psi_threshold']
+        drift_report[feature] = {**result, "drift_detected": bool(is_drifted)}
+
         if is_drifted:
-            logging.warning(f"🚨 DRIFT DETECTED in '{feature}' (p={p_value:.4f})")
+            logging.warning(f"🚨 DRIFT DETECTED in '{feature}' ({result['test']} p={result['p_value']:.4f}, "
+                            f"PSI={result['psi']:.3f})")
             drift_detected = True
         else:
-            logging.info(f"✅ Feature '{feature}' is stable (p={p_value:.4f})")
+            logging.info(f"✅ Feature '{feature}' is stable ({result['test']} p={result['p_value']:.4f}, "
+                         f"PSI={result['psi']:.3f})")
 
     # 3. Save the report
     os.makedirs("models/monitoring", exist_ok=True)
-    with open("models/monitoring/data_drift_report.json", "w") as f:
+    with open(REPORT_PATH, "w") as f:
         json.dump(drift_report, f, indent=4)
 
     if not drift_detected:
         logging.info("Overall Result: Data remains stable.")
-    
+
     return drift_detected
 
 if __name__ == "__main__":
-    check_data_drift()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sketch-based data drift check.")
+    parser.add_argument("--window", action="store_true",
+                        help="Compare against the windows written by the API / batch scoring instead of drift_test")
+    parser.add_argument("--rebuild-baseline", action="store_true")
+    args = parser.parse_args()
+    if args.rebuild_baseline:
+        build_baseline()
+    check_data_drift(window=args.window)
@@ -0,0 +1,154 @@
+## instrumentation.py
+## Where the time goes: per-stage scoring latency histograms and request
+## metrics for the API (/metrics), and run reports (duration, rows/sec, peak
+## RSS per stage) written as JSON by the pipeline and batch scoring.
+
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.monitoring.metrics import LATENCY_SECONDS_BUCKETS, REGISTRY
+
+RUN_REPORT_DIR = "models/monitoring/run_reports"
+
+# Scoring stages of one request: payload validation, preprocessing (compiled
+# or PIPELINE.transform), DataFrame reconstruction (pipeline path only) and the model call
+SCORING_STAGES = ("validation", "transform", "dataframe", "predict_proba")
+
+
+def stage_histogram(stage):
+    return REGISTRY.histogram("lendguard_inference_stage_seconds", "Time spent per scoring stage",
+                              LATENCY_SECONDS_BUCKETS, labels={"stage": stage})
+
+
+STAGE_SECONDS = {stage: stage_histogram(stage) for stage in SCORING_STAGES}
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware: latency histogram, in-flight gauge and error counter per
+    endpoint. Latency covers the whole response, streamed bodies included.
+    Paths outside `endpoints` are grouped as "other" to bound label cardinality.
+    """
+
+    def __init__(self, app, endpoints=()):
+        self.app = app
+        self.endpoints = set(endpoints)
+        self._metrics = {}
+
+    def _for(self, endpoint):
+        if endpoint not in self._metrics:
+            labels = {"endpoint": endpoint}
+            self._metrics[endpoint] = (
+                REGISTRY.histogram("lendguard_request_seconds", "HTTP request latency", LATENCY_SECONDS_BUCKETS, labels),
+                REGISTRY.gauge("lendguard_requests_in_flight", "HTTP requests being handled", labels))
+        return self._metrics[endpoint]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REGISTRY.enabled:
+            return await self.app(scope, receive, send)
+
+        endpoint = scope["path"] if scope["path"] in self.endpoints else "other"
+        latency, in_flight = self._for(endpoint)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            latency.observe(time.perf_counter() - start)
+            in_flight.dec()
+            if status >= 400:
+                REGISTRY.counter("lendguard_request_errors_total", "HTTP responses with a 4xx/5xx status",
+                                 {"endpoint": endpoint, "status": str(status)}).inc()
+
+
+# --- Run reports ---
+
+def reset_peak_rss():
+    """Restarts the peak-RSS high-water mark (Linux); elsewhere peaks are since process start."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_bytes():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RunReport:
+    """
+    Per-stage duration, rows, rows/sec and peak RSS of one run. `stage()`
+    accumulates, so a per-chunk step timed in a loop adds up to its total.
+    """
+
+    def __init__(self, name, metadata=None):
+        self.name = name
+        self.metadata = metadata or {}
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds, rows=None, peak_rss=None, **extra):
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "rows": None, "peak_rss_mb": None})
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+        if rows is not None:
+            entry["rows"] = (entry["rows"] or 0) + rows
+        if peak_rss is not None:
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"] or 0.0, round(peak_rss / 2**20, 1))
+        entry.update(extra)
+        return entry
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Times the block; the yielded dict takes a late `rows` count (e.g. rows read)."""
+        info = {"rows": rows}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.add(name, time.perf_counter() - start, info["rows"], peak_rss_bytes())
+
+    def to_dict(self):
+        stages = {}
+        for name, entry in self.stages.items():
+            rows, seconds = entry["rows"], entry["seconds"]
+            stages[name] = {**entry, "seconds": round(seconds, 6),
+                            "rows_per_second": round(rows / seconds, 1) if rows and seconds else None}
+        return {"run": self.name, "started_at": self.started_at.isoformat(timespec="seconds"),
+                "wall_seconds": round(time.perf_counter() - self._start, 6),
+                "peak_rss_mb": round(peak_rss_bytes() / 2**20, 1),
+                **self.metadata, "stages": stages}
+
+    def save(self, path=None):
+        """Writes `<RUN_REPORT_DIR>/<name>-<timestamp>.json` (or `path`) and returns the path."""
+        path = path or os.path.join(RUN_REPORT_DIR, f"{self.name}-{self.started_at:%Y%m%dT%H%M%S}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        os.replace(tmp_path, path)
+        return path
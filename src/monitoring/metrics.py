@@ -0,0 +1,180 @@
+## metrics.py
+## Minimal in-process metrics (Prometheus text format) for the serving layer.
+## Metrics may carry constant labels (e.g. stage="transform"); series sharing a
+## name are rendered under one HELP/TYPE header. Timers are no-ops while the
+## registry is disabled, so instrumented hot paths cost a flag check.
+
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+
+# Buckets tuned for the micro-batcher: batch sizes and sub-10ms queue waits
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+WAIT_SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+# Request and scoring stage latencies: 10us (one compiled record) to 10s (a bulk batch)
+LATENCY_SECONDS_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                           0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+_NULL_TIMER = nullcontext()
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class _Timer:
+    """Observes the duration of a `with` block into a histogram."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, safe to observe from any thread."""
+
+    type = "histogram"
+
+    def __init__(self, name, description, buckets, labels=(), registry=None):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        self.registry = registry
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def time(self):
+        """`with histogram.time():` records the block's duration (nothing when disabled)."""
+        if self.registry is not None and not self.registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def render_samples(self):
+        counts, total = self.snapshot()
+        lines = []
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            lines.append(f'{self.name}_bucket{_label_text(self.labels, [("le", bound)])} {running}')
+        running += counts[-1]
+        lines.append(f'{self.name}_bucket{_label_text(self.labels, [("le", "+Inf")])} {running}')
+        lines.append(f"{self.name}_sum{_label_text(self.labels)} {total}")
+        lines.append(f"{self.name}_count{_label_text(self.labels)} {running}")
+        return lines
+
+    def render(self):
+        return "\n".join([f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type}"]
+                         + self.render_samples())
+
+
+class Counter:
+    """Monotonic counter, safe to increment from any thread."""
+
+    type = "counter"
+
+    def __init__(self, name, description, labels=(), registry=None):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.registry = registry
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        with self._lock:
+            return self._value
+
+    def render_samples(self):
+        return [f"{self.name}{_label_text(self.labels)} {self.value}"]
+
+    def render(self):
+        return "\n".join([f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type}"]
+                         + self.render_samples())
+
+
+class Gauge(Counter):
+    """A value that goes up and down (e.g. requests in flight)."""
+
+    type = "gauge"
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, description, labels, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            if key not in self._metrics:
+                self._metrics[key] = cls(name, description, labels=key[1], registry=self, **kwargs)
+            return self._metrics[key]
+
+    def histogram(self, name, description, buckets, labels=None):
+        """Returns the histogram registered under `name` (and `labels`), creating it on first use."""
+        return self._get(Histogram, name, description, labels, buckets=buckets)
+
+    def counter(self, name, description, labels=None):
+        """Returns the counter registered under `name` (and `labels`), creating it on first use."""
+        return self._get(Counter, name, description, labels)
+
+    def gauge(self, name, description, labels=None):
+        """Returns the gauge registered under `name` (and `labels`), creating it on first use."""
+        return self._get(Gauge, name, description, labels)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        # One HELP/TYPE header per metric name, then every labeled series of it
+        by_name = {}
+        for metric in metrics:
+            by_name.setdefault(metric.name, []).append(metric)
+        blocks = []
+        for name, series in by_name.items():
+            lines = [f"# HELP {name} {series[0].description}", f"# TYPE {name} {series[0].type}"]
+            for metric in series:
+                lines.extend(metric.render_samples())
+            blocks.append("\n".join(lines))
+        return "\n".join(blocks) + "\n"
+
+
+# Process-wide registry used by the API and its helpers
+REGISTRY = MetricsRegistry()
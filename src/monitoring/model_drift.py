@@ -1,57 +1,86 @@
-import joblib
-import pandas as pd
+## Model Drift (performance) Monitoring
+## Predictions are logged with IDs when they are scored (API and batch scoring,
+## see performance_store.py). This check only joins the outcomes that arrived
+## since the last run and reads the rolling metrics from the store's
+## aggregates, so historical applications are never re-transformed or re-scored.
+
+import yaml
 import json
 import logging
-from sklearn.metrics import f1_score
-
-def check_model_drift():
-    # 1. Load the "Production" Model and the Pipeline
-    model = joblib.load("models/registry/credit_model_latest.joblib")
-    pipeline = joblib.load("models/preprocessing_pipeline.joblib")
-    
-    # 2. Load the "Future/Validation" Data
-    # This data has NOT been through the pipeline yet
-    drift_df = pd.read_csv("data/validation/drift_test.csv")
-    X_drift = drift_df.drop(columns=['loan_status'])
-    y_drift = drift_df['loan_status']
-    
-    # 3. Transform the "Future" data using the saved pipeline
-    # We use only .transform() to simulate real-world arrival
-    X_drift_proc = pipeline.transform(X_drift)
-
-    try:
-        # For newer sklearn versions
-        feature_names = pipeline.get_feature_names_out()
-    except:
-        # For older sklearn versions, get names from the 'preprocessor' step
-        feature_names = pipeline.named_steps['preprocessor'].get_feature_names_out()
-
-    # Create the DataFrame using the EXACT names the model expects
-    X_drift_df = pd.DataFrame(X_drift_proc, columns=feature_names)
-    
-    """# Convert to DataFrame with string columns (to match training)
-    X_drift_df = pd.DataFrame(X_drift_proc)
-    X_drift_df.columns = [str(i) for i in range(X_drift_df.shape[1])]"""
-    
-    # 4. Predict and Score
-    y_pred = model.predict(X_drift_df)
-    current_f1 = f1_score(y_drift, y_pred)
-    
-    # 5. Compare against Training Baseline
+import argparse
+from src.data.dataset_io import dataset_path, iter_dataset
+from src.monitoring.performance_store import PerformanceStore, dataset_row_ids, load_performance_config
+from src.training.registry import ModelRegistry
+
+def load_config():
+    with open("configs/inference.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def iter_outcomes(path, label_column, chunk_size=100000):
+    """
+    (prediction_id, label) pairs from an outcomes file, a chunk at a time.
+    Files without a `prediction_id` column are matched by row number, the
+    IDs batch scoring gives the rows of a file (e.g. the labeled drift set)
+    under every model version that scored it.
+    """
+    start = 0
+    for chunk in iter_dataset(path, chunk_size):
+        if 'prediction_id' in chunk:
+            ids = chunk['prediction_id'].astype(str).tolist()
+        else:
+            ids = dataset_row_ids(path, start, len(chunk))
+        start += len(chunk)
+        # Outcomes not known yet (NaN) are left for a later run
+        yield [(pid, int(label)) for pid, label in zip(ids, chunk[label_column].tolist()) if label == label]
+
+def ingest_outcomes(store, path, label_column):
+    joined = sum(store.join_labels(pairs) for pairs in iter_outcomes(path, label_column))
+    logging.info(f"Joined {joined} new outcomes from {path}")
+    return joined
+
+def check_model_drift(labels_path=None):
+    settings = load_performance_config(load_config())
+    store = PerformanceStore.from_settings(settings)
+
+    # 1. Join the outcomes that arrived since the last run (already-labeled IDs are skipped)
+    # Without an outcomes feed the labeled drift set stands in for late-arriving defaults
+    labels_path = labels_path or settings['labels_path'] or dataset_path('drift_test')
+    ingest_outcomes(store, labels_path, settings['label_column'])
+
+    # 2. Rolling metrics of the live model from the per-window aggregates (no re-scoring)
+    model_version = ModelRegistry().latest_version()
+    report = store.write_report(settings, model_version)
+    current = report['overall']
+    if current is None:
+        logging.warning(f"No labeled predictions of model v{model_version} in the last "
+                        f"{settings['rolling_windows']} windows; skipping model drift check "
+                        f"({report['pending_labels']} awaiting outcomes).")
+        return False
+
+    # 3. Compare against Training Baseline
     with open("models/evaluation_report.json", "r") as f:
         baseline = json.load(f)
     baseline_f1 = baseline['f1_score']
-    
-    drift_magnitude = baseline_f1 - current_f1
-    
+
+    drift_magnitude = baseline_f1 - current['f1_score']
+
     logging.info(f"Baseline F1: {baseline_f1:.4f}")
-    logging.info(f"Drift Set F1: {current_f1:.4f}")
-    
-    if drift_magnitude > 0.05:
+    logging.info(f"Rolling F1 of model v{model_version}: {current['f1_score']:.4f} (recall {current['recall']:.4f}, "
+                 f"precision {current['precision']:.4f}, AUC {current['roc_auc'] or float('nan'):.4f}) "
+                 f"over {current['labeled']} labeled predictions")
+    for grade, metrics in sorted(report['segments'][settings['segment']].items()):
+        logging.info(f"  {settings['segment']}={grade}: F1 {metrics['f1_score']:.4f} ({metrics['labeled']} labeled)")
+
+    if drift_magnitude > settings['max_f1_drop']:
         logging.warning(f"🚨 MODEL DRIFT DETECTED! Performance dropped by {drift_magnitude:.4f}")
-    else:
-        logging.info("✅ No significant model drift detected.")
+        return True
+    logging.info("✅ No significant model drift detected.")
+    return False
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    check_model_drift()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Join late outcomes and check rolling model performance.")
+    parser.add_argument("--labels", default=None,
+                        help="Outcomes file (prediction_id + label column); defaults to performance.labels_path")
+    args = parser.parse_args()
+    check_model_drift(labels_path=args.labels)
@@ -0,0 +1,264 @@
+## performance_store.py
+## Rolling model performance without re-scoring. Every prediction is logged
+## with an ID when it is made; outcomes (defaults) arrive months later and are
+## joined by that ID through the primary-key index. Each join adds to
+## per-window, per-segment aggregates (confusion counts and a score histogram
+## for AUC), so rolling F1/recall/precision/AUC are sums over a handful of
+## aggregate rows, and the latest snapshot is a small JSON file alerts read directly.
+## Aggregates are kept per model version, so the report follows the live model
+## rather than blending it with the predictions of the one it replaced.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+ALL_SEGMENTS = "__all__"
+
+DEFAULT_PERFORMANCE = {
+    'enabled': True,
+    'store_path': 'models/monitoring/performance.sqlite',
+    'report_path': 'models/monitoring/performance_report.json',
+    'window_hours': 24,
+    'rolling_windows': 30,
+    'threshold': 0.5,
+    'score_bins': 100,
+    'segment': 'loan_grade',
+    'label_column': 'loan_status',
+    'labels_path': None,
+    'max_f1_drop': 0.05
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    prediction_id TEXT PRIMARY KEY,
+    scored_at REAL NOT NULL,
+    model_version TEXT,
+    segment TEXT,
+    probability REAL NOT NULL,
+    label INTEGER,
+    labeled_at REAL
+);
+CREATE INDEX IF NOT EXISTS predictions_pending ON predictions (scored_at) WHERE label IS NULL;
+CREATE TABLE IF NOT EXISTS window_stats (
+    window_start INTEGER, model_version TEXT, segment TEXT,
+    tp INTEGER, fp INTEGER, fn INTEGER, tn INTEGER,
+    PRIMARY KEY (window_start, model_version, segment)
+);
+CREATE TABLE IF NOT EXISTS score_bins (
+    window_start INTEGER, model_version TEXT, segment TEXT, bin INTEGER,
+    positives INTEGER, negatives INTEGER,
+    PRIMARY KEY (window_start, model_version, segment, bin)
+);
+"""
+
+
+def load_performance_config(config):
+    return {**DEFAULT_PERFORMANCE, **(config.get('performance') or {})}
+
+
+def dataset_row_ids(path, start, n_rows, model_version=None):
+    """
+    IDs for rows of a batch file that has no ID column: '<file name>:<row number>',
+    plus '@v<version>' when scored by a registered model, so re-scoring the file
+    with a new model logs new predictions. Outcomes joined by the plain row ID
+    reach every version's prediction (see join_labels).
+    """
+    name = os.path.basename(path)
+    suffix = "" if model_version is None else f"@v{model_version}"
+    return [f"{name}:{i}{suffix}" for i in range(start, start + n_rows)]
+
+
+def classification_metrics(tp, fp, fn, tn, positives, negatives):
+    """F1/recall/precision from confusion counts; AUC from per-bin score histograms."""
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    n_pos, n_neg = positives.sum(), negatives.sum()
+    auc = None
+    if n_pos and n_neg:
+        # P(score_pos > score_neg), ties within a bin count half
+        negatives_below = np.cumsum(negatives) - negatives
+        auc = float(np.sum(positives * (negatives_below + 0.5 * negatives)) / (n_pos * n_neg))
+    return {"f1_score": f1, "recall": recall, "precision": precision, "roc_auc": auc,
+            "labeled": int(tp + fp + fn + tn), "positives": int(n_pos)}
+
+
+class PerformanceStore:
+    def __init__(self, path, window_hours=24, threshold=0.5, score_bins=100):
+        self.path = path
+        self.window_seconds = int(window_hours * 3600)
+        self.threshold = threshold
+        self.score_bins = score_bins
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings['store_path'], settings['window_hours'], settings['threshold'], settings['score_bins'])
+
+    def window_start(self, timestamp):
+        return int(timestamp // self.window_seconds * self.window_seconds)
+
+    # --- Scoring time ---
+    def log_predictions(self, rows):
+        """
+        `rows`: (prediction_id, scored_at, model_version, segment, probability).
+        Re-logging an ID that has no outcome yet replaces it; labeled ones are kept.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO predictions (prediction_id, scored_at, model_version, segment, probability) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (prediction_id) DO UPDATE SET "
+                "scored_at = excluded.scored_at, model_version = excluded.model_version, "
+                "segment = excluded.segment, probability = excluded.probability WHERE label IS NULL", rows)
+
+    def add_predictions(self, rows, max_pending=10000):
+        """
+        Buffered `log_predictions` for request handlers: a list append that never
+        touches the database. Returns True once `max_pending` rows wait, so the caller
+        can `flush()` early, off its event loop.
+        """
+        with self._pending_lock:
+            self._pending.extend(rows)
+            return len(self._pending) >= max_pending
+
+    def flush(self):
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if rows:
+            self.log_predictions(rows)
+
+    # --- Outcome time ---
+    def join_labels(self, labels):
+        """
+        Attaches outcomes to their predictions and folds them into the window
+        aggregates. `labels` is a list of (prediction_id, label); an ID also
+        matches its per-model-version variants ('<id>@v<version>', see
+        dataset_row_ids). IDs that are unknown or already labeled are skipped,
+        so re-ingesting a file is a no-op. Returns the number of newly joined predictions.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (prediction_id TEXT PRIMARY KEY, label INTEGER)")
+            self._conn.execute("DELETE FROM incoming")
+            self._conn.executemany("INSERT OR REPLACE INTO incoming VALUES (?, ?)", labels)
+            # Exact IDs, then the '<id>@...' range (both primary-key lookups)
+            columns = "p.prediction_id, p.scored_at, COALESCE(p.model_version, ''), p.segment, p.probability, i.label"
+            joined = self._conn.execute(
+                f"SELECT {columns} FROM incoming i JOIN predictions p ON p.prediction_id = i.prediction_id "
+                "WHERE p.label IS NULL UNION ALL "
+                f"SELECT {columns} FROM incoming i JOIN predictions p "
+                "ON p.prediction_id > i.prediction_id || '@' AND p.prediction_id < i.prediction_id || 'A' "
+                "WHERE p.label IS NULL").fetchall()
+            if not joined:
+                return 0
+
+            # 1. Mark the predictions as labeled
+            self._conn.executemany("UPDATE predictions SET label = ?, labeled_at = ? WHERE prediction_id = ?",
+                                   [(int(label), now, pid) for pid, _, _, _, _, label in joined])
+
+            # 2. Add them to the aggregates of their scoring window and model version (per segment and overall)
+            scored_at = np.array([row[1] for row in joined])
+            versions = np.array([row[2] for row in joined], dtype=object)
+            segments = np.array([row[3] if row[3] is not None else "" for row in joined], dtype=object)
+            probability = np.array([row[4] for row in joined])
+            label = np.array([int(row[5]) for row in joined])
+            windows = (scored_at // self.window_seconds * self.window_seconds).astype(np.int64)
+            predicted = probability > self.threshold
+            bins = np.minimum((probability * self.score_bins).astype(np.int64), self.score_bins - 1)
+
+            stats, histogram = [], []
+            for window, version in sorted(set(zip(windows.tolist(), versions))):
+                in_group = (windows == window) & (versions == version)
+                for segment in [ALL_SEGMENTS] + sorted(set(segments[in_group])):
+                    mask = in_group if segment == ALL_SEGMENTS else in_group & (segments == segment)
+                    y, p = label[mask], predicted[mask]
+                    stats.append((window, version, segment, int(np.sum(p & (y == 1))), int(np.sum(p & (y == 0))),
+                                  int(np.sum(~p & (y == 1))), int(np.sum(~p & (y == 0)))))
+                    pos = np.bincount(bins[mask & (label == 1)], minlength=self.score_bins)
+                    neg = np.bincount(bins[mask & (label == 0)], minlength=self.score_bins)
+                    histogram += [(window, version, segment, int(b), int(pos[b]), int(neg[b]))
+                                  for b in np.flatnonzero(pos + neg)]
+            self._conn.executemany(
+                "INSERT INTO window_stats VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (window_start, model_version, segment) DO UPDATE SET "
+                "tp = tp + excluded.tp, fp = fp + excluded.fp, fn = fn + excluded.fn, tn = tn + excluded.tn", stats)
+            self._conn.executemany(
+                "INSERT INTO score_bins VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (window_start, model_version, segment, bin) DO UPDATE SET "
+                "positives = positives + excluded.positives, negatives = negatives + excluded.negatives", histogram)
+            return len(joined)
+
+    # --- Reads ---
+    def pending_labels(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM predictions WHERE label IS NULL").fetchone()[0]
+
+    def _since(self, windows, now=None):
+        return self.window_start(now if now is not None else time.time()) - (windows - 1) * self.window_seconds
+
+    def model_versions(self, windows, now=None):
+        """Model versions with labeled predictions in the last `windows` windows ('' = unversioned)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT model_version FROM window_stats WHERE window_start >= ?",
+                                      (self._since(windows, now),)).fetchall()
+        return sorted(version for version, in rows)
+
+    def rolling_metrics(self, windows, now=None, model_version=None):
+        """
+        Metrics per segment over the last `windows` scoring windows (including the
+        current one), for one model version or, with None, all versions pooled.
+        """
+        where, params = "WHERE window_start >= ?", [self._since(windows, now)]
+        if model_version is not None:
+            where, params = where + " AND model_version = ?", params + [str(model_version)]
+        with self._lock:
+            counts = self._conn.execute(
+                f"SELECT segment, SUM(tp), SUM(fp), SUM(fn), SUM(tn) FROM window_stats {where} GROUP BY segment",
+                params).fetchall()
+            bins = self._conn.execute(
+                f"SELECT segment, bin, SUM(positives), SUM(negatives) FROM score_bins {where} GROUP BY segment, bin",
+                params).fetchall()
+        histograms = {}
+        for segment, b, pos, neg in bins:
+            hist = histograms.setdefault(segment, np.zeros((2, self.score_bins), dtype=np.int64))
+            hist[:, b] = pos, neg
+        empty = np.zeros((2, self.score_bins), dtype=np.int64)
+        return {segment: classification_metrics(tp, fp, fn, tn, *histograms.get(segment, empty))
+                for segment, tp, fp, fn, tn in counts}
+
+    def write_report(self, settings, model_version=None):
+        """
+        Snapshot of the rolling metrics for alerts.py (one small JSON read): overall
+        and per segment for `model_version` (the live model; None pools all
+        versions), plus the overall metrics of every version in the horizon.
+        """
+        windows = settings['rolling_windows']
+        metrics = self.rolling_metrics(windows, model_version=model_version)
+        report = {
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "window_hours": settings['window_hours'],
+            "rolling_windows": windows,
+            "pending_labels": self.pending_labels(),
+            "model_version": model_version,
+            "overall": metrics.pop(ALL_SEGMENTS, None),
+            "segments": {settings['segment']: metrics},
+            "model_versions": {version or "unversioned": self.rolling_metrics(windows, model_version=version)
+                               .get(ALL_SEGMENTS) for version in self.model_versions(windows)}
+        }
+        os.makedirs(os.path.dirname(settings['report_path']) or ".", exist_ok=True)
+        tmp_path = f"{settings['report_path']}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=4)
+        os.replace(tmp_path, settings['report_path'])
+        return report
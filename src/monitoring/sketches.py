@@ -0,0 +1,219 @@
+## sketches.py
+## Compact, mergeable feature sketches for drift monitoring. A numeric feature
+## is a fixed-bin histogram whose edges are the baseline's quantiles; a
+## categorical feature is a capped count table. Sketches of the same layout
+## merge by adding counts, so windows from many API workers and batch jobs
+## combine into one, and every drift statistic below is computed from the
+## sketches alone, in memory independent of how many rows they summarize.
+
+import json
+import os
+import threading
+
+import numpy as np
+
+MISSING = "__missing__"
+OTHER = "__other__"
+PSI_EPSILON = 1e-6
+
+
+class NumericSketch:
+    """Counts per bin: (-inf, e0), [e0, e1), ..., [e_last, inf), plus missing values."""
+
+    def __init__(self, edges, counts=None, missing=0):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64) if counts is None \
+            else np.asarray(counts, dtype=np.int64)
+        self.missing = int(missing)
+
+    @classmethod
+    def from_values(cls, values, bins=64):
+        """Edges at the quantiles of `values` (so baseline bins hold roughly equal mass)."""
+        values = np.asarray(values, dtype=np.float64)
+        finite = values[np.isfinite(values)]
+        edges = np.unique(np.quantile(finite, np.linspace(0, 1, bins + 1))) if len(finite) else np.array([0.0])
+        return cls(edges)
+
+    def empty_copy(self):
+        return NumericSketch(self.edges)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        missing = np.isnan(values)
+        self.missing += int(missing.sum())
+        idx = np.searchsorted(self.edges, values[~missing], side='right')
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge numeric sketches with different bin edges")
+        self.counts += other.counts
+        self.missing += other.missing
+
+    def cdf(self):
+        """Fraction of non-missing values below each edge."""
+        return np.cumsum(self.counts)[:-1] / max(self.n, 1)
+
+    def proportions(self):
+        """Bin shares including the missing bucket (what PSI compares)."""
+        counts = np.append(self.counts, self.missing).astype(np.float64)
+        return counts / max(counts.sum(), 1.0)
+
+    def to_dict(self):
+        return {"type": "numeric", "edges": self.edges.tolist(), "counts": self.counts.tolist(),
+                "missing": self.missing}
+
+
+class CategoricalSketch:
+    """Counts per category; past `max_categories` distinct values, new ones go to __other__."""
+
+    def __init__(self, counts=None, max_categories=50):
+        self.counts = dict(counts or {})
+        self.max_categories = max_categories
+
+    def empty_copy(self):
+        return CategoricalSketch(max_categories=self.max_categories)
+
+    @property
+    def n(self):
+        return int(sum(self.counts.values()))
+
+    def _add(self, category, count):
+        if category not in self.counts and len(self.counts) >= self.max_categories:
+            category = OTHER
+        self.counts[category] = self.counts.get(category, 0) + int(count)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=object)
+        missing = np.fromiter((v is None or (isinstance(v, float) and v != v) for v in values),
+                              dtype=bool, count=len(values))
+        if missing.any():
+            self._add(MISSING, missing.sum())
+        categories, counts = np.unique(values[~missing].astype(str), return_counts=True)
+        for category, count in zip(categories.tolist(), counts.tolist()):
+            self._add(category, count)
+
+    def merge(self, other):
+        for category, count in other.counts.items():
+            self._add(category, count)
+
+    def to_dict(self):
+        return {"type": "categorical", "counts": self.counts, "max_categories": self.max_categories}
+
+
+def sketch_from_dict(data):
+    if data['type'] == 'numeric':
+        return NumericSketch(data['edges'], data['counts'], data['missing'])
+    return CategoricalSketch(data['counts'], data['max_categories'])
+
+
+class SketchSet:
+    """One sketch per monitored feature; thread-safe updates from request handlers."""
+
+    def __init__(self, sketches, rows=0, metadata=None):
+        self.sketches = sketches
+        self.rows = rows
+        self.metadata = metadata or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, numerical, categorical, bins=64, max_categories=50):
+        """Baseline layout from a sample: quantile edges for numbers, observed categories."""
+        sketches = {col: NumericSketch.from_values(df[col].to_numpy(dtype=np.float64, na_value=np.nan), bins)
+                    for col in numerical}
+        sketches.update({col: CategoricalSketch(max_categories=max_categories) for col in categorical})
+        return cls(sketches)
+
+    def empty_copy(self, metadata=None):
+        """Same bins, zero counts: the layout a current window must share with its baseline."""
+        return SketchSet({col: s.empty_copy() for col, s in self.sketches.items()}, metadata=metadata)
+
+    def update(self, columns, n_rows):
+        """`columns` maps feature -> array-like of length `n_rows` (DataFrame or dict of arrays)."""
+        with self._lock:
+            for col, sketch in self.sketches.items():
+                if col in columns:
+                    sketch.update(columns[col])
+            self.rows += n_rows
+
+    def update_records(self, records):
+        columns = {col: [r.get(col) for r in records] for col in self.sketches}
+        self.update(columns, len(records))
+
+    def merge(self, other):
+        with self._lock:
+            for col, sketch in self.sketches.items():
+                if col in other.sketches:
+                    sketch.merge(other.sketches[col])
+            self.rows += other.rows
+
+    def to_dict(self):
+        with self._lock:
+            return {"rows": self.rows, "metadata": self.metadata,
+                    "features": {col: s.to_dict() for col, s in self.sketches.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({col: sketch_from_dict(s) for col, s in data['features'].items()},
+                   rows=data['rows'], metadata=data.get('metadata'))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+# --- Drift statistics (baseline vs current sketch of one feature) ---
+
+def psi(expected, actual):
+    """Population Stability Index over aligned proportion vectors."""
+    expected = np.clip(expected, PSI_EPSILON, None)
+    actual = np.clip(actual, PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def compare_numeric(baseline, current):
+    """
+    KS statistic evaluated at the bin edges (exact for data that only changes
+    value at the edges, otherwise a lower bound within one bin's mass of the
+    true statistic), its asymptotic p-value, and PSI.
+    """
+    from scipy.stats import kstwobign
+
+    n, m = baseline.n, current.n
+    ks = float(np.max(np.abs(baseline.cdf() - current.cdf()))) if len(baseline.edges) else 0.0
+    p_value = float(kstwobign.sf(ks * np.sqrt(n * m / (n + m)))) if n and m else 1.0
+    return {"test": "ks_sketch", "statistic": ks, "p_value": p_value,
+            "psi": psi(baseline.proportions(), current.proportions()), "n_baseline": n, "n_current": m}
+
+
+def compare_categorical(baseline, current):
+    """Chi-square test of homogeneity on the two count tables, and PSI."""
+    from scipy.stats import chi2_contingency
+
+    categories = sorted(set(baseline.counts) | set(current.counts))
+    table = np.array([[baseline.counts.get(c, 0) for c in categories],
+                      [current.counts.get(c, 0) for c in categories]], dtype=np.float64)
+    n, m = table.sum(axis=1)
+    stat, p_value = 0.0, 1.0
+    if n and m and len(categories) > 1:
+        stat, p_value, _, _ = chi2_contingency(table)
+    return {"test": "chi_square", "statistic": float(stat), "p_value": float(p_value),
+            "psi": psi(table[0] / max(n, 1), table[1] / max(m, 1)), "n_baseline": int(n), "n_current": int(m)}
+
+
+def compare(baseline, current):
+    if isinstance(baseline, NumericSketch):
+        return compare_numeric(baseline, current)
+    return compare_categorical(baseline, current)
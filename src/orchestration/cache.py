@@ -0,0 +1,216 @@
+## cache.py
+## Content-addressed stage cache for run_pipeline.py: a stage is skipped when a
+## previous run with the same input files, config sections and code produced
+## outputs that are still in the cache.
+
+import ast
+import hashlib
+import importlib
+import json
+import logging
+import os
+import shutil
+import sys
+import yaml
+
+CACHE_DIR = ".pipeline_cache"
+HASH_CHUNK = 1024 * 1024
+
+
+class ConfigSection:
+    """A dotted section of a YAML config (e.g. training.yaml -> 'model.params')."""
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self.key = key
+
+    def __repr__(self):
+        return f"{self.path}:{self.key or '*'}"
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r") as f:
+            value = yaml.safe_load(f)
+        for part in (self.key.split(".") if self.key else []):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    def write(self, value):
+        """Writes the section back in place, leaving the rest of the file untouched."""
+        if not self.key:
+            with open(self.path, "w") as f:
+                yaml.dump(value, f)
+            return
+        with open(self.path, "r") as f:
+            config = yaml.safe_load(f) or {}
+        node = config
+        *parents, leaf = self.key.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+        with open(self.path, "w") as f:
+            yaml.dump(config, f)
+
+
+class Stage:
+    """
+    One pipeline step. `inputs`/`outputs` are file paths or ConfigSections; the
+    code version is derived from the source files of `func` and the `src.*`
+    modules it imports. `deps` names the stages that must finish first.
+    Non-cacheable stages (monitoring checks, anything with side effects beyond
+    its outputs) always run.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), kwargs=None, deps=(),
+                 description=None, cacheable=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.kwargs = kwargs or {}
+        self.deps = list(deps)
+        self.description = description or name
+        self.cacheable = cacheable
+
+    def run(self):
+        return self.func(**self.kwargs)
+
+
+def imported_modules(path, package):
+    """`package.*` names imported anywhere in a source file, function bodies included."""
+    with open(path, "r") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module)
+            # `from src.inference import compiled` names a module, not an attribute
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return {name for name in names if name.split(".")[0] == package}
+
+
+def code_files(func, package="src"):
+    """
+    Source files of `func`'s module plus every `package.*` module it imports,
+    followed transitively. Imports are read from the source (not executed), so
+    modules imported lazily inside functions count too.
+    """
+    roots = [os.path.dirname(path) for path in importlib.import_module(package).__path__]
+    files = set()
+    pending = [sys.modules[func.__module__].__file__]
+    while pending:
+        path = os.path.relpath(pending.pop())
+        if path in files:
+            continue
+        files.add(path)
+        for name in imported_modules(path, package):
+            for root in roots:
+                candidate = os.path.join(root, *name.split(".")) + ".py"
+                if os.path.isfile(candidate):
+                    pending.append(candidate)
+                    break
+    return sorted(files)
+
+
+class StageCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        # Memo of (size, mtime) -> sha256 so unchanged large files are not re-read
+        self._memo_path = os.path.join(cache_dir, "file_hashes.json")
+        self._memo = self._load_json(self._memo_path) or {}
+
+    @staticmethod
+    def _load_json(path):
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return None
+
+    def file_hash(self, path):
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+        cached = self._memo.get(path)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(block)
+        self._memo[path] = [fingerprint, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def _value_hash(self, value):
+        blob = json.dumps(value, sort_keys=True, default=str).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def _item_hash(self, item):
+        if isinstance(item, ConfigSection):
+            return self._value_hash(item.read())
+        return self.file_hash(item)
+
+    def stage_key(self, stage):
+        """Hash of everything that can change the stage's outputs."""
+        parts = {
+            "stage": stage.name,
+            "kwargs": stage.kwargs,
+            "inputs": {repr(i) if isinstance(i, ConfigSection) else i: self._item_hash(i) for i in stage.inputs},
+            "code": {path: self.file_hash(path) for path in code_files(stage.func)},
+        }
+        return self._value_hash(parts)
+
+    def _manifest_path(self, stage, key):
+        return os.path.join(self.cache_dir, "stages", stage.name, f"{key}.json")
+
+    def restore(self, stage, key):
+        """Puts cached outputs for `key` in place. Returns False on a cache miss."""
+        manifest = self._load_json(self._manifest_path(stage, key))
+        if manifest is None:
+            return False
+        for entry in manifest["outputs"]:
+            if entry["type"] == "file" and not os.path.exists(os.path.join(self.objects_dir, entry["hash"])):
+                return False
+
+        for entry, output in zip(manifest["outputs"], stage.outputs):
+            if entry["type"] == "config":
+                if output.read() != entry["value"]:
+                    output.write(entry["value"])
+            elif self.file_hash(output) != entry["hash"]:
+                os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+                tmp_path = f"{output}.restore"
+                shutil.copyfile(os.path.join(self.objects_dir, entry["hash"]), tmp_path)
+                os.replace(tmp_path, output)
+        return True
+
+    def store(self, stage, key):
+        """Copies the stage's outputs into the object store under `key`."""
+        entries = []
+        for output in stage.outputs:
+            if isinstance(output, ConfigSection):
+                entries.append({"type": "config", "target": repr(output), "value": output.read()})
+                continue
+            digest = self.file_hash(output)
+            if digest is None:
+                logging.warning(f"Stage '{stage.name}' did not produce {output}; not caching it.")
+                return
+            obj_path = os.path.join(self.objects_dir, digest)
+            if not os.path.exists(obj_path):
+                shutil.copyfile(output, obj_path)
+            entries.append({"type": "file", "target": output, "hash": digest})
+
+        manifest_path = self._manifest_path(stage, key)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump({"stage": stage.name, "outputs": entries}, f, indent=4)
+
+    def save(self):
+        with open(self._memo_path, "w") as f:
+            json.dump(self._memo, f)
+
@@ -0,0 +1,200 @@
+## dag.py
+## Runs pipeline stages as a dependency graph: every stage whose dependencies
+## are done is started right away on a process pool.
+
+import logging
+import os
+import time
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src.data.dataset_io import count_rows
+from src.monitoring.instrumentation import RunReport, peak_rss_bytes, reset_peak_rss
+
+DATASET_EXTENSIONS = (".csv", ".parquet", ".pq")
+
+
+def output_rows(stage):
+    """Rows written to the stage's dataset outputs (None if it writes no datasets)."""
+    paths = [p for p in stage.outputs if isinstance(p, str) and p.lower().endswith(DATASET_EXTENSIONS)
+             and os.path.exists(p)]
+    return sum(count_rows(p) for p in paths) if paths else None
+
+
+def _execute(stage):
+    # Runs in a worker process; return values (DataFrames, metrics) stay there,
+    # only the stage's peak RSS and output row count come back
+    reset_peak_rss()
+    stage.run()
+    return {"peak_rss": peak_rss_bytes(), "rows": output_rows(stage)}
+
+
+def select_stages(stages, targets, with_deps=True):
+    """`targets` plus (optionally) everything upstream of them."""
+    by_name = {stage.name: stage for stage in stages}
+    unknown = set(targets) - set(by_name)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {sorted(unknown)}")
+
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            if with_deps:
+                pending.extend(by_name[name].deps)
+
+    chosen = [stage for stage in stages if stage.name in selected]
+    # Dependencies outside the selection are assumed to be satisfied already
+    for stage in chosen:
+        stage.deps = [d for d in stage.deps if d in selected]
+    return chosen
+
+
+class DagExecutor:
+    def __init__(self, stages, cache=None, max_workers=None, force=()):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.cache = cache
+        self.max_workers = max_workers
+        self.force = set(force)
+        self.timings = {}  # name -> {status, start, end, duration, rows, peak_rss}
+        self._check_graph()
+
+    def _check_graph(self):
+        for stage in self.stages.values():
+            missing = set(stage.deps) - set(self.stages)
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s) {sorted(missing)}")
+
+        # Kahn's algorithm: every stage must be reachable without a cycle
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _forced(self, stage):
+        return "all" in self.force or stage.name in self.force
+
+    def _record(self, name, status, start, end, rows=None, peak_rss=None):
+        self.timings[name] = {"status": status, "start": start - self._t0, "end": end - self._t0,
+                              "duration": end - start, "rows": rows, "peak_rss": peak_rss}
+
+    def run(self):
+        self._t0 = time.perf_counter()
+        self.started_at = datetime.now()
+        pending = list(self.order)
+        done = set()
+        running = {}  # future -> (name, key, start)
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                progressed = False
+                for name in [n for n in pending if set(self.stages[n].deps) <= done]:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    start = time.perf_counter()
+
+                    key = None
+                    if self.cache is not None and stage.cacheable:
+                        key = self.cache.stage_key(stage)
+                        if not self._forced(stage) and self.cache.restore(stage, key):
+                            self._record(name, "hit", start, time.perf_counter())
+                            logging.info(f"⏭️  {stage.description} unchanged, restored cached outputs")
+                            done.add(name)
+                            progressed = True
+                            continue
+
+                    logging.info(f"▶️  {stage.description}")
+                    running[pool.submit(_execute, stage)] = (name, key, start)
+
+                if progressed:
+                    continue  # cache hits may have unblocked more stages
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, key, start = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        stats = future.result()
+                    except Exception as e:
+                        for other in running:
+                            other.cancel()
+                        raise RuntimeError(f"Stage '{name}' failed: {e}") from e
+
+                    end = time.perf_counter()
+                    status = "forced" if self._forced(stage) else "run"
+                    if key is not None:
+                        self.cache.store(stage, key)
+                    self._record(name, status, start, end, stats["rows"], stats["peak_rss"])
+                    logging.info(f"✔️  '{name}' finished in {end - start:.2f}s")
+                    done.add(name)
+
+        if self.cache is not None:
+            self.cache.save()
+        return self.timings
+
+    def critical_path(self):
+        """Longest chain of dependent stage durations (what bounds wall time)."""
+        finish, previous = {}, {}
+        for name in self._topological_order():
+            deps = self.stages[name].deps
+            slowest = max(deps, key=lambda d: finish[d]) if deps else None
+            finish[name] = self.timings[name]["duration"] + (finish[slowest] if slowest else 0.0)
+            previous[name] = slowest
+
+        node = max(finish, key=finish.get)
+        path = []
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return list(reversed(path)), finish[path[0]]
+
+    def _topological_order(self):
+        ordered, seen = [], set()
+
+        def visit(name):
+            if name not in seen:
+                seen.add(name)
+                for dep in self.stages[name].deps:
+                    visit(dep)
+                ordered.append(name)
+
+        for name in self.order:
+            visit(name)
+        return ordered
+
+    def log_report(self):
+        logging.info("Stage summary (start/end relative to pipeline start):")
+        for name in self.order:
+            t = self.timings[name]
+            logging.info(f"  {name:<16} {t['status'].upper():<7} {t['start']:8.2f}s -> {t['end']:8.2f}s "
+                         f"({t['duration']:.2f}s)")
+
+        hits = sum(t["status"] == "hit" for t in self.timings.values())
+        logging.info(f"Cache hits: {hits}/{len(self.timings)}, recomputed: {len(self.timings) - hits}")
+
+        wall = max(t["end"] for t in self.timings.values())
+        busy = sum(t["duration"] for t in self.timings.values())
+        path, length = self.critical_path()
+        logging.info(f"Critical path ({length:.2f}s): {' -> '.join(path)}")
+        logging.info(f"Wall time {wall:.2f}s for {busy:.2f}s of stage time "
+                     f"(parallelism x{busy / wall if wall else 1.0:.2f})")
+
+    def run_report(self):
+        """Machine-readable version of the summary above (see instrumentation.RunReport)."""
+        path, length = self.critical_path()
+        wall = max(t["end"] for t in self.timings.values())
+        report = RunReport("pipeline", {"wall_seconds": round(wall, 6), "critical_path": path,
+                                        "critical_path_seconds": round(length, 6)})
+        report.started_at = self.started_at
+        for name in self.order:
+            t = self.timings[name]
+            report.add(name, t["duration"], t["rows"], t["peak_rss"], status=t["status"],
+                       start=round(t["start"], 6), end=round(t["end"], 6))
+        return report
@@ -2,18 +2,28 @@
 
 import joblib
 import json
-import pandas as pd
+import numpy as np
+import yaml
 from sklearn.metrics import f1_score, recall_score, precision_score, roc_auc_score
+from src.data.dataset_io import read_dataset
 from src.features.feature_store import FeatureStore
 
-def run_evaluation():
-    # 1. Load Model and Test Data
+def transform_test_split(pipeline):
+    """The raw test split through `pipeline` (e.g. an incremental candidate's parent pipeline)."""
+    with open("configs/data.yaml", "r") as f:
+        data_cfg = yaml.safe_load(f)
+    target = data_cfg['schema']['target']
+    test_df = read_dataset(data_cfg['data_paths']['processed_test'], config=data_cfg)
+    X_test = pipeline.transform(test_df.drop(columns=[target])).astype(np.float32)
+    return X_test, test_df[target].to_numpy()
+
+def run_evaluation(pipeline=None):
+    # 1. Load Model and Test Data (test_processed was built with the working pipeline)
     model = joblib.load("models/xgboost_model.joblib")
-    store = FeatureStore()
-    test_df = store.load_features("test_processed")
-    
-    X_test = test_df.drop(columns=['target'])
-    y_test = test_df['target']
+    if pipeline is None:
+        X_test, y_test, _ = FeatureStore().load_matrix("test_processed")
+    else:
+        X_test, y_test = transform_test_split(pipeline)
 
     # 2. Predict
     y_pred = model.predict(X_test)
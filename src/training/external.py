@@ -0,0 +1,175 @@
+## external.py
+## Out-of-core training: streams a feature-store version batch by batch through
+## an XGBoost DataIter, so memory is bounded by the batch size and the
+## quantized matrix rather than by the size of the dataset.
+
+import os
+import time
+import shutil
+import logging
+import resource
+
+import numpy as np
+import pyarrow.parquet as pq
+import xgboost as xgb
+from xgboost import XGBClassifier
+
+from src.features.feature_store import FeatureStore
+
+DEFAULT_OUT_OF_CORE = {
+    'enabled': False,
+    'batch_rows': 100000,
+    # quantile: QuantileDMatrix (quantized pages in RAM, ~1 byte per value)
+    # external: ExtMemQuantileDMatrix (pages cached on disk under cache_dir)
+    'matrix': 'quantile',
+    'cache_dir': 'models/.xgb_cache',
+    'max_bin': 256
+}
+
+# XGBClassifier keyword -> native xgb.train parameter
+NATIVE_PARAM_NAMES = {'learning_rate': 'eta', 'random_state': 'seed', 'n_jobs': 'nthread'}
+
+
+def load_out_of_core_config(config):
+    return {**DEFAULT_OUT_OF_CORE, **(config['model'].get('out_of_core') or {})}
+
+
+def peak_rss_mb():
+    # VmHWM resets on exec (ru_maxrss carries over the parent's peak on Linux)
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class FeatureBatchIter(xgb.DataIter):
+    """
+    Feeds record batches of a feature-store dataset to XGBoost as float32
+    blocks. Features and target must be stored in the files (not as hive
+    partition keys).
+    """
+
+    def __init__(self, dataset, feature_names, target, batch_rows, cache_prefix=None):
+        self.dataset = dataset
+        self.feature_names = list(feature_names)
+        self.target = target
+        self.batch_rows = batch_rows
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def _scan(self):
+        # File by file, one row group at a time: the dataset scanner's read-ahead
+        # would otherwise decode most of a file before the first batch is used
+        columns = self.feature_names + [self.target]
+        for path in self.dataset.files:
+            parquet_file = pq.ParquetFile(path, pre_buffer=False)
+            yield from parquet_file.iter_batches(batch_size=self.batch_rows, columns=columns, use_threads=False)
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = self._scan()
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+        X = np.empty((batch.num_rows, len(self.feature_names)), dtype=np.float32)
+        for j, name in enumerate(self.feature_names):
+            X[:, j] = batch.column(name).to_numpy(zero_copy_only=False)
+        y = batch.column(self.target).to_numpy(zero_copy_only=False)
+        input_data(data=X, label=y, feature_names=self.feature_names)
+        return True
+
+    def reset(self):
+        self._batches = None
+
+
+class RoundTimer(xgb.callback.TrainingCallback):
+    def __init__(self):
+        self.seconds = []
+        self._start = None
+
+    def before_iteration(self, model, epoch, evals_log):
+        self._start = time.perf_counter()
+        return False
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.seconds.append(time.perf_counter() - self._start)
+        return False
+
+
+def native_params(params):
+    """Splits sklearn-style params into (xgb.train params, number of rounds)."""
+    params = dict(params)
+    rounds = params.pop('n_estimators', 100)
+    native = {'objective': 'binary:logistic', 'eval_metric': 'logloss', 'tree_method': 'hist'}
+    for key, value in params.items():
+        native[NATIVE_PARAM_NAMES.get(key, key)] = value
+    return native, rounds
+
+
+def build_matrix(store, name, settings):
+    """Quantized DMatrix built batch by batch from the feature store."""
+    manifest = store.manifest(name)
+    feature_names = [c['name'] for c in manifest['columns'] if c['name'] != 'target']
+
+    cache_prefix = None
+    if settings['matrix'] == 'external':
+        os.makedirs(settings['cache_dir'], exist_ok=True)
+        cache_prefix = os.path.join(settings['cache_dir'], name)
+    batches = FeatureBatchIter(store.dataset(name), feature_names, 'target',
+                               settings['batch_rows'], cache_prefix=cache_prefix)
+
+    if settings['matrix'] == 'external':
+        return xgb.ExtMemQuantileDMatrix(batches, max_bin=settings['max_bin']), feature_names
+    if settings['matrix'] == 'quantile':
+        return xgb.QuantileDMatrix(batches, max_bin=settings['max_bin']), feature_names
+    raise ValueError(f"Unknown out-of-core matrix type '{settings['matrix']}' (use quantile or external)")
+
+
+def to_classifier(booster, params):
+    """Wraps a native booster so it is saved/served like any other XGBClassifier."""
+    model = XGBClassifier(**params)
+    model.load_model(booster.save_raw("ubj"))
+    return model
+
+
+def train_out_of_core(config, name="train_processed", store=None):
+    """
+    Trains with the hyperparameters in configs/training.yaml without ever
+    materializing the full training frame. Returns (model, stats).
+    """
+    settings = load_out_of_core_config(config)
+    params = config['model']['params']
+    store = store or FeatureStore()
+
+    # 1. Stream the feature store into a quantized matrix
+    start = time.perf_counter()
+    dtrain, feature_names = build_matrix(store, name, settings)
+    build_seconds = time.perf_counter() - start
+    logging.info(f"Built {settings['matrix']} matrix ({dtrain.num_row()} rows, {dtrain.num_col()} features) "
+                 f"in {build_seconds:.2f}s from batches of {settings['batch_rows']}")
+
+    # 2. Boost
+    native, rounds = native_params(params)
+    timer = RoundTimer()
+    booster = xgb.train(native, dtrain, num_boost_round=rounds, callbacks=[timer])
+    booster.feature_types = ['float'] * len(feature_names)
+
+    rows = int(dtrain.num_row())
+    # Free the matrix (and its page files) before removing the cache directory
+    del dtrain
+    if settings['matrix'] == 'external':
+        shutil.rmtree(settings['cache_dir'], ignore_errors=True)
+
+    stats = {
+        "mode": f"out_of_core/{settings['matrix']}",
+        "rows": rows,
+        "rounds": rounds,
+        "build_seconds": build_seconds,
+        "seconds_per_round": float(np.mean(timer.seconds)) if timer.seconds else 0.0,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    return to_classifier(booster, params), stats
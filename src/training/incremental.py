@@ -0,0 +1,201 @@
+## incremental.py
+## Incremental model refresh: continues the registered model on newly arrived
+## loan vintages instead of retraining from scratch. New vintages are
+## transformed with the registered model's own preprocessing pipeline and
+## published as versions of one feature set; each refresh consumes the versions
+## it has not seen yet and sends the candidate, with that same pipeline, through
+## the usual evaluation/registration gate.
+##
+##   python -m src.training.incremental --publish data/raw/new_vintage.csv
+##   python -m src.training.incremental [--mode boost|refresh] [--rounds 50]
+
+import os
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import yaml
+
+from src.data.dataset_io import read_dataset
+from src.features.feature_store import FeatureStore
+from src.features.transformations import file_digest
+from src.training.evaluate import run_evaluation
+from src.training.external import native_params, to_classifier
+from src.training.register import register_model
+from src.training.registry import PIPELINE_FILE, ModelRegistry, load_production
+
+CANDIDATE_PATH = "models/xgboost_model.joblib"
+PIPELINE_PATH = "models/preprocessing_pipeline.joblib"
+
+DEFAULT_INCREMENTAL = {
+    'feature_set': 'train_increment',
+    # boost: append `rounds` trees fitted on the new data
+    # refresh: keep the trees, re-fit their leaf values on the new data
+    'mode': 'boost',
+    'rounds': 50,
+    'threshold': 0.80,
+    'state_path': 'models/incremental_state.json'
+}
+
+
+def load_config():
+    with open("configs/training.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    return config, {**DEFAULT_INCREMENTAL, **(config.get('incremental') or {})}
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {"consumed": {}, "history": []}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_state(state, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def production_pipeline_path(bundle):
+    """The pipeline file `bundle` was registered with (the working copy for an unversioned model)."""
+    if bundle.version is None:
+        return PIPELINE_PATH
+    return os.path.join(ModelRegistry().version_path(bundle.version), PIPELINE_FILE)
+
+
+def publish_vintage(input_path, settings, store=None):
+    """Transforms a raw vintage with the registered model's pipeline and stores it as a new feature-set version."""
+    with open("configs/data.yaml", "r") as f:
+        data_cfg = yaml.safe_load(f)
+    target = data_cfg['schema']['target']
+    store = store or FeatureStore()
+
+    # 1. Same preprocessing as the registered model was trained with. Not the working
+    # copy: a pipeline run may have refitted it without registering a model.
+    base = load_production()
+    pipeline = base.pipeline
+    raw = read_dataset(input_path, config=data_cfg)
+    features = pipeline.transform(raw.drop(columns=[target]))
+    feature_names = pipeline.named_steps['preprocessor'].get_feature_names_out()
+
+    # 2. Store it like the main training set (Parquet + float32 matrix)
+    df = pd.DataFrame(features, columns=feature_names)
+    df['target'] = raw[target].to_numpy()
+    return store.save_features(df, settings['feature_set'], target='target',
+                               metadata={"source": input_path, "model_version": base.version,
+                                         "pipeline_version": file_digest(production_pipeline_path(base))})
+
+
+def pending_versions(store, settings, state):
+    consumed = set(state["consumed"].get(settings['feature_set'], []))
+    return [v for v in store.list_versions(settings['feature_set']) if v not in consumed]
+
+
+def load_new_data(store, feature_set, versions, feature_names, pipeline_version):
+    """Stacks the new versions' matrices, checking they match the model's features and pipeline."""
+    blocks, labels = [], []
+    for version in versions:
+        X, y, names = store.load_matrix(feature_set, version)
+        published_with = store.manifest(feature_set, version)['metadata'].get('pipeline_version')
+        if list(names) != list(feature_names) or published_with != pipeline_version:
+            raise ValueError(f"{feature_set} v{version} was built with a different preprocessing pipeline than "
+                             "the model; re-publish it (--publish) against the registered model.")
+        blocks.append(X)
+        labels.append(y)
+    return np.concatenate(blocks), np.concatenate(labels)
+
+
+def continue_training(model, X, y, params, mode, rounds):
+    """Returns a new XGBClassifier built on top of `model`'s booster."""
+    booster = model.get_booster()
+    feature_names = booster.feature_names
+    native, _ = native_params(params)
+    dtrain = xgb.DMatrix(X, label=y, feature_names=feature_names)
+
+    if mode == 'boost':
+        new_booster = xgb.train(native, dtrain, num_boost_round=rounds, xgb_model=booster)
+    elif mode == 'refresh':
+        # Tree structure stays, leaf values (and node stats) are recomputed on the new data
+        native.update({'process_type': 'update', 'updater': 'refresh', 'refresh_leaf': True})
+        new_booster = xgb.train(native, dtrain, num_boost_round=booster.num_boosted_rounds(), xgb_model=booster)
+    else:
+        raise ValueError(f"Unknown incremental mode '{mode}' (use boost or refresh)")
+
+    new_booster.feature_types = ['float'] * len(feature_names)
+    return to_classifier(new_booster, {**params, 'n_estimators': new_booster.num_boosted_rounds()})
+
+
+def run_incremental_training(mode=None, rounds=None):
+    config, settings = load_config()
+    mode = mode or settings['mode']
+    rounds = rounds or settings['rounds']
+    store = FeatureStore()
+    state = load_state(settings['state_path'])
+
+    # 1. Anything new since the last refresh?
+    versions = pending_versions(store, settings, state)
+    if not versions:
+        logging.info(f"No new versions of '{settings['feature_set']}'; nothing to do.")
+        return None
+
+    # 2. Continue from the registered model on the new vintages only
+    base = load_production()
+    model = base.model
+    pipeline_path = production_pipeline_path(base)
+    X, y = load_new_data(store, settings['feature_set'], versions, model.get_booster().feature_names,
+                         file_digest(pipeline_path))
+    start = time.perf_counter()
+    candidate = continue_training(model, X, y, config['model']['params'], mode, rounds)
+    elapsed = time.perf_counter() - start
+    logging.info(f"Incremental {mode} on {len(y)} new rows from {len(versions)} version(s) in {elapsed:.2f}s "
+                 f"({model.get_booster().num_boosted_rounds()} -> "
+                 f"{candidate.get_booster().num_boosted_rounds()} trees)")
+
+    # 3. Same gate as a full retrain, evaluated and registered with the parent's pipeline
+    joblib.dump(candidate, CANDIDATE_PATH)
+    metrics = run_evaluation(pipeline=base.pipeline)
+    registered = register_model(threshold=settings['threshold'], pipeline_path=pipeline_path, metadata={
+        "parent_version": base.version,
+        "incremental": {"mode": mode, "feature_set": settings['feature_set'], "versions": versions}
+    })
+
+    # 4. Versions only count as consumed once a model trained on them is live
+    state["history"].append({
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "feature_set": settings['feature_set'],
+        "versions": versions,
+        "mode": mode,
+        "rows": int(len(y)),
+        "seconds": elapsed,
+        "f1_score": metrics['f1_score'],
+        "registered": registered
+    })
+    if registered:
+        state["consumed"].setdefault(settings['feature_set'], []).extend(versions)
+    save_state(state, settings['state_path'])
+    return metrics
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="Continue the registered model on new loan vintages.")
+    parser.add_argument("--publish", metavar="PATH", help="Transform a raw vintage and add it to the feature store")
+    parser.add_argument("--mode", choices=["boost", "refresh"], default=None)
+    parser.add_argument("--rounds", type=int, default=None, help="Trees to append in boost mode")
+    args = parser.parse_args()
+
+    if args.publish:
+        _, settings = load_config()
+        version = publish_vintage(args.publish, settings)
+        print(f"Published {args.publish} as {settings['feature_set']} v{version}")
+    else:
+        run_incremental_training(mode=args.mode, rounds=args.rounds)
@@ -1,23 +1,48 @@
 ##register.py
 
-import os
-import shutil
 import json
 import logging
 
-def register_model(threshold=0.80):
+from src.features.feature_store import FeatureStore
+from src.training.registry import ModelRegistry
+
+CANDIDATE_PATH = "models/xgboost_model.joblib"
+PIPELINE_PATH = "models/preprocessing_pipeline.joblib"
+
+def training_data_metadata(name="train_processed"):
+    """Which feature-store version (and data hash) the candidate was trained on."""
+    try:
+        manifest = FeatureStore().manifest(name)
+    except FileNotFoundError:
+        return {}
+    return {"training_data": {"feature_set": name, "version": manifest['version'],
+                              "data_hash": manifest['data_hash']}}
+
+def register_model(threshold=0.80, metadata=None, pipeline_path=PIPELINE_PATH):
     # 1. Load latest report
     with open("models/evaluation_report.json", "r") as f:
         metrics = json.load(f)
 
     # 2. Check if performance meets the 'Gate'
     if metrics['f1_score'] >= threshold:
-        os.makedirs("models/registry", exist_ok=True)
-        # Versioning by simple timestamp or 'v1'
-        shutil.copy("models/xgboost_model.joblib", "models/registry/credit_model_latest.joblib")
-        logging.info(f"Model Registered! F1 Score {metrics['f1_score']} passed threshold {threshold}")
+        # 3. Already registered (an unchanged re-run): leave LATEST where it is, it may
+        # point at a newer version (e.g. an incremental refresh) by now
+        registry = ModelRegistry()
+        existing = registry.find(CANDIDATE_PATH, pipeline_path)
+        if existing is not None:
+            logging.info(f"Model already registered as v{existing}; registry unchanged "
+                         f"(live: v{registry.latest_version()}).")
+            return True
+
+        # New numbered version; LATEST only moves once it is fully written
+        extra = {**training_data_metadata(), **(metadata or {})}
+        version = registry.register(CANDIDATE_PATH, pipeline_path, metrics, extra=extra)
+        logging.info(f"Model Registered as v{version}! F1 Score {metrics['f1_score']} passed threshold {threshold}")
+        return True
     else:
         logging.warning("Model performance too low. Registration skipped.")
+        return False
 
 if __name__ == "__main__":
-    register_model()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    register_model()
@@ -0,0 +1,182 @@
+## registry.py
+## Versioned model registry:
+##
+##   models/registry/
+##       LATEST                      <- pointer: the live version number
+##       v0003/model.ubj             <- booster in XGBoost's native UBJSON format
+##       v0003/pipeline.joblib       <- preprocessing pipeline the model was trained with
+##       v0003/metadata.json         <- metrics, data hash, pipeline hash, features
+##       credit_model_latest.joblib  <- legacy copy for older readers
+##
+## A version directory is complete before it is renamed into place, and LATEST
+## is swapped with os.replace, so readers never see a half-written model.
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+
+REGISTRY_DIR = "models/registry"
+LATEST = "LATEST"
+MODEL_FILE = "model.ubj"
+PIPELINE_FILE = "pipeline.joblib"
+METADATA_FILE = "metadata.json"
+LEGACY_MODEL_FILE = "credit_model_latest.joblib"
+LEGACY_PIPELINE_PATH = "models/preprocessing_pipeline.joblib"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def xgboost_version():
+    import xgboost
+    return xgboost.__version__
+
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ModelBundle:
+    """Everything needed to score with one registered version."""
+
+    def __init__(self, version, model, pipeline, metadata):
+        self.version = version
+        self.model = model
+        self.pipeline = pipeline
+        self.metadata = metadata
+        self.compiled = None
+        self.forest = None
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.root, LATEST)
+
+    def version_path(self, version):
+        return os.path.join(self.root, f"v{int(version):04d}")
+
+    def list_versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(entry[1:]) for entry in os.listdir(self.root)
+                      if entry.startswith("v") and entry[1:].isdigit())
+
+    def latest_version(self):
+        """The live version number, or None for an empty registry."""
+        try:
+            with open(self.pointer_path, "r") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def metadata(self, version=None):
+        version = self.latest_version() if version is None else version
+        with open(os.path.join(self.version_path(version), METADATA_FILE), "r") as f:
+            return json.load(f)
+
+    def find(self, model_path, pipeline_path):
+        """The version already holding this model with this pipeline, or None."""
+        import joblib
+        import tempfile
+
+        versions = self.list_versions()
+        if not versions:
+            return None
+        # Hash the booster as register() stores it, not the joblib pickle
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, MODEL_FILE)
+            joblib.load(model_path).save_model(path)
+            model_hash = file_hash(path)
+        pipeline_hash = file_hash(pipeline_path)
+        for version in reversed(versions):
+            try:
+                metadata = self.metadata(version)
+            except FileNotFoundError:
+                continue
+            if metadata.get("model_hash") == model_hash and metadata.get("pipeline_hash") == pipeline_hash:
+                return version
+        return None
+
+    def register(self, model_path, pipeline_path, metrics, extra=None):
+        """Stores a new version and makes it the live one. Returns its number."""
+        import joblib
+
+        model = joblib.load(model_path)
+        version = max(self.list_versions(), default=0) + 1
+        final_dir = self.version_path(version)
+        staging = f"{final_dir}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        # 1. Pickle-free booster plus the pipeline it was trained with
+        model.save_model(os.path.join(staging, MODEL_FILE))
+        shutil.copyfile(pipeline_path, os.path.join(staging, PIPELINE_FILE))
+        metadata = {
+            "version": version,
+            "registered_at": datetime.now().isoformat(timespec="seconds"),
+            "metrics": metrics,
+            "model_hash": file_hash(os.path.join(staging, MODEL_FILE)),
+            "pipeline_hash": file_hash(pipeline_path),
+            "feature_names": list(model.get_booster().feature_names or []),
+            "n_trees": model.get_booster().num_boosted_rounds(),
+            "xgboost_version": xgboost_version(),
+            **(extra or {})
+        }
+        with open(os.path.join(staging, METADATA_FILE), "w") as f:
+            json.dump(metadata, f, indent=4)
+
+        # 2. Publish the directory, then flip LATEST
+        os.replace(staging, final_dir)
+        legacy_tmp = os.path.join(self.root, f"{LEGACY_MODEL_FILE}.tmp")
+        shutil.copyfile(model_path, legacy_tmp)
+        os.replace(legacy_tmp, os.path.join(self.root, LEGACY_MODEL_FILE))
+        _atomic_write(self.pointer_path, f"{version}\n")
+
+        logging.info(f"Registered model v{version} in {final_dir}")
+        return version
+
+    def load(self, version=None):
+        """Loads a version (default: LATEST) without unpickling the model."""
+        import joblib
+        from xgboost import XGBClassifier
+
+        version = self.latest_version() if version is None else version
+        if version is None:
+            raise FileNotFoundError(f"No registered model in {self.root}")
+        path = self.version_path(version)
+        model = XGBClassifier()
+        model.load_model(os.path.join(path, MODEL_FILE))
+        pipeline = joblib.load(os.path.join(path, PIPELINE_FILE))
+        return ModelBundle(version, model, pipeline, self.metadata(version))
+
+
+def load_production(registry=None, legacy_pipeline_path=LEGACY_PIPELINE_PATH):
+    """
+    The live model: LATEST from the registry, or the unversioned joblib copy
+    (plus the shared pipeline) when nothing has been registered yet.
+    """
+    import joblib
+
+    registry = registry or ModelRegistry()
+    if registry.latest_version() is not None:
+        return registry.load()
+    legacy_path = os.path.join(registry.root, LEGACY_MODEL_FILE)
+    logging.warning(f"Registry {registry.root} has no versions; loading unversioned {legacy_path}")
+    return ModelBundle(None, joblib.load(legacy_path), joblib.load(legacy_pipeline_path), {})
@@ -1,29 +1,69 @@
 ##train.py
 
+import time
+import logging
+import argparse
 import yaml
 import joblib
-import pandas as pd
+import numpy as np
 from xgboost import XGBClassifier
 from src.features.feature_store import FeatureStore
+from src.training.external import RoundTimer, load_out_of_core_config, peak_rss_mb, train_out_of_core
 
-def run_training():
+def set_feature_names(model, feature_names):
+    """
+    A model fitted on an ndarray has no column names; inference and the
+    compiled scoring path rely on them, so attach what a DataFrame fit would.
+    """
+    booster = model.get_booster()
+    booster.feature_names = list(feature_names)
+    booster.feature_types = ['float'] * len(feature_names)
+
+def train_in_memory(config, name="train_processed", store=None):
+    # Memory-mapped float32 matrix: XGBoost reads it in place, no DataFrame copies
+    store = store or FeatureStore()
+    X_train, y_train, feature_names = store.load_matrix(name)
+
+    timer = RoundTimer()
+    start = time.perf_counter()
+    model = XGBClassifier(**config['model']['params'], callbacks=[timer])
+    model.fit(X_train, y_train)
+    # The timer must not end up in the pickled model
+    model.set_params(callbacks=None)
+    set_feature_names(model, feature_names)
+
+    stats = {
+        "mode": "in_memory",
+        "rows": int(len(y_train)),
+        "rounds": len(timer.seconds),
+        "build_seconds": time.perf_counter() - start - sum(timer.seconds),
+        "seconds_per_round": float(np.mean(timer.seconds)) if timer.seconds else 0.0,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    return model, stats
+
+def run_training(out_of_core=None):
     # 1. Load Config and Data
     with open("configs/training.yaml", 'r') as f:
         config = yaml.safe_load(f)
-    
-    store = FeatureStore()
-    train_df = store.load_features("train_processed")
-    X_train = train_df.drop(columns=['target'])
-    y_train = train_df['target']
-
-    # 2. Train Model
-    print("Training final model...")
-    model = XGBClassifier(**config['model']['params'])
-    model.fit(X_train, y_train)
+    if out_of_core is None:
+        out_of_core = load_out_of_core_config(config)['enabled']
+
+    # 2. Train Model (out-of-core streams the feature store instead of loading it)
+    print(f"Training final model ({'out-of-core' if out_of_core else 'in-memory'})...")
+    model, stats = train_out_of_core(config) if out_of_core else train_in_memory(config)
+    logging.info(f"Training [{stats['mode']}]: {stats['rows']} rows, {stats['rounds']} rounds, "
+                 f"{stats['seconds_per_round'] * 1000:.1f} ms/round, data prep {stats['build_seconds']:.2f}s, "
+                 f"peak RSS {stats['peak_rss_mb']:.0f} MB")
 
     # 3. Save Model
     joblib.dump(model, "models/xgboost_model.joblib")
     print("Model saved to models/xgboost_model.joblib")
+    return stats
 
 if __name__ == "__main__":
-    run_training()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="Train the final model.")
+    parser.add_argument("--out-of-core", action="store_true", default=None,
+                        help="Stream the feature store through XGBoost instead of loading it (overrides config)")
+    run_training(out_of_core=parser.parse_args().out_of_core)
@@ -0,0 +1,105 @@
+## trial_store.py
+## Append-only JSONL store of tuning runs and trials, so an interrupted search
+## can resume and a new search can warm-start from earlier results.
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+import numpy as np
+
+HASH_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def data_fingerprint(X, y, extra=None):
+    """Hash of the training matrix, labels and anything else that changes scores (e.g. CV setup)."""
+    digest = hashlib.sha256()
+    digest.update(str(X.shape).encode())
+    # Row blocks, so a memory-mapped matrix is never copied whole into memory
+    step = max(1, HASH_BLOCK_BYTES // max(1, X[:1].nbytes))
+    for start in range(0, len(X), step):
+        digest.update(np.ascontiguousarray(X[start:start + step]).data)
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(json.dumps(extra or {}, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def params_key(params):
+    return json.dumps(params, sort_keys=True, default=float)
+
+
+class TrialStore:
+    """
+    Three record types share one file:
+      plan  - a search's fingerprint and candidate list (written before any fit)
+      trial - one candidate evaluated at one tree budget
+      done  - the search finished and picked a winner
+    Each record is flushed and fsynced as soon as it is written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.records = self._load()
+
+    def _load(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a truncated last line
+                    logging.warning(f"Skipping corrupt line in {self.path}")
+        return records
+
+    def append(self, record):
+        record = {**record, "written_at": datetime.now().isoformat(timespec="seconds")}
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, default=float) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.records.append(record)
+        return record
+
+    def _of_type(self, kind, fingerprint):
+        return [r for r in self.records if r["type"] == kind and r["fingerprint"] == fingerprint]
+
+    def plans(self, fingerprint):
+        return self._of_type("plan", fingerprint)
+
+    def unfinished_plan(self, fingerprint):
+        """Latest plan for this data that never reached 'done' (i.e. a crashed run)."""
+        finished = {r["run_id"] for r in self._of_type("done", fingerprint)}
+        plans = [p for p in self.plans(fingerprint) if p["run_id"] not in finished]
+        return plans[-1] if plans else None
+
+    def trials(self, fingerprint):
+        return self._of_type("trial", fingerprint)
+
+    def find_trial(self, fingerprint, params, n_estimators):
+        key = params_key(params)
+        for record in reversed(self.trials(fingerprint)):
+            if record.get("n_estimators") == n_estimators and params_key(record["params"]) == key:
+                return record
+        return None
+
+    def explored(self, fingerprint):
+        """Every parameter set already evaluated on this data."""
+        return {params_key(r["params"]) for r in self.trials(fingerprint)}
+
+    def best_params(self, fingerprint, top_k):
+        """Top-k distinct configs by their score in the furthest halving rung they reached."""
+        best = {}
+        for record in self.trials(fingerprint):
+            key = params_key(record["params"])
+            # Random-search trials are all rung 0 and carry their own n_estimators
+            rank = (record.get("rung", 0), record["mean_f1"])
+            if key not in best or rank > best[key][0]:
+                best[key] = (rank, record["params"])
+        ranked = sorted(best.values(), key=lambda item: item[0], reverse=True)
+        return [params for _, params in ranked[:top_k]]
@@ -1,42 +1,293 @@
 ## tune.py
 
+import math
+import uuid
+import time
+import logging
 import yaml
+import numpy as np
 import pandas as pd
 from xgboost import XGBClassifier
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, train_test_split
 from src.features.feature_store import FeatureStore
+from src.training.trial_store import TrialStore, data_fingerprint, params_key
 
-def run_tuning():
-    store = FeatureStore()
-    train_df = store.load_features("train_processed")
-    
-    X_train = train_df.drop(columns=['target'])
-    y_train = train_df['target']
-
-    # 1. Define Search Space
-    param_dist = {
-        'n_estimators': [100, 200, 500],
-        'max_depth': [3, 6, 10],
-        'learning_rate': [0.01, 0.1, 0.2],
-        'subsample': [0.8, 1.0],
-        'scale_pos_weight': [1, 3, 5] # Vital for credit risk imbalance
-    }
-
-    # 2. Run Search
-    xgb = XGBClassifier(use_label_encoder=False, eval_metric='logloss')
-    search = RandomizedSearchCV(xgb, param_dist, n_iter=10, cv=3, scoring='f1', n_jobs=-1)
-    search.fit(X_train, y_train)
+# 1. Define Search Space
+PARAM_DIST = {
+    'n_estimators': [100, 200, 500],
+    'max_depth': [3, 6, 10],
+    'learning_rate': [0.01, 0.1, 0.2],
+    'subsample': [0.8, 1.0],
+    'scale_pos_weight': [1, 3, 5] # Vital for credit risk imbalance
+}
 
-    # 3. Update Config with Best Params
+DEFAULT_TUNING = {
+    'strategy': 'halving',
+    'n_candidates': 9,
+    'min_estimators': 50,
+    'max_estimators': 500,
+    'eta': 3,
+    'cv_folds': 3,
+    'early_stopping_rounds': 20,
+    # Share of each training fold held out for early stopping (never scored)
+    'early_stopping_fraction': 0.15,
+    'time_budget_seconds': 600,
+    'random_state': 42,
+    'warm_start': True,
+    'warm_start_top_k': 3,
+    'trials_path': 'models/tuning/trials.jsonl'
+}
+
+def load_tuning_config(config):
+    return {**DEFAULT_TUNING, **(config.get('tuning') or {})}
+
+def search_fingerprint(X, y, tuning):
+    # Scores are only comparable for the same data, strategy and CV setup
+    extra = {k: tuning[k] for k in ('strategy', 'cv_folds', 'early_stopping_rounds',
+                                    'early_stopping_fraction', 'random_state')}
+    return data_fingerprint(X, y, extra)
+
+def plan_candidates(tuning, store, fingerprint, search_space):
+    """
+    Resumes the candidate list of an interrupted run on the same data. Otherwise,
+    with warm_start, re-seeds the best prior configs and fills the rest with
+    configs never evaluated on this data; without it, samples afresh.
+    Returns (run_id, candidates).
+    """
+    plan = store.unfinished_plan(fingerprint)
+    if plan is not None:
+        logging.info(f"Resuming interrupted tuning run {plan['run_id']}")
+        return plan['run_id'], plan['candidates']
+
+    n_candidates = tuning['n_candidates']
+    if not tuning['warm_start']:
+        candidates = list(ParameterSampler(search_space, n_iter=n_candidates,
+                                           random_state=tuning['random_state']))
+    else:
+        candidates = store.best_params(fingerprint, tuning['warm_start_top_k'])
+        explored = store.explored(fingerprint)
+        # A different shuffle per run, so each night looks at new regions first. Not
+        # ParameterSampler: asked for the whole grid, it returns it in grid order.
+        n_runs = len(store.plans(fingerprint))
+        grid = list(ParameterGrid(search_space))
+        for i in np.random.RandomState(tuning['random_state'] + n_runs).permutation(len(grid)):
+            params = grid[i]
+            if len(candidates) >= n_candidates:
+                break
+            if params_key(params) not in explored and params not in candidates:
+                candidates.append(params)
+        if explored:
+            logging.info(f"Warm start: {min(len(candidates), tuning['warm_start_top_k'])} prior best configs, "
+                         f"{len(explored)} configs already explored on this data")
+
+    run_id = uuid.uuid4().hex[:8]
+    store.append({"type": "plan", "run_id": run_id, "fingerprint": fingerprint, "candidates": candidates})
+    return run_id, candidates
+
+def make_folds(X, y, tuning):
+    """
+    (fit_idx, stop_idx, val_idx) per CV fold: early stopping watches `stop_idx`,
+    carved out of the training fold, so the F1 scored on `val_idx` stays unbiased.
+    """
+    folds = []
+    splitter = StratifiedKFold(n_splits=tuning['cv_folds'], shuffle=True, random_state=tuning['random_state'])
+    for train_idx, val_idx in splitter.split(X, y):
+        fit_idx, stop_idx = train_test_split(train_idx, test_size=tuning['early_stopping_fraction'],
+                                             stratify=y[train_idx], random_state=tuning['random_state'])
+        folds.append((fit_idx, stop_idx, val_idx))
+    return folds
+
+def evaluate_candidate(params, X, y, folds, n_estimators, early_stopping_rounds):
+    """
+    Cross-validated F1 for one candidate at a given tree budget. Each fold stops
+    early on its own held-out split, so hopeless configs cost few trees. With
+    `early_stopping_rounds=None` every fold fits all trees on its whole training part.
+    """
+    params = {k: v for k, v in params.items() if k != 'n_estimators'}
+    fold_scores, best_iterations = [], []
+    for fit_idx, stop_idx, val_idx in folds:
+        model = XGBClassifier(
+            **params,
+            n_estimators=n_estimators,
+            early_stopping_rounds=early_stopping_rounds,
+            eval_metric='logloss'
+        )
+        if early_stopping_rounds is None:
+            train_idx = np.concatenate([fit_idx, stop_idx])
+            model.fit(X[train_idx], y[train_idx], verbose=False)
+            best_iterations.append(n_estimators)
+        else:
+            model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[stop_idx], y[stop_idx])], verbose=False)
+            best_iterations.append(model.best_iteration + 1)
+        fold_scores.append(f1_score(y[val_idx], model.predict(X[val_idx])))
+    return fold_scores, best_iterations
+
+def run_trial(store, run_id, fingerprint, cid, params, X, y, folds, budget, early_stopping_rounds,
+              deadline, rung=0):
+    """
+    One candidate at one tree budget: the stored trial if this data already has it,
+    otherwise a fresh evaluation, persisted immediately so a crash never loses a
+    finished fit. Returns None once the deadline has passed.
+    """
+    cached = store.find_trial(fingerprint, params, budget)
+    if cached is not None:
+        trial = {**cached, "candidate": cid, "rung": rung}
+        logging.info(f"Rung {rung} ({budget} trees) candidate {cid}: F1={trial['mean_f1']:.4f} (stored)")
+        return trial
+    if time.monotonic() > deadline:
+        return None
+
+    start = time.perf_counter()
+    fold_scores, best_iterations = evaluate_candidate(params, X, y, folds, budget, early_stopping_rounds)
+    trial = store.append({
+        "type": "trial",
+        "run_id": run_id,
+        "fingerprint": fingerprint,
+        "candidate": cid,
+        "rung": rung,
+        "n_estimators": budget,
+        "params": params,
+        "fold_scores": fold_scores,
+        "mean_f1": float(np.mean(fold_scores)),
+        "best_iterations": best_iterations,
+        "seconds": time.perf_counter() - start
+    })
+    logging.info(f"Rung {rung} ({budget} trees) candidate {cid}: F1={trial['mean_f1']:.4f}")
+    return trial
+
+def stored_winner(store, fingerprint, pick):
+    """Deadline hit before the first fit: the best earlier trial on this data, if any."""
+    # No 'done' record is written, so the next run resumes the same plan
+    stored = store.trials(fingerprint)
+    if not stored:
+        logging.warning("No tuning trial finished within the time budget.")
+        return None, None
+    logging.warning("No tuning trial finished within the time budget; using the best stored trial.")
+    return pick(stored)
+
+def pick_winner(trials):
+    """Best score among the trials with the largest tree budget, trained with that budget."""
+    top_budget = max(t['n_estimators'] for t in trials)
+    best = max((t for t in trials if t['n_estimators'] == top_budget), key=lambda t: t['mean_f1'])
+    best_params = dict(best['params'])
+    # Not the early-stopping mean: logloss on 85% folds stops well before F1 on
+    # the full training set stops improving
+    best_params['n_estimators'] = top_budget
+    return best_params, best['mean_f1']
+
+def run_successive_halving(X, y, tuning, store):
+    """
+    Successive halving over the tree budget: every candidate starts with
+    `min_estimators` trees, and only the best 1/eta of each rung moves on with
+    eta times more trees, until `max_estimators` or the wall-clock budget is hit.
+    Trials already in the store for this data are reused instead of refitted.
+    Returns (None, None, []) if no trial finished and none is stored.
+    """
+    fingerprint = search_fingerprint(X, y, tuning)
+    search_space = {k: v for k, v in PARAM_DIST.items() if k != 'n_estimators'}
+    run_id, candidates = plan_candidates(tuning, store, fingerprint, search_space)
+    folds = make_folds(X, y, tuning)
+    deadline = time.monotonic() + tuning['time_budget_seconds']
+
+    trials, survivors = [], list(range(len(candidates)))
+    budget, rung = tuning['min_estimators'], 0
+    while survivors:
+        rung_results = []
+        for cid in survivors:
+            trial = run_trial(store, run_id, fingerprint, cid, candidates[cid], X, y, folds, budget,
+                              tuning['early_stopping_rounds'], deadline, rung)
+            if trial is None:
+                logging.warning(f"Tuning time budget exhausted in rung {rung}; stopping early.")
+                break
+            trials.append(trial)
+            rung_results.append(trial)
+
+        if len(rung_results) < len(survivors) or budget >= tuning['max_estimators'] or len(survivors) == 1:
+            break
+        rung_results.sort(key=lambda t: t['mean_f1'], reverse=True)
+        keep = max(1, math.ceil(len(rung_results) / tuning['eta']))
+        survivors = [t['candidate'] for t in rung_results[:keep]]
+        budget = min(budget * tuning['eta'], tuning['max_estimators'])
+        rung += 1
+
+    if not trials:
+        best_params, best_score = stored_winner(store, fingerprint, pick_winner)
+        return best_params, best_score, trials
+
+    # Winner: best score among the deepest rung that was evaluated
+    best_params, best_score = pick_winner(trials)
+    store.append({"type": "done", "run_id": run_id, "fingerprint": fingerprint,
+                  "best_params": best_params, "mean_f1": best_score})
+    return best_params, best_score, trials
+
+def pick_best(trials):
+    """Best score; each random-search trial carries its own n_estimators."""
+    best = max(trials, key=lambda t: t['mean_f1'])
+    return dict(best['params']), best['mean_f1']
+
+def run_random_search(X, y, tuning, store):
+    """
+    Random search over PARAM_DIST, n_estimators included: `n_candidates` configs,
+    each cross-validated with all its trees (no early stopping). Planned, resumed,
+    warm-started and persisted per trial like successive halving.
+    Returns (None, None, []) if no trial finished and none is stored.
+    """
+    fingerprint = search_fingerprint(X, y, tuning)
+    run_id, candidates = plan_candidates(tuning, store, fingerprint, PARAM_DIST)
+    folds = make_folds(X, y, tuning)
+    deadline = time.monotonic() + tuning['time_budget_seconds']
+
+    trials = []
+    for cid, params in enumerate(candidates):
+        trial = run_trial(store, run_id, fingerprint, cid, params, X, y, folds, params['n_estimators'],
+                          None, deadline)
+        if trial is None:
+            logging.warning(f"Tuning time budget exhausted after {len(trials)} candidates; stopping early.")
+            break
+        trials.append(trial)
+
+    if not trials:
+        best_params, best_score = stored_winner(store, fingerprint, pick_best)
+        return best_params, best_score, trials
+
+    best_params, best_score = pick_best(trials)
+    store.append({"type": "done", "run_id": run_id, "fingerprint": fingerprint,
+                  "best_params": best_params, "mean_f1": best_score})
+    return best_params, best_score, trials
+
+def run_tuning():
     with open("configs/training.yaml", 'r') as f:
         config = yaml.safe_load(f)
-    
-    config['model']['params'] = search.best_params_
-    
+    tuning = load_tuning_config(config)
+
+    # Memory-mapped float32 matrix, shared by file with any joblib workers
+    X_train, y_train, _ = FeatureStore().load_matrix("train_processed")
+
+    # Both strategies append every finished trial to the store as it completes
+    store = TrialStore(tuning['trials_path'])
+
+    start = time.perf_counter()
+    if tuning['strategy'] == 'random':
+        best_params, best_score, trials = run_random_search(X_train, y_train, tuning, store)
+    else:
+        best_params, best_score, trials = run_successive_halving(X_train, y_train, tuning, store)
+    elapsed = time.perf_counter() - start
+
+    logging.info(f"{len(trials)} trials in {elapsed:.1f}s, history in {tuning['trials_path']}")
+
+    if best_params is None:
+        print(f"Tuning found no candidate; keeping current params: {config['model']['params']}")
+        return
+
+    # 3. Update Config with Best Params
+    config['model']['params'] = {k: v.item() if hasattr(v, 'item') else v for k, v in best_params.items()}
+
     with open("configs/training.yaml", 'w') as f:
         yaml.dump(config, f)
-    
-    print(f"Tuning complete. Best params: {search.best_params_}")
+
+    print(f"Tuning complete ({tuning['strategy']}, CV F1={best_score:.4f}). Best params: {best_params}")
 
 if __name__ == "__main__":
-    run_tuning()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    run_tuning()